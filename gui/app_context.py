@@ -1,12 +1,28 @@
+import os
+import shutil
 import sys
-from typing import List, Optional
+import tempfile
+import time
+from pathlib import Path
+from typing import List, Optional, Set, Tuple
 
 import pandas as pd
-from PyQt5.QtCore import pyqtSignal, QObject
+from PyQt5.QtCore import pyqtSignal, QLockFile, QObject, QStandardPaths, QTimer
 from PyQt5.QtWidgets import QApplication
 
 from .main_window import MainWindow
-from .models import Dataset
+from .models import (
+    Autosave,
+    Dataset,
+    DatasetStats,
+    AppSettings,
+    DataDiff,
+    ParseCache,
+    format_bytes,
+    read_session,
+    save_session,
+)
+from .widgets.utilities import BackgroundThread, RunProgress, confirm_click
 
 
 class AppContext:
@@ -19,6 +35,10 @@ class AppContext:
     VERSION = "1.2.0"
     ORG = "Hall Lab"
     APPLICATION = "Clarite"
+    MAX_UNDO = 50  # Number of changes that can be undone
+    MAX_UNDO_BYTES = 1024**3  # Memory used by the changes that can be undone
+    # Held while the app runs, so it remains if the app crashes
+    AUTOSAVE_LOCK = "autosave.lock"
 
     def __init__(self, *args, **kwargs):
         # Main display widgets that expose functions to update themselves (set to None initially)
@@ -29,18 +49,37 @@ class AppContext:
         self.dataset_count = 0  # incremented each time a dataset is added
         self.datasets: List[Dataset] = []
         self.current_dataset_idx: Optional[int] = None
+        self.scratch_dir: Optional[str] = None  # Created when first needed
+        # Changes to datasets, most recent last: (dataset, DataDiff restoring the data before the change)
+        self.undo_stack: List[Tuple[Dataset, DataDiff]] = []
+        self.redo_stack: List[Tuple[Dataset, DataDiff]] = []
+        # Autosave of this run (created when first needed) and the datasets changed since its last checkpoint
+        self.autosave: Optional[Autosave] = None
+        self.autosave_lock: Optional[QLockFile] = None
+        self.autosave_changed: Set[Dataset] = set()
+        self.autosave_pending = False  # Anything changed since the last checkpoint
+        self.autosave_thread = None
 
         self.signals = AppctxSignals()
         self.app = QApplication(sys.argv)
+        self.settings = AppSettings(self.ORG, self.APPLICATION)
         self.main_window = MainWindow(self)
 
+        # Autosave once nothing has changed for a while
+        self.autosave_timer = QTimer(self.main_window)
+        self.autosave_timer.setSingleShot(True)
+        self.autosave_timer.timeout.connect(self.write_autosave)
+
         self.app.setApplicationName("CLARITE")
+        self.app.aboutToQuit.connect(self.remove_autosave)
+        self.app.aboutToQuit.connect(self.remove_scratch_dir)
 
     def run(self):
         """
         Run the application
         """
         self.main_window.show()
+        self.recover_autosave()
 
         # Testing code:
         # test_df = pd.DataFrame({'a': [1, 2, 3], 'b': [4, 5, 6], 'c': [7, 8, 9]}).set_index('c')
@@ -54,10 +93,16 @@ class AppContext:
 
     def add_dataset(self, dataset):
         """Add a dataset"""
+        # Share memory for any columns that are unchanged from the current dataset
+        if self.current_dataset_idx is not None and len(self.datasets) > 0:
+            self.share_columns(dataset, self.datasets[self.current_dataset_idx])
         # Update appctx data
         self.dataset_count += 1
         self.datasets.append(dataset)
         dataset.set_number(self.dataset_count)
+        self.calculate_stats(dataset)
+        self.offload(dataset)
+        self.mark_changed(dataset)
         # Signal that a dataset was added
         self.signals.added_dataset.emit()
         # Change to the new dataset
@@ -78,8 +123,11 @@ class AppContext:
             # Last dataset currently selected, must decrement the index
             self.current_dataset_idx -= 1
 
-        # Delete the dataset
+        # Delete the dataset, and any changes to it that could be undone
+        self.datasets[del_idx].discard_store()
+        self.remove_history(self.datasets[del_idx])
         del self.datasets[del_idx]  # Actually delete the data
+        self.mark_changed()
         self.signals.removed_dataset.emit(
             del_idx
         )  # Signal the UI to update the combo list
@@ -89,18 +137,459 @@ class AppContext:
         self.log_python(f"del {python_name}")
 
         # Update which dataset is selected
+        if 0 <= self.current_dataset_idx < len(self.datasets):
+            self.reload_dataset(self.datasets[self.current_dataset_idx])
         self.signals.changed_dataset.emit(self.current_dataset_idx)
 
     def change_dataset(self, idx):
         """Change the currently selected dataset"""
         self.current_dataset_idx = idx
+        # The selector may briefly have no valid selection while datasets are removed
+        if 0 <= idx < len(self.datasets):
+            dataset = self.datasets[idx]
+            dataset.last_viewed = time.monotonic()
+            self.reload_dataset(dataset)
         self.signals.changed_dataset.emit(idx)
+        self.enforce_memory_budget()
 
     def update_data(self, df: pd.DataFrame):
         """Replace the df in the current dataset with the provided one"""
-        self.datasets[self.current_dataset_idx].df = df
+        dataset = self.datasets[self.current_dataset_idx]
+        # Record how to undo the change
+        self.undo_stack.append((dataset, DataDiff(dataset.df, df)))
+        self.redo_stack = []
+        self.limit_undo()
+        self.replace_data(dataset, df)
         # Emit signal of a changed dataset (even though the index doesn't actually change) to refresh the display
         self.signals.changed_dataset.emit(self.current_dataset_idx)
+        self.signals.changed_history.emit()
+
+    def replace_data(self, dataset: Dataset, df: pd.DataFrame):
+        """Replace the data in a dataset, updating anything calculated from it"""
+        dataset.df = df
+        self.calculate_stats(dataset)
+        self.offload(dataset)
+        self.mark_changed(dataset)
+        self.enforce_memory_budget()
+
+    def undo(self):
+        """Undo the most recent change to a dataset, selecting that dataset"""
+        if len(self.undo_stack) == 0:
+            return
+        dataset, diff = self.undo_stack.pop()
+        self.redo_stack.append(self.restore_data(dataset, diff))
+        self.log_info(f"Undid the last change to '{dataset.get_selector_name()}'")
+        self.log_python(f"# Undo the last change to {dataset.get_python_name()}")
+        self.signals.changed_history.emit()
+
+    def redo(self):
+        """Redo the most recently undone change to a dataset, selecting that dataset"""
+        if len(self.redo_stack) == 0:
+            return
+        dataset, diff = self.redo_stack.pop()
+        self.undo_stack.append(self.restore_data(dataset, diff))
+        self.limit_undo()
+        self.log_info(
+            f"Redid the last undone change to '{dataset.get_selector_name()}'"
+        )
+        self.log_python(f"# Redo the last undone change to {dataset.get_python_name()}")
+        self.signals.changed_history.emit()
+
+    def restore_data(
+        self, dataset: Dataset, diff: DataDiff
+    ) -> Tuple[Dataset, DataDiff]:
+        """Restore the data recorded in the diff, returning a diff that reverses it"""
+        current_df = dataset.df
+        restored_df = diff.restore(current_df)
+        self.replace_data(dataset, restored_df)
+        self.change_dataset(self.datasets.index(dataset))
+        return dataset, DataDiff(current_df, restored_df)
+
+    def limit_undo(self):
+        """Forget the oldest changes beyond the number or size of changes that can be undone"""
+        del self.undo_stack[: -self.MAX_UNDO]
+        total = sum([diff.get_size() for _, diff in self.undo_stack])
+        while total > self.MAX_UNDO_BYTES:
+            _, diff = self.undo_stack.pop(0)
+            total -= diff.get_size()
+
+    def remove_history(self, dataset: Dataset):
+        """Forget changes to a dataset that is being deleted"""
+        self.undo_stack = [(d, diff) for d, diff in self.undo_stack if d is not dataset]
+        self.redo_stack = [(d, diff) for d, diff in self.redo_stack if d is not dataset]
+        self.signals.changed_history.emit()
+
+    def calculate_stats(self, dataset: Dataset):
+        """Calculate summary statistics for the dataset in a background thread"""
+        version = dataset.version
+        nrows = len(dataset)
+        columns = dataset.iter_columns()
+
+        def f():
+            return DatasetStats(nrows, columns)
+
+        def set_stats(stats):
+            # Ignore the result if the data was replaced while the stats were being calculated
+            if dataset.version == version:
+                dataset.stats = stats
+
+        BackgroundThread.run_in_background(
+            function=f,
+            slot=set_stats,
+            error_slot=lambda e: self.log_info(f"Error calculating statistics: {e}"),
+        )
+
+    def share_columns(self, dataset: Dataset, parent: Dataset):
+        """Share unchanged columns of a new dataset with the one it was derived from, logging the memory that is saved"""
+        shared_num = dataset.share_columns(parent)
+        if shared_num == 0:
+            return
+        usage = dataset.get_memory_usage()
+        shared_bytes = usage.loc[usage["shared"], "bytes"].sum()
+        owned_bytes = usage.loc[~usage["shared"], "bytes"].sum()
+        self.log_info(
+            f"Sharing {shared_num:,} of {dataset.get_column_count():,} unchanged variables "
+            f"with '{parent.get_selector_name()}': "
+            f"{format_bytes(shared_bytes)} shared, {format_bytes(owned_bytes)} owned"
+        )
+
+    def offload(self, dataset: Dataset):
+        """Move the dataset to the scratch directory on disk, if that is enabled in the preferences"""
+        if not self.settings.out_of_core or dataset.is_on_disk():
+            return
+        # Datasets are usually added or replaced in the slot of a RunProgress, so wait until it returns
+        RunProgress.run_when_idle(lambda: self.move_to_disk(dataset))
+
+    def move_to_disk(self, dataset: Dataset):
+        """Move the dataset to the scratch directory on disk, unless it was removed (or moved) already"""
+        if dataset not in self.datasets or dataset.is_on_disk():
+            return
+        path = tempfile.mkdtemp(
+            prefix=f"dataset{dataset.number}_", dir=self.get_scratch_dir()
+        )
+        RunProgress.run_with_progress(
+            progress_str="Moving data to disk...",
+            function=lambda: dataset.move_to_disk(path),
+            slot=None,
+            parent=self.main_window,
+        )
+
+    def enforce_memory_budget(self):
+        """
+        Spill the least recently viewed datasets to disk until the data in memory fits in the memory budget.
+        The current dataset is always kept in memory.
+        """
+        if self.settings.memory_budget == 0:
+            return
+        # This is usually called from the slot of a RunProgress, so wait until it returns
+        RunProgress.run_when_idle(self.spill_inactive_datasets)
+
+    def spill_inactive_datasets(self):
+        """Spill datasets to disk as needed to stay within the memory budget (see enforce_memory_budget)"""
+        budget = self.settings.memory_budget * 1024**2
+        if budget == 0:
+            return
+        current = None
+        if (
+            self.current_dataset_idx is not None
+            and 0 <= self.current_dataset_idx < len(self.datasets)
+        ):
+            current = self.datasets[self.current_dataset_idx]
+        candidates = sorted(
+            [d for d in self.datasets if not d.is_on_disk() and d is not current],
+            key=lambda d: d.last_viewed,
+        )
+        total = sum([d.get_owned_memory() for d in self.datasets])
+        for dataset in candidates:
+            if total <= budget:
+                break
+            path = tempfile.mkdtemp(
+                prefix=f"dataset{dataset.number}_", dir=self.get_scratch_dir()
+            )
+            start = time.perf_counter()
+            RunProgress.run_with_progress(
+                progress_str="Moving inactive data to disk...",
+                function=lambda: dataset.spill(path),
+                slot=None,
+                parent=self.main_window,
+            )
+            elapsed = time.perf_counter() - start
+            # Spilling a dataset can change how much memory is shared by the others
+            new_total = sum([d.get_owned_memory() for d in self.datasets])
+            self.log_info(
+                f"Moved '{dataset.get_selector_name()}' to disk to stay within the memory budget: "
+                f"freed {format_bytes(total - new_total)} in {elapsed:.2f} seconds"
+            )
+            total = new_total
+
+    def reload_dataset(self, dataset: Dataset):
+        """Read a dataset that was spilled to disk (or not yet read from a session file) back into memory"""
+        if not dataset.spilled:
+            return
+        # This is usually called from the slot of a RunProgress, so wait until it returns
+        RunProgress.run_when_idle(lambda: self.read_spilled_dataset(dataset))
+
+    def read_spilled_dataset(self, dataset: Dataset):
+        """Read a spilled dataset back into memory, unless it was removed (or read) already"""
+        if dataset not in self.datasets or not dataset.spilled:
+            return
+        start = time.perf_counter()
+        RunProgress.run_with_progress(
+            progress_str="Reading data from disk...",
+            function=dataset.reload,
+            slot=None,
+            parent=self.main_window,
+        )
+        elapsed = time.perf_counter() - start
+        self.log_info(
+            f"Reloaded '{dataset.get_selector_name()}' from disk in {elapsed:.2f} seconds"
+        )
+        # Datasets from a session file don't have statistics yet
+        if dataset.stats is None:
+            self.calculate_stats(dataset)
+
+    def save_session(self, filename: str):
+        """Save all datasets and the logs to a session file"""
+        datasets = list(self.datasets)
+        info = {
+            "version": self.VERSION,
+            "dataset_count": self.dataset_count,
+            "current_dataset_idx": self.current_dataset_idx,
+            "info_log": list(self.main_window.info_log_widget.messages),
+            "python_log": list(self.main_window.python_log_widget.messages),
+        }
+        start = time.perf_counter()
+        RunProgress.run_with_progress(
+            progress_str="Saving Session...",
+            function=lambda: save_session(filename, datasets, info),
+            slot=None,
+            parent=self.main_window,
+        )
+        elapsed = time.perf_counter() - start
+        self.log_info(
+            "\n"
+            + "=" * 80
+            + f"\nSaved {len(datasets):,} datasets to the session file '{filename}'"
+            f" in {elapsed:.2f} seconds\n" + "=" * 80
+        )
+
+    def open_session(self, filename: str):
+        """Replace all datasets and the logs with those saved in a session file"""
+        start = time.perf_counter()
+        results = []
+        RunProgress.run_with_progress(
+            progress_str="Opening Session...",
+            function=lambda: read_session(filename),
+            slot=results.append,
+            parent=self.main_window,
+        )
+        if len(results) == 0:
+            return
+        # Replace the datasets once the RunProgress has returned (selecting one may start another RunProgress)
+        self.set_session(*results[0])
+        elapsed = time.perf_counter() - start
+        self.log_info(
+            "\n"
+            + "=" * 80
+            + f"\nOpened the session file '{filename}' in {elapsed:.2f} seconds\n"
+            + "=" * 80
+        )
+
+    def set_session(self, session: dict, datasets: List[Dataset]):
+        """Replace the datasets and logs.  The datasets are read into memory when they are selected."""
+        # Remove the current datasets
+        while len(self.datasets) > 0:
+            self.current_dataset_idx = 0
+            self.remove_current_dataset()
+        # Replace the logs
+        for log_widget, messages in [
+            (self.main_window.info_log_widget, session["info_log"]),
+            (self.main_window.python_log_widget, session["python_log"]),
+        ]:
+            log_widget.clear_log()
+            for message in messages:
+                log_widget.append(message)
+        # Add the datasets without calculating anything, so their data isn't read
+        for dataset in datasets:
+            dataset.last_viewed = time.monotonic()
+            self.datasets.append(dataset)
+            self.mark_changed(dataset)
+            self.signals.added_dataset.emit()
+        self.dataset_count = session["dataset_count"]
+        if len(self.datasets) > 0:
+            self.change_dataset(
+                min(session["current_dataset_idx"] or 0, len(self.datasets) - 1)
+            )
+
+    def get_scratch_dir(self) -> str:
+        """Get the directory for temporary files, which is removed when the app exits"""
+        if self.scratch_dir is None:
+            self.scratch_dir = tempfile.mkdtemp(
+                prefix="clarite_", dir=self.settings.scratch_dir or None
+            )
+        return self.scratch_dir
+
+    def remove_scratch_dir(self):
+        if self.scratch_dir is not None:
+            shutil.rmtree(self.scratch_dir, ignore_errors=True)
+            self.scratch_dir = None
+
+    def mark_changed(self, dataset: Optional[Dataset] = None):
+        """
+        Record that a dataset changed (or that datasets were removed, if None) since the last autosave checkpoint,
+        restarting the autosave timer
+        """
+        if dataset is not None:
+            self.autosave_changed.add(dataset)
+        self.autosave_pending = True
+        if self.settings.autosave:
+            self.autosave_timer.start(self.settings.autosave_delay * 1000)
+
+    def get_autosave_dir(self) -> str:
+        """Get the directory holding the autosave directory of each running (or crashed) copy of the app"""
+        data_location = QStandardPaths.writableLocation(
+            QStandardPaths.AppLocalDataLocation
+        )
+        return str(Path(data_location or tempfile.gettempdir()) / "autosave")
+
+    def write_autosave(self):
+        """Write the datasets that changed since the last checkpoint in a background thread"""
+        if not self.settings.autosave or not self.autosave_pending:
+            return
+        if self.autosave_thread is not None:
+            # Try again after the current checkpoint is written
+            self.autosave_timer.start(self.settings.autosave_delay * 1000)
+            return
+        if self.autosave is None:
+            Path(self.get_autosave_dir()).mkdir(parents=True, exist_ok=True)
+            path = tempfile.mkdtemp(prefix="run_", dir=self.get_autosave_dir())
+            self.autosave_lock = QLockFile(os.path.join(path, self.AUTOSAVE_LOCK))
+            self.autosave_lock.lock()
+            self.autosave = Autosave(path)
+        autosave = self.autosave
+        changed = self.autosave_changed
+        # The datasets are only read here: the checkpoint is written from the snapshot in the background
+        snapshot = autosave.take_snapshot(self.datasets, changed)
+        info = {
+            "version": self.VERSION,
+            "dataset_count": self.dataset_count,
+            "current_dataset_idx": self.current_dataset_idx,
+            "info_log": list(self.main_window.info_log_widget.messages),
+            "python_log": list(self.main_window.python_log_widget.messages),
+        }
+        self.autosave_changed = set()
+        self.autosave_pending = False
+
+        def f():
+            start = time.perf_counter()
+            written = autosave.write(snapshot, info)
+            return written, time.perf_counter() - start
+
+        def finished(result):
+            written, elapsed = result
+            self.autosave_thread = None
+            self.log_info(
+                f"Autosaved {written:,} changed datasets in {elapsed:.2f} seconds"
+            )
+
+        def failed(error):
+            # Keep the changes, so they are written in the next checkpoint
+            self.autosave_thread = None
+            self.autosave_changed |= {d for d in changed if d in self.datasets}
+            self.autosave_pending = True
+            self.log_info(f"Error autosaving: {error}")
+
+        self.autosave_thread = BackgroundThread.run_in_background(
+            function=f, slot=finished, error_slot=failed
+        )
+
+    def remove_autosave(self):
+        """Remove the autosaved data when the app exits normally"""
+        self.autosave_timer.stop()
+        if self.autosave_thread is not None:
+            self.autosave_thread.wait()
+        if self.autosave is not None:
+            self.autosave_lock.unlock()
+            self.autosave.delete()
+            self.autosave = None
+
+    def recover_autosave(self):
+        """Offer to recover the latest checkpoint autosaved by a previous run of the app that didn't exit normally"""
+        autosave_dir = Path(self.get_autosave_dir())
+        if not autosave_dir.is_dir():
+            return
+        checkpoints = []
+        for path in autosave_dir.iterdir():
+            if not path.is_dir() or (
+                self.autosave is not None and path == self.autosave.path
+            ):
+                continue
+            # The lock can only be taken if the app that held it is no longer running
+            lock = QLockFile(str(path / self.AUTOSAVE_LOCK))
+            lock.setStaleLockTime(0)
+            if not lock.tryLock(0):
+                continue
+            lock.unlock()
+            autosave = Autosave(path)
+            manifest = autosave.read_manifest()
+            if manifest is None or len(manifest["datasets"]) == 0:
+                autosave.delete()
+            else:
+                checkpoints.append((manifest["time"], autosave))
+        if len(checkpoints) == 0:
+            return
+        checkpoints.sort(key=lambda checkpoint: checkpoint[0])
+        saved_time, latest = checkpoints[-1]
+        for _, autosave in checkpoints[:-1]:
+            autosave.delete()
+        dataset_num = len(latest.read_manifest()["datasets"])
+        confirm_click(
+            parent=self.main_window,
+            txt="CLARITE didn't exit normally.  Recover the autosaved datasets?",
+            inform_txt=f"{dataset_num:,} datasets were autosaved at {time.ctime(saved_time)}",
+            button_slots={
+                "Yes": lambda: self.open_autosave(latest),
+                "No": latest.delete,
+            },
+        )
+
+    def open_autosave(self, autosave: Autosave):
+        """Replace all datasets and the logs with those in an autosave checkpoint"""
+        # Move the checkpoint to the scratch directory, where the datasets are kept until they are read
+        path = shutil.move(
+            str(autosave.path),
+            tempfile.mkdtemp(prefix="recovered_", dir=self.get_scratch_dir()),
+        )
+        self.set_session(*Autosave(path).read())
+        self.log_info(
+            "\n"
+            + "=" * 80
+            + f"\nRecovered {len(self.datasets):,} autosaved datasets\n"
+            + "=" * 80
+        )
+
+    def get_parse_cache_dir(self) -> str:
+        """Get the directory of the parse cache (see ParseCache), which is kept between sessions"""
+        if self.settings.parse_cache_dir:
+            return self.settings.parse_cache_dir
+        cache_location = QStandardPaths.writableLocation(QStandardPaths.CacheLocation)
+        return str(Path(cache_location or tempfile.gettempdir()) / "parse_cache")
+
+    def get_parse_cache(self) -> Optional[ParseCache]:
+        """Get the cache of parsed text files, or None if it isn't used"""
+        if not self.settings.parse_cache:
+            return None
+        return ParseCache(
+            self.get_parse_cache_dir(), self.settings.parse_cache_size * 1024**2
+        )
+
+    def update_settings(self):
+        """Reload the settings snapshot after the preferences are saved"""
+        self.settings.read()
+        if not self.settings.autosave:
+            self.autosave_timer.stop()
+        self.signals.changed_settings.emit()
+        self.enforce_memory_budget()
 
     def log_info(self, message):
         """Add the message to the info log"""
@@ -118,5 +607,7 @@ class AppctxSignals(QObject):
     added_dataset = pyqtSignal()
     removed_dataset = pyqtSignal(int)
     changed_dataset = pyqtSignal(int)  # Idx of dataset that was changed to
+    changed_settings = pyqtSignal()
+    changed_history = pyqtSignal()  # Changes were made, undone or redone
     log_info = pyqtSignal(str)
     log_python = pyqtSignal(str)
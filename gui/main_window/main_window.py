@@ -1,11 +1,20 @@
 from PyQt5.QtCore import Qt
-from PyQt5.QtGui import QIcon
-from PyQt5.QtWidgets import QMainWindow, QSplitter, QAction, QTabWidget
+from PyQt5.QtGui import QIcon, QKeySequence
+from PyQt5.QtWidgets import (
+    QMainWindow,
+    QSplitter,
+    QAction,
+    QTabWidget,
+    QFileDialog,
+)
+
+from gui.widgets.utilities import confirm_click
 
 from .main_window_widgets import (
     CommandDockWidget,
     DatasetWidget,
     LogWidget,
+    MemoryDockWidget,
     PreferencesDialog,
     AboutDialog,
     LicenseDialog,
@@ -13,6 +22,8 @@ from .main_window_widgets import (
 
 
 class MainWindow(QMainWindow):
+    SESSION_FILTER = "CLARITE Sessions (*.clarite)"
+
     def __init__(self, appctx, *args, **kwargs):
         super(MainWindow, self).__init__(*args, **kwargs)
         self.appctx = appctx
@@ -52,29 +63,35 @@ class MainWindow(QMainWindow):
     def setup_log_ui(self):
         """Add log tabs each with individual widgets"""
         # Normal Log
-        info_log_widget = LogWidget(parent=self)
-        self.appctx.signals.log_info.connect(info_log_widget.append)
-        self.log_tabs.addTab(info_log_widget, "Info Log")
+        self.info_log_widget = LogWidget(parent=self)
+        self.appctx.signals.log_info.connect(self.info_log_widget.append)
+        self.log_tabs.addTab(self.info_log_widget, "Info Log")
         # Python Log
-        python_log_widget = LogWidget(
+        self.python_log_widget = LogWidget(
             parent=self,
             filetype="Python Files (*.py)",
             initial_log=["import clarite\n\n"],
         )
-        python_log_widget.btn_clear.setHidden(
+        self.python_log_widget.btn_clear.setHidden(
             True
         )  # Don't allow the python log to be cleared- too tricky
-        self.appctx.signals.log_python.connect(python_log_widget.append)
-        self.log_tabs.addTab(python_log_widget, "Python Log")
+        self.appctx.signals.log_python.connect(self.python_log_widget.append)
+        self.log_tabs.addTab(self.python_log_widget, "Python Log")
 
     def setup_command_dock_ui(self):
         """
         Set up the dock widgets, which includes:
             CommandDockWidget
+            MemoryDockWidget
         """
         # Initialize command dock and place on the left
         self.command_dock_widget = CommandDockWidget(parent=self)
         self.addDockWidget(Qt.LeftDockWidgetArea, self.command_dock_widget)
+        # Initialize memory dock in a tab next to the command dock
+        self.memory_dock_widget = MemoryDockWidget(parent=self)
+        self.addDockWidget(Qt.LeftDockWidgetArea, self.memory_dock_widget)
+        self.tabifyDockWidget(self.command_dock_widget, self.memory_dock_widget)
+        self.command_dock_widget.raise_()
 
     def setup_menu(self):
         """Set up the file menu"""
@@ -87,6 +104,20 @@ class MainWindow(QMainWindow):
         help_menu = menubar.addMenu("Help")
 
         # Add to File menu
+        open_session_action = QAction("Open Session...", parent=self)
+        open_session_action.setShortcut(QKeySequence.Open)
+        open_session_action.setStatusTip(
+            "Open datasets and logs saved in a session file"
+        )
+        open_session_action.triggered.connect(self.open_session)
+        file_menu.addAction(open_session_action)
+        save_session_action = QAction("Save Session...", parent=self)
+        save_session_action.setShortcut(QKeySequence.Save)
+        save_session_action.setStatusTip("Save all datasets and logs to a session file")
+        save_session_action.triggered.connect(self.save_session)
+        file_menu.addAction(save_session_action)
+        file_menu.addSeparator()
+
         exit_action = QAction("Exit", parent=self)
         exit_action.setShortcut("Ctrl+Q")
         exit_action.setStatusTip("Exit application")
@@ -94,6 +125,20 @@ class MainWindow(QMainWindow):
         file_menu.addAction(exit_action)
 
         # Add to Edit menu
+        self.undo_action = QAction("Undo", parent=self)
+        self.undo_action.setShortcut(QKeySequence.Undo)
+        self.undo_action.setStatusTip("Undo the last change to a dataset")
+        self.undo_action.triggered.connect(self.appctx.undo)
+        edit_menu.addAction(self.undo_action)
+        self.redo_action = QAction("Redo", parent=self)
+        self.redo_action.setShortcut(QKeySequence.Redo)
+        self.redo_action.setStatusTip("Redo the last undone change to a dataset")
+        self.redo_action.triggered.connect(self.appctx.redo)
+        edit_menu.addAction(self.redo_action)
+        self.appctx.signals.changed_history.connect(self.update_history_actions)
+        self.update_history_actions()
+        edit_menu.addSeparator()
+
         preferences_action = QAction("Preferences", parent=self)
         preferences_action.setStatusTip("Edit preferences")
         preferences_action.triggered.connect(
@@ -123,6 +168,11 @@ class MainWindow(QMainWindow):
         )
         view_commands_menu.addAction(dock_commands_action)
 
+        show_memory_action = self.memory_dock_widget.toggleViewAction()
+        show_memory_action.setStatusTip("Show/Hide the memory usage of each dataset")
+        show_memory_action.setText("Memory")
+        view_menu.addAction(show_memory_action)
+
         showLogsButton = QAction("Logs", parent=self)
         showLogsButton.setStatusTip("Show the logs")
         showLogsButton.setCheckable(True)
@@ -143,3 +193,45 @@ class MainWindow(QMainWindow):
             lambda: LicenseDialog(parent=self.appctx.main_window).show()
         )
         help_menu.addAction(showLicenseButton)
+
+    def update_history_actions(self):
+        """Enable undo/redo only when there is something to undo/redo"""
+        self.undo_action.setEnabled(len(self.appctx.undo_stack) > 0)
+        self.redo_action.setEnabled(len(self.appctx.redo_stack) > 0)
+
+    def open_session(self):
+        """Select a session file to open, replacing the current datasets"""
+        options = QFileDialog.Options()
+        options |= QFileDialog.DontUseNativeDialog
+        filename, _ = QFileDialog.getOpenFileName(
+            self, "Open Session", "", self.SESSION_FILTER, options=options
+        )
+        # Return without doing anything if a valid file wasn't selected
+        if not filename:
+            return
+        if len(self.appctx.datasets) > 0:
+            confirm_click(
+                parent=self,
+                txt="Open Session",
+                inform_txt="The current datasets and logs will be replaced.  Continue?",
+                button_slots={
+                    "Ok": lambda: self.appctx.open_session(filename),
+                    "Cancel": None,
+                },
+            )
+        else:
+            self.appctx.open_session(filename)
+
+    def save_session(self):
+        """Select a file to save the session to"""
+        options = QFileDialog.Options()
+        options |= QFileDialog.DontUseNativeDialog
+        filename, _ = QFileDialog.getSaveFileName(
+            self, "Save Session", "", self.SESSION_FILTER, options=options
+        )
+        # Return without doing anything if a valid file wasn't selected
+        if not filename:
+            return
+        if not filename.endswith(".clarite"):
+            filename += ".clarite"
+        self.appctx.save_session(filename)
@@ -3,4 +3,5 @@ from .command_dock import CommandDockWidget
 from .dataset import DatasetWidget
 from .license_dialog import LicenseDialog
 from .log import LogWidget
+from .memory_dock import MemoryDockWidget
 from .preferences_dialog import PreferencesDialog
@@ -1,8 +1,5 @@
-import json
-from pathlib import Path
-
-from PyQt5.QtCore import pyqtSlot, Qt, QSettings, QSize
-from PyQt5.QtGui import QColor, QPixmap
+from PyQt5.QtCore import pyqtSlot, Qt, QSize
+from PyQt5.QtGui import QPixmap
 from PyQt5.QtWidgets import (
     QGroupBox,
     QHBoxLayout,
@@ -14,7 +11,13 @@ from PyQt5.QtWidgets import (
 )
 
 from gui.main_window.main_window_widgets.dataset_table_view import DatasetTableView
-from gui.models import PandasDFModel
+from gui.models import (
+    EXPORT_FORMATS,
+    PandasDFModel,
+    get_write_code,
+    write_data_file,
+    write_dtypes,
+)
 from gui.widgets.utilities import RunProgress, confirm_click
 from gui.resources import app_resources
 
@@ -35,32 +38,6 @@ class DatasetWidget(QGroupBox):
         self.connect_ui_signals()
         self.connect_appctx_signals()
 
-    def read_color_settings(self):
-        settings = QSettings(self.appctx.ORG, self.appctx.APPLICATION)
-        settings.beginGroup("display/data")
-        data_colors = dict()
-        data_colors["Unknown"] = QColor(
-            settings.value(
-                "bgcolor_unknown", defaultValue=QColor.fromRgb(255, 255, 255)
-            )
-        )
-        data_colors["Binary"] = QColor(
-            settings.value("bgcolor_binary", defaultValue=QColor.fromRgb(255, 204, 153))
-        )
-        data_colors["Categorical"] = QColor(
-            settings.value(
-                "bgcolor_categorical", defaultValue=QColor.fromRgb(153, 204, 255)
-            )
-        )
-        data_colors["Continuous"] = QColor(
-            settings.value(
-                "bgcolor_continuous", defaultValue=QColor.fromRgb(204, 153, 255)
-            )
-        )
-        settings.endGroup()
-
-        return data_colors
-
     def setup_ui(self):
         # Layout
         layout = QVBoxLayout(self)
@@ -116,7 +93,7 @@ class DatasetWidget(QGroupBox):
     def initialize_legend(self, layout):
         """Draw a legend for data types (shown only when viewing a dataset)"""
         self.legend_labels = dict()
-        self.data_colors = self.read_color_settings()  # for drawing the legend
+        self.data_colors = self.appctx.settings.get_data_colors()
         for label_text, color in self.data_colors.items():
             # Create label
             qlabel = QLabel(self)
@@ -127,7 +104,7 @@ class DatasetWidget(QGroupBox):
         self.color_legend()
 
     def color_legend(self):
-        self.data_colors = self.read_color_settings()  # for drawing the legend
+        self.data_colors = self.appctx.settings.get_data_colors()
         for label_text, color in self.data_colors.items():
             qlabel = self.legend_labels[label_text]
             qlabel.setStyleSheet(
@@ -147,6 +124,8 @@ class DatasetWidget(QGroupBox):
     def connect_appctx_signals(self):
         """Signals from the app context are connected to slots in this widget"""
         self.appctx.signals.changed_dataset.connect(self.select_dataset)
+        # Redisplay with new settings
+        self.appctx.signals.changed_settings.connect(self.data_model.refresh)
         # Connections to add or remove a dataset affecting the combobox
         self.appctx.signals.added_dataset.connect(self.combobox_add_dataset)
         self.appctx.signals.removed_dataset.connect(self.combobox_remove_dataset)
@@ -227,56 +206,66 @@ class DatasetWidget(QGroupBox):
         """
         options = QFileDialog.Options()
         options |= QFileDialog.DontUseNativeDialog
-        filename, _ = QFileDialog.getSaveFileName(
+        file_filters = {
+            f"{kind} (*{extension})": kind for kind, extension in EXPORT_FORMATS.items()
+        }
+        filename, selected_filter = QFileDialog.getSaveFileName(
             self,
-            "QFileDialog.getSaveFileName()",
+            "Save As",
             "",
-            "All Files (*);;Text Files (*.txt)",
+            ";;".join(file_filters),
             options=options,
         )
 
         # Return without doing anything if a valid file wasn't selected
         if not filename:
             return
+        kind = file_filters.get(selected_filter, "TSV")
+        if not filename.lower().endswith(EXPORT_FORMATS[kind]):
+            filename += EXPORT_FORMATS[kind]
 
-        # Define a no-parameter function to save the data using a thread
+        # Define a function to save the data using a thread
         dataset = self.appctx.datasets[self.appctx.current_dataset_idx]
+        saved = []
 
-        def save_func():
+        def save_func(thread):
             # Save Data
-            dataset.df.to_csv(filename, sep="\t")
-            # Save Dtypes
-            dtypes = {
-                variable_name: {"type": str(dtype)}
-                if str(dtype) != "category"
-                else {
-                    "type": str(dtype),
-                    "categories": list(dtype.categories.values.tolist()),
-                    "ordered": dtype.ordered,
-                }
-                for variable_name, dtype in dataset.df.dtypes.iteritems()
-            }
-            dtypes_filename = filename + ".dtypes"
-            dtypes_file = Path(dtypes_filename)
-            with dtypes_file.open("w") as f:
-                json.dump(dtypes, f)
+            if not write_data_file(
+                dataset.df,
+                filename,
+                kind,
+                set_percent=thread.set_percent,
+                is_cancelled=lambda: thread.cancelled,
+            ):
+                return False
+            # Save Dtypes (even for binary formats, since Parquet files don't keep numeric categories)
+            write_dtypes(dataset.get_dtypes(), filename + ".dtypes")
+            return True
 
         RunProgress.run_with_progress(
-            progress_str="Saving Data...", function=save_func, slot=None, parent=self
+            progress_str="Saving Data...",
+            function=save_func,
+            slot=saved.append,
+            parent=self,
+            report_progress=True,
         )
+        if not any(saved):
+            return
 
         # Log Info
         save_str = (
-            f"\nSaved {len(dataset.df):,} observations of {len(list(dataset.df)):,} variables"
+            f"\nSaved {len(dataset):,} observations of {dataset.get_column_count():,} variables"
             f" in '{dataset.get_selector_name()}' to '{filename}'\n"
         )
         self.appctx.log_info("\n" + "=" * 80 + save_str + "=" * 80)
 
         # Log Python
-        self.appctx.log_python(
-            f"# Save data and it's associated datatypes\n"
-            f"{dataset.get_python_name()}.to_csv({filename}, sep='\t')\n"
-        )
+        code = get_write_code(dataset.get_python_name(), filename, kind)
+        if kind == "Feather":
+            code = f"import pyarrow\nimport pyarrow.feather\n{code}"
+        elif kind == "TSV (zstd)":
+            code = f"import zstandard\n{code}"
+        self.appctx.log_python(f"# Save data and it's associated datatypes\n{code}\n")
 
     @pyqtSlot()
     def delete_dataset(self):
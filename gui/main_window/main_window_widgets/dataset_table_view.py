@@ -27,6 +27,15 @@ class DatasetTableView(QTableView):
             )
             menu.popup(QCursor.pos())
 
+    def horizontalScrollbarValueChanged(self, value):
+        """Fetch more columns (rather than rows) when scrolled all the way to the right"""
+        model = self.model()
+        if (
+            value == self.horizontalScrollBar().maximum()
+            and model.can_fetch_more_columns()
+        ):
+            model.fetch_more_columns()
+
 
 class TableContextMenu(QMenu):
     def __init__(self, click_col, click_row, *args, **kwargs):
@@ -0,0 +1,228 @@
+from PyQt5.QtCore import Qt
+from PyQt5.QtWidgets import (
+    QDockWidget,
+    QFileDialog,
+    QHBoxLayout,
+    QLabel,
+    QPushButton,
+    QTableWidget,
+    QTableWidgetItem,
+    QVBoxLayout,
+    QWidget,
+    QAbstractItemView,
+)
+
+from gui.models import MemoryReport, format_bytes
+from gui.widgets.utilities import BackgroundThread, RunProgress
+
+
+class MemoryDockWidget(QDockWidget):
+    """
+    Widget that displays how much memory is used by each dataset (and each of its variables) and by the whole app.
+    The report is calculated in a background thread whenever datasets are added, changed, or removed,
+    or when the dock is shown if they changed while it was hidden.
+    """
+
+    DATASET_HEADERS = ["Dataset", "Rows", "Variables", "Location", "Owned", "Shared"]
+    VARIABLE_HEADERS = ["Variable", "Type", "Memory", "Shared"]
+
+    def __init__(self, *args, **kwargs):
+        super(MemoryDockWidget, self).__init__(*args, **kwargs)
+        self.appctx = self.parent().appctx  # Get App Context
+        self.report = None
+        # Incremented for each update, so only the latest result is shown
+        self.report_number = 0
+        self.report_outdated = True  # Datasets changed while the dock was hidden
+        # Set by visibilityChanged, which (unlike isVisible) is False while another tab is selected
+        self.report_visible = False
+        self.setAllowedAreas(Qt.LeftDockWidgetArea | Qt.RightDockWidgetArea)
+        self.setWindowTitle("Memory")
+        self.setup_ui()
+        self.connect_appctx_signals()
+
+    def setup_ui(self):
+        widget = QWidget(self)
+        layout = QVBoxLayout(widget)
+
+        # Process memory
+        self.process_label = QLabel(parent=widget)
+        layout.addWidget(self.process_label)
+
+        # Datasets
+        self.datasets_table = QTableWidget(0, len(self.DATASET_HEADERS), parent=widget)
+        self.datasets_table.setHorizontalHeaderLabels(self.DATASET_HEADERS)
+        self.datasets_table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.datasets_table.setSelectionMode(QAbstractItemView.SingleSelection)
+        self.datasets_table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.datasets_table.verticalHeader().setVisible(False)
+        self.datasets_table.itemSelectionChanged.connect(self.show_variables)
+        layout.addWidget(self.datasets_table)
+
+        # Variables of the selected dataset
+        self.variables_label = QLabel(
+            "Select a dataset to show its variables", parent=widget
+        )
+        layout.addWidget(self.variables_label)
+        self.variables_table = QTableWidget(
+            0, len(self.VARIABLE_HEADERS), parent=widget
+        )
+        self.variables_table.setHorizontalHeaderLabels(self.VARIABLE_HEADERS)
+        self.variables_table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.variables_table.verticalHeader().setVisible(False)
+        self.variables_table.setSortingEnabled(True)
+        layout.addWidget(self.variables_table)
+
+        # Buttons
+        button_layout = QHBoxLayout()
+        button_layout.addStretch()
+        self.btn_refresh = QPushButton(text="Refresh", parent=widget)
+        self.btn_refresh.clicked.connect(self.update_report)
+        button_layout.addWidget(self.btn_refresh)
+        self.btn_export = QPushButton(text="Export", parent=widget)
+        self.btn_export.setEnabled(False)
+        self.btn_export.clicked.connect(self.export_report)
+        button_layout.addWidget(self.btn_export)
+        layout.addLayout(button_layout)
+
+        self.setWidget(widget)
+        self.update_report()
+
+    def connect_appctx_signals(self):
+        self.appctx.signals.added_dataset.connect(self.update_report)
+        self.appctx.signals.removed_dataset.connect(self.update_report)
+        self.appctx.signals.changed_dataset.connect(self.update_report)
+        self.visibilityChanged.connect(self.visibility_changed)
+
+    def visibility_changed(self, visible: bool):
+        self.report_visible = visible
+        if visible and self.report_outdated:
+            self.update_report()
+
+    def update_report(self):
+        """Calculate a new report in the background, or when the dock is shown if it is hidden"""
+        if not self.report_visible:
+            # Snapshots are taken in the GUI thread, so don't take them for a hidden report
+            self.report_outdated = True
+            return
+        self.report_outdated = False
+        self.report_number += 1
+        number = self.report_number
+        # The datasets are only read here: the report is calculated from the snapshot in the background
+        snapshot = MemoryReport.take_snapshot(self.appctx.datasets)
+
+        def set_report(report):
+            report.cache_column_bytes()
+            # Ignore the result if another update was started while it was being calculated
+            if number == self.report_number:
+                self.show_report(report)
+
+        BackgroundThread.run_in_background(
+            function=lambda: MemoryReport(snapshot),
+            slot=set_report,
+            error_slot=lambda e: self.appctx.log_info(
+                f"Error calculating memory usage: {e}"
+            ),
+        )
+
+    def show_report(self, report: MemoryReport):
+        self.report = report
+        # Process
+        rss = "unknown" if report.rss is None else format_bytes(report.rss)
+        self.process_label.setText(
+            f"Process memory: {rss}\nDatasets in memory: {format_bytes(report.get_total_owned())}"
+        )
+        # Datasets, keeping the selected one
+        selected = self.get_selected_dataset()
+        self.datasets_table.blockSignals(True)
+        self.datasets_table.setRowCount(len(report.datasets))
+        for row, values in enumerate(report.datasets.itertuples(index=False)):
+            if values.location == "Disk":
+                location = f"Disk ({format_bytes(values.disk_bytes)})"
+            else:
+                location = values.location
+            cells = [
+                values.dataset,
+                f"{values.rows:,}",
+                f"{values.variables:,}",
+                location,
+                format_bytes(values.owned_bytes),
+                format_bytes(values.shared_bytes),
+            ]
+            for col, text in enumerate(cells):
+                self.datasets_table.setItem(row, col, QTableWidgetItem(text))
+            if values.dataset == selected:
+                self.datasets_table.selectRow(row)
+        self.datasets_table.resizeColumnsToContents()
+        self.datasets_table.blockSignals(False)
+        self.btn_export.setEnabled(True)
+        self.show_variables()
+
+    def get_selected_dataset(self):
+        """Name of the dataset selected in the table, or None"""
+        rows = self.datasets_table.selectionModel().selectedRows()
+        if len(rows) == 0:
+            return None
+        return self.datasets_table.item(rows[0].row(), 0).text()
+
+    def show_variables(self):
+        """Show the variables of the selected dataset"""
+        name = self.get_selected_dataset()
+        self.variables_table.setSortingEnabled(False)
+        if self.report is None or name not in self.report.variables:
+            self.variables_label.setText("Select a dataset to show its variables")
+            self.variables_table.setRowCount(0)
+            return
+        variables = self.report.variables[name]
+        self.variables_label.setText(f"Variables in '{name}'")
+        self.variables_table.setRowCount(len(variables))
+        for row, values in enumerate(variables.itertuples(index=False)):
+            cells = [
+                QTableWidgetItem(str(values.variable)),
+                QTableWidgetItem(values.dtype),
+                BytesItem(values.bytes),
+                QTableWidgetItem("Yes" if values.shared else "No"),
+            ]
+            for col, item in enumerate(cells):
+                self.variables_table.setItem(row, col, item)
+        self.variables_table.resizeColumnsToContents()
+        self.variables_table.setSortingEnabled(True)
+
+    def export_report(self):
+        """Save the report as TSV files"""
+        options = QFileDialog.Options()
+        options |= QFileDialog.DontUseNativeDialog
+        filename, _ = QFileDialog.getSaveFileName(
+            self,
+            "Export Memory Report",
+            "memory_report.tsv",
+            "TSV Files (*.tsv)",
+            options=options,
+        )
+
+        # Return without doing anything if a valid file wasn't selected
+        if not filename:
+            return
+
+        report = self.report
+        RunProgress.run_with_progress(
+            progress_str="Saving Memory Report...",
+            function=lambda: report.to_tsv(filename),
+            slot=None,
+            parent=self,
+        )
+        self.appctx.log_info(
+            f"Saved memory report to '{filename}' (variables in the '.variables.tsv' file)"
+        )
+
+
+class BytesItem(QTableWidgetItem):
+    """Table item showing a formatted number of bytes, which sorts by the number rather than the text"""
+
+    def __init__(self, num: int):
+        super(BytesItem, self).__init__(format_bytes(num))
+        self.num = num
+
+    def __lt__(self, other):
+        if isinstance(other, BytesItem):
+            return self.num < other.num
+        return super(BytesItem, self).__lt__(other)
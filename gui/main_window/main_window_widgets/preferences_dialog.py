@@ -1,3 +1,6 @@
+import tempfile
+from typing import Optional
+
 from PyQt5.QtCore import QSettings, pyqtSignal
 from PyQt5.QtGui import QFont, QColor
 from PyQt5.QtWidgets import (
@@ -12,7 +15,11 @@ from PyQt5.QtWidgets import (
     QSpinBox,
     QHBoxLayout,
     QPushButton,
+    QCheckBox,
+    QLineEdit,
+    QFileDialog,
 )
+from gui.models import AppSettings, ParseCache, format_bytes
 from gui.widgets.utilities import ColorPickerWidget, FontPickerWidget
 
 
@@ -40,6 +47,8 @@ class PreferencesDialog(QDialog):
         self.tabs.setTabPosition(QTabWidget.North)
         self.tab_display = DisplayTab(self)
         self.tabs.addTab(self.tab_display, "Display")
+        self.tab_data = DataTab(self)
+        self.tabs.addTab(self.tab_data, "Data")
         layout.addWidget(self.tabs)
 
         # Bottom row of buttons
@@ -64,8 +73,9 @@ class PreferencesDialog(QDialog):
     def submit(self):
         # Write settings from each tab
         self.tab_display.write_settings()
-        # Refresh the display
-        self.appctx.data_model.refresh()
+        self.tab_data.write_settings()
+        # Update the settings used by the rest of the app
+        self.appctx.update_settings()
         # Close the dialog
         self.accept()
 
@@ -76,6 +86,11 @@ class PreferencesDialog(QDialog):
         w.refresh_ui()
 
 
+def get_default_settings(appctx) -> AppSettings:
+    """The default settings, which are only defined in AppSettings.load_defaults"""
+    return AppSettings(appctx.ORG, appctx.APPLICATION, read=False)
+
+
 class DisplayTab(QWidget):
     """
     Widget that holds the display settings.
@@ -91,67 +106,21 @@ class DisplayTab(QWidget):
         self.setup_ui()
 
     def load_default_settings(self):
-        # display/header
-        self.header_font = QFont(
-            "sans-serif", pointSize=12, weight=QFont.Bold, italic=False
-        )
-        # display/index
-        self.index_font = QFont(
-            "sans-serif", pointSize=10, weight=QFont.Normal, italic=False
-        )
-        # display/data
-        self.data_font = QFont(
-            "sans-serif", pointSize=10, weight=QFont.Normal, italic=False
-        )
-        self.data_bgcolor_unknown = QColor.fromRgb(255, 255, 255)
-        self.data_bgcolor_binary = QColor.fromRgb(255, 204, 153)
-        self.data_bgcolor_categorical = QColor.fromRgb(153, 204, 255)
-        self.data_bgcolor_continuous = QColor.fromRgb(204, 153, 255)
-        self.data_float_precision = 3
-
-    def read_settings(self):
-        # Load default settings first
-        self.load_default_settings()
-
-        # Override with any saved settings
-        settings = QSettings(self.appctx.ORG, self.appctx.APPLICATION)
-
-        # Read Header Settings
-        settings.beginGroup("display/header")
-        self.header_font = QFont(settings.value("font", defaultValue=self.header_font))
-        settings.endGroup()
-
-        # Read Index Settings
-        settings.beginGroup("display/index")
-        self.index_font = QFont(settings.value("font", defaultValue=self.index_font))
-        settings.endGroup()
-
-        # Read Data Settings
-        settings.beginGroup("display/data")
-        # Font
-        self.data_font = QFont(settings.value("font", defaultValue=self.data_font))
-        # Colors
-        self.data_bgcolor_unknown = QColor(
-            settings.value("bgcolor_unknown", defaultValue=self.data_bgcolor_unknown)
-        )
-        self.data_bgcolor_binary = QColor(
-            settings.value("bgcolor_binary", defaultValue=self.data_bgcolor_binary)
-        )
-        self.data_bgcolor_categorical = QColor(
-            settings.value(
-                "bgcolor_categorical", defaultValue=self.data_bgcolor_categorical
-            )
-        )
-        self.data_bgcolor_continuous = QColor(
-            settings.value(
-                "bgcolor_continuous", defaultValue=self.data_bgcolor_continuous
-            )
-        )
-        # Float Precision
-        self.data_float_precision = settings.value(
-            "float_precision", defaultValue=self.data_float_precision
-        )
-        settings.endGroup()
+        self.read_settings(get_default_settings(self.appctx))
+
+    def read_settings(self, settings: Optional[AppSettings] = None):
+        # Start from the current settings, unless others (such as the defaults) are given
+        if settings is None:
+            settings = self.appctx.settings
+        self.header_font = QFont(settings.header_font)
+        self.index_font = QFont(settings.index_font)
+        self.data_font = QFont(settings.data_font)
+        self.data_bgcolor_unknown = QColor(settings.data_bgcolor_unknown)
+        self.data_bgcolor_binary = QColor(settings.data_bgcolor_binary)
+        self.data_bgcolor_categorical = QColor(settings.data_bgcolor_categorical)
+        self.data_bgcolor_continuous = QColor(settings.data_bgcolor_continuous)
+        self.data_float_precision = settings.data_float_precision
+        self.fast_rendering = settings.fast_rendering
 
     def write_settings(self):
         settings = QSettings(self.appctx.ORG, self.appctx.APPLICATION)
@@ -174,6 +143,7 @@ class DisplayTab(QWidget):
         settings.setValue("bgcolor_categorical", self.data_bgcolor_categorical)
         settings.setValue("bgcolor_continuous", self.data_bgcolor_continuous)
         settings.setValue("float_precision", self.data_float_precision)
+        settings.setValue("fast_rendering", self.fast_rendering)
         settings.endGroup()
 
     def setup_ui(self):
@@ -253,6 +223,13 @@ class DisplayTab(QWidget):
         precision_layout.addWidget(self.float_precision_sb)
         table_data_layout.addLayout(precision_layout)
 
+        # Fast rendering
+        self.fast_rendering_cb = QCheckBox(
+            "Fast rendering (format and color cells in cached blocks)"
+        )
+        self.fast_rendering_cb.setChecked(self.fast_rendering)
+        table_data_layout.addWidget(self.fast_rendering_cb)
+
         # Connections
         # Header
         self.header_font_picker.font_changed.connect(self.update_header_font)
@@ -287,6 +264,8 @@ class DisplayTab(QWidget):
         )
         # Data - Precision
         self.float_precision_sb.valueChanged.connect(self.update_float_precision)
+        # Data - Fast Rendering
+        self.fast_rendering_cb.toggled.connect(self.update_fast_rendering)
 
     def refresh_ui(self):
         """Adjust the UI to match the current settings"""
@@ -309,6 +288,7 @@ class DisplayTab(QWidget):
             color=self.data_bgcolor_continuous, font=self.data_font
         )
         self.float_precision_sb.setValue(self.data_float_precision)
+        self.fast_rendering_cb.setChecked(self.fast_rendering)
 
     # Setting update slots #
     ########################
@@ -339,3 +319,288 @@ class DisplayTab(QWidget):
 
     def update_float_precision(self, value):
         self.data_float_precision = value
+
+    def update_fast_rendering(self, checked: bool):
+        self.fast_rendering = checked
+
+
+class DataTab(QWidget):
+    """
+    Widget that holds settings for how data is handled.
+    """
+
+    # Settings groups controlled in this tab
+    GROUP = "data"
+
+    def __init__(self, *args, **kwargs):
+        super(DataTab, self).__init__(*args, **kwargs)
+        self.appctx = self.parent().appctx
+        self.read_settings()
+        self.setup_ui()
+
+    def load_default_settings(self):
+        self.read_settings(get_default_settings(self.appctx))
+
+    def read_settings(self, settings: Optional[AppSettings] = None):
+        # Start from the current settings, unless others (such as the defaults) are given
+        if settings is None:
+            settings = self.appctx.settings
+        self.lazy_loading = settings.lazy_loading
+        self.page_size = settings.page_size
+        self.out_of_core = settings.out_of_core
+        self.scratch_dir = settings.scratch_dir
+        self.memory_budget = settings.memory_budget
+        self.parse_cache = settings.parse_cache
+        self.parse_cache_dir = settings.parse_cache_dir
+        self.parse_cache_size = settings.parse_cache_size
+        self.autosave = settings.autosave
+        self.autosave_delay = settings.autosave_delay
+
+    def write_settings(self):
+        settings = QSettings(self.appctx.ORG, self.appctx.APPLICATION)
+        settings.beginGroup("data")
+        settings.setValue("lazy_loading", self.lazy_loading)
+        settings.setValue("page_size", self.page_size)
+        settings.setValue("out_of_core", self.out_of_core)
+        settings.setValue("scratch_dir", self.scratch_dir)
+        settings.setValue("memory_budget", self.memory_budget)
+        settings.setValue("parse_cache", self.parse_cache)
+        settings.setValue("parse_cache_dir", self.parse_cache_dir)
+        settings.setValue("parse_cache_size", self.parse_cache_size)
+        settings.setValue("autosave", self.autosave)
+        settings.setValue("autosave_delay", self.autosave_delay)
+        settings.endGroup()
+
+    def setup_ui(self):
+        layout = QVBoxLayout()
+        self.setLayout(layout)
+
+        # Large Datasets #
+        ##################
+        large_data_group = QGroupBox("Large Datasets", parent=self)
+        large_data_layout = QVBoxLayout()
+        large_data_group.setLayout(large_data_layout)
+        layout.addWidget(large_data_group)
+
+        # Lazy loading
+        self.lazy_loading_cb = QCheckBox(
+            "Show rows and columns in pages as the table is scrolled"
+        )
+        self.lazy_loading_cb.setChecked(self.lazy_loading)
+        large_data_layout.addWidget(self.lazy_loading_cb)
+
+        # Page size
+        self.page_size_sb = QSpinBox()
+        self.page_size_sb.setRange(100, 100000)
+        self.page_size_sb.setSingleStep(100)
+        self.page_size_sb.setValue(self.page_size)
+        self.page_size_sb.setEnabled(self.lazy_loading)
+        page_size_layout = QHBoxLayout()
+        page_size_layout.addWidget(QLabel("Page Size:"))
+        page_size_layout.addWidget(self.page_size_sb)
+        large_data_layout.addLayout(page_size_layout)
+
+        # Storage #
+        ###########
+        storage_group = QGroupBox("Storage", parent=self)
+        storage_layout = QVBoxLayout()
+        storage_group.setLayout(storage_layout)
+        layout.addWidget(storage_group)
+
+        # Out-of-core
+        self.out_of_core_cb = QCheckBox(
+            "Keep datasets on disk, reading them into memory only as needed"
+        )
+        self.out_of_core_cb.setChecked(self.out_of_core)
+        storage_layout.addWidget(self.out_of_core_cb)
+
+        # Scratch directory
+        self.scratch_dir_le = QLineEdit(self.scratch_dir)
+        self.scratch_dir_le.setPlaceholderText(tempfile.gettempdir())
+        self.scratch_dir_btn = QPushButton("Browse")
+        scratch_dir_layout = QHBoxLayout()
+        scratch_dir_layout.addWidget(QLabel("Scratch Directory:"))
+        scratch_dir_layout.addWidget(self.scratch_dir_le)
+        scratch_dir_layout.addWidget(self.scratch_dir_btn)
+        storage_layout.addLayout(scratch_dir_layout)
+
+        # Memory budget
+        self.memory_budget_sb = QSpinBox()
+        self.memory_budget_sb.setRange(0, 1024 * 1024)
+        self.memory_budget_sb.setSingleStep(256)
+        self.memory_budget_sb.setSuffix(" MB")
+        self.memory_budget_sb.setSpecialValueText("No limit")
+        self.memory_budget_sb.setValue(self.memory_budget)
+        self.memory_budget_sb.setToolTip(
+            "Datasets that weren't viewed recently are moved to the scratch directory "
+            "when the data in memory is larger than this"
+        )
+        memory_budget_layout = QHBoxLayout()
+        memory_budget_layout.addWidget(QLabel("Memory Budget:"))
+        memory_budget_layout.addWidget(self.memory_budget_sb)
+        storage_layout.addLayout(memory_budget_layout)
+
+        # Parse Cache #
+        ###############
+        parse_cache_group = QGroupBox("Parse Cache", parent=self)
+        parse_cache_layout = QVBoxLayout()
+        parse_cache_group.setLayout(parse_cache_layout)
+        layout.addWidget(parse_cache_group)
+
+        # Enabled
+        self.parse_cache_cb = QCheckBox(
+            "Save data parsed from text files, so that loading them again is faster"
+        )
+        self.parse_cache_cb.setChecked(self.parse_cache)
+        parse_cache_layout.addWidget(self.parse_cache_cb)
+
+        # Cache directory
+        self.parse_cache_dir_le = QLineEdit(self.parse_cache_dir)
+        self.parse_cache_dir_le.setPlaceholderText(self.appctx.get_parse_cache_dir())
+        self.parse_cache_dir_btn = QPushButton("Browse")
+        parse_cache_dir_layout = QHBoxLayout()
+        parse_cache_dir_layout.addWidget(QLabel("Cache Directory:"))
+        parse_cache_dir_layout.addWidget(self.parse_cache_dir_le)
+        parse_cache_dir_layout.addWidget(self.parse_cache_dir_btn)
+        parse_cache_layout.addLayout(parse_cache_dir_layout)
+
+        # Cache size
+        self.parse_cache_size_sb = QSpinBox()
+        self.parse_cache_size_sb.setRange(0, 1024 * 1024)
+        self.parse_cache_size_sb.setSingleStep(256)
+        self.parse_cache_size_sb.setSuffix(" MB")
+        self.parse_cache_size_sb.setValue(self.parse_cache_size)
+        self.parse_cache_size_sb.setToolTip(
+            "The least recently used files are removed from the cache when it is larger than this"
+        )
+        self.parse_cache_clear_btn = QPushButton("Clear Cache")
+        parse_cache_size_layout = QHBoxLayout()
+        parse_cache_size_layout.addWidget(QLabel("Maximum Size:"))
+        parse_cache_size_layout.addWidget(self.parse_cache_size_sb)
+        parse_cache_size_layout.addWidget(self.parse_cache_clear_btn)
+        parse_cache_layout.addLayout(parse_cache_size_layout)
+
+        # Autosave #
+        ############
+        autosave_group = QGroupBox("Autosave", parent=self)
+        autosave_layout = QVBoxLayout()
+        autosave_group.setLayout(autosave_layout)
+        layout.addWidget(autosave_group)
+
+        # Enabled
+        self.autosave_cb = QCheckBox(
+            "Save changed datasets in the background, so they can be recovered if the app crashes"
+        )
+        self.autosave_cb.setChecked(self.autosave)
+        autosave_layout.addWidget(self.autosave_cb)
+
+        # Delay
+        self.autosave_delay_sb = QSpinBox()
+        self.autosave_delay_sb.setRange(5, 3600)
+        self.autosave_delay_sb.setSingleStep(15)
+        self.autosave_delay_sb.setSuffix(" seconds")
+        self.autosave_delay_sb.setValue(self.autosave_delay)
+        self.autosave_delay_sb.setEnabled(self.autosave)
+        self.autosave_delay_sb.setToolTip(
+            "Datasets are saved once nothing has changed for this long"
+        )
+        autosave_delay_layout = QHBoxLayout()
+        autosave_delay_layout.addWidget(QLabel("Delay:"))
+        autosave_delay_layout.addWidget(self.autosave_delay_sb)
+        autosave_layout.addLayout(autosave_delay_layout)
+
+        layout.addStretch()
+
+        # Connections
+        self.lazy_loading_cb.toggled.connect(self.update_lazy_loading)
+        self.page_size_sb.valueChanged.connect(self.update_page_size)
+        self.out_of_core_cb.toggled.connect(self.update_out_of_core)
+        self.scratch_dir_le.textChanged.connect(self.update_scratch_dir)
+        self.scratch_dir_btn.clicked.connect(self.launch_dlg_get_scratch_dir)
+        self.memory_budget_sb.valueChanged.connect(self.update_memory_budget)
+        self.parse_cache_cb.toggled.connect(self.update_parse_cache)
+        self.parse_cache_dir_le.textChanged.connect(self.update_parse_cache_dir)
+        self.parse_cache_dir_btn.clicked.connect(self.launch_dlg_get_parse_cache_dir)
+        self.parse_cache_size_sb.valueChanged.connect(self.update_parse_cache_size)
+        self.parse_cache_clear_btn.clicked.connect(self.clear_parse_cache)
+        self.autosave_cb.toggled.connect(self.update_autosave)
+        self.autosave_delay_sb.valueChanged.connect(self.update_autosave_delay)
+
+    def refresh_ui(self):
+        """Adjust the UI to match the current settings"""
+        self.lazy_loading_cb.setChecked(self.lazy_loading)
+        self.page_size_sb.setValue(self.page_size)
+        self.page_size_sb.setEnabled(self.lazy_loading)
+        self.out_of_core_cb.setChecked(self.out_of_core)
+        self.scratch_dir_le.setText(self.scratch_dir)
+        self.memory_budget_sb.setValue(self.memory_budget)
+        self.parse_cache_cb.setChecked(self.parse_cache)
+        self.parse_cache_dir_le.setText(self.parse_cache_dir)
+        self.parse_cache_size_sb.setValue(self.parse_cache_size)
+        self.autosave_cb.setChecked(self.autosave)
+        self.autosave_delay_sb.setValue(self.autosave_delay)
+        self.autosave_delay_sb.setEnabled(self.autosave)
+
+    # Setting update slots #
+    ########################
+
+    def update_lazy_loading(self, checked: bool):
+        self.lazy_loading = checked
+        self.page_size_sb.setEnabled(checked)
+
+    def update_page_size(self, value):
+        self.page_size = value
+
+    def update_out_of_core(self, checked: bool):
+        self.out_of_core = checked
+
+    def update_scratch_dir(self, text: str):
+        self.scratch_dir = text.strip()
+
+    def update_memory_budget(self, value):
+        self.memory_budget = value
+
+    def update_parse_cache(self, checked: bool):
+        self.parse_cache = checked
+
+    def update_parse_cache_dir(self, text: str):
+        self.parse_cache_dir = text.strip()
+
+    def update_parse_cache_size(self, value):
+        self.parse_cache_size = value
+
+    def update_autosave(self, checked: bool):
+        self.autosave = checked
+        self.autosave_delay_sb.setEnabled(checked)
+
+    def update_autosave_delay(self, value):
+        self.autosave_delay = value
+
+    def clear_parse_cache(self):
+        """Remove everything from the (currently saved) parse cache directory"""
+        cache = ParseCache(self.appctx.get_parse_cache_dir(), 0)
+        cleared_bytes = cache.get_total_bytes()
+        cache.clear()
+        self.appctx.log_info(
+            f"Cleared {format_bytes(cleared_bytes)} from the parse cache in '{cache.path}'"
+        )
+
+    def launch_dlg_get_parse_cache_dir(self):
+        """Launch a dialog to select the parse cache directory"""
+        options = QFileDialog.Options()
+        options |= QFileDialog.DontUseNativeDialog
+        directory = QFileDialog.getExistingDirectory(
+            self, "Parse Cache Directory", self.parse_cache_dir, options=options
+        )
+        if directory:
+            self.parse_cache_dir_le.setText(directory)
+
+    def launch_dlg_get_scratch_dir(self):
+        """Launch a dialog to select the scratch directory"""
+        options = QFileDialog.Options()
+        options |= QFileDialog.DontUseNativeDialog
+        directory = QFileDialog.getExistingDirectory(
+            self, "Scratch Directory", self.scratch_dir, options=options
+        )
+        if directory:
+            self.scratch_dir_le.setText(directory)
@@ -1,2 +1,41 @@
-from .dataset_model import Dataset
+from .dataset_model import Dataset, DatasetStats, format_bytes
 from .df_model import PandasDFModel
+from .settings_model import AppSettings
+from .column_store import ColumnStore, ZipColumnStore
+from .history import DataDiff
+from .session import save_session, read_session
+from .autosave import Autosave
+from .text_reader import (
+    COMPRESSIONS,
+    get_compression,
+    preview_text_file,
+    read_columns,
+    read_text_file,
+)
+from .binary_reader import (
+    get_binary_columns,
+    get_hdf_keys,
+    get_read_code,
+    get_row_group_count,
+    parse_row_groups,
+    read_binary_file,
+)
+from .dtypes import (
+    apply_dtypes,
+    compact_data,
+    compact_dtypes,
+    dtypes_to_json,
+    json_to_dtypes,
+    read_dtypes,
+    write_dtypes,
+)
+from .parse_cache import ParseCache
+from .data_writer import (
+    EXPORT_FORMATS,
+    check_export_requirement,
+    get_write_code,
+    write_data_file,
+)
+from .xport_reader import get_xport_info, get_xport_read_code, read_xport_file
+from .batch_reader import BATCH_AXES, find_batch_files, join_frames, read_batch
+from .memory_report import MemoryReport, get_process_rss
@@ -0,0 +1,130 @@
+import json
+import os
+import shutil
+import tempfile
+import time
+from pathlib import Path
+from typing import List, Optional, Set, Tuple, Union
+
+import pandas as pd
+
+from .column_store import ColumnStore
+from .dataset_model import Dataset
+
+AUTOSAVE_FORMAT = 2
+
+
+class Autosave:
+    """
+    The latest autosaved copy (checkpoint) of the datasets, in a directory: one ColumnStore per dataset plus a
+    'manifest.json' file with the dataset names, kinds, numbers and types and any other info (such as logs),
+    like a session file.
+
+    Only datasets that changed since the previous checkpoint are written, each to a new folder.
+    The manifest is replaced after the data is written and old folders are removed last, so the directory
+    always holds a complete checkpoint even if the app crashes while writing one.
+    """
+
+    MANIFEST_FILE = "manifest.json"
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.folders = dict()  # Dataset -> folder holding its latest saved data
+
+    def take_snapshot(
+        self, datasets: List[Dataset], changed: Set[Dataset]
+    ) -> List[dict]:
+        """
+        Record what a checkpoint needs from each dataset, including the data of changed datasets (and any that were
+        never saved).  This must be done in the GUI thread, where datasets are changed (or moved to disk):
+        the checkpoint is then written from the snapshot in the background (see write).
+        """
+        snapshot = []
+        for dataset in datasets:
+            data = None  # Not written
+            if dataset in changed or dataset not in self.folders:
+                # Data on disk is read when it is written
+                data = dataset.store if dataset.is_on_disk() else dataset.df
+            snapshot.append(
+                {
+                    "dataset": dataset,
+                    "name": dataset.name,
+                    "kind": dataset.kind,
+                    "number": dataset.number,
+                    "types": [str(t) for t in dataset.get_types()],
+                    "data": data,
+                }
+            )
+        return snapshot
+
+    def write(self, snapshot: List[dict], info: dict) -> int:
+        """Write a checkpoint from a snapshot (see take_snapshot), returning the number of datasets whose data was written"""
+        self.path.mkdir(parents=True, exist_ok=True)
+        manifest = dict(info, format=AUTOSAVE_FORMAT, time=time.time(), datasets=[])
+        written = 0
+        for item in snapshot:
+            dataset = item["dataset"]
+            data: Union[pd.DataFrame, ColumnStore, None] = item["data"]
+            if data is not None:
+                folder = tempfile.mkdtemp(
+                    prefix=f"dataset_{item['number']}_", dir=self.path
+                )
+                if isinstance(data, ColumnStore):
+                    data = data.load()
+                ColumnStore.write(data, folder)
+                self.folders[dataset] = Path(folder).name
+                written += 1
+            manifest["datasets"].append(
+                {
+                    "name": item["name"],
+                    "kind": item["kind"],
+                    "number": item["number"],
+                    "folder": self.folders[dataset],
+                    "types": item["types"],
+                }
+            )
+        # Replace the manifest in one step
+        fd, temp_filename = tempfile.mkstemp(suffix=".tmp", dir=self.path)
+        with os.fdopen(fd, "w") as f:
+            json.dump(manifest, f)
+        os.replace(temp_filename, self.path / self.MANIFEST_FILE)
+        # Remove data that is no longer used
+        self.folders = {
+            item["dataset"]: self.folders[item["dataset"]] for item in snapshot
+        }
+        used = set(self.folders.values())
+        for entry in self.path.iterdir():
+            if entry.is_dir() and entry.name not in used:
+                shutil.rmtree(entry, ignore_errors=True)
+        return written
+
+    def read_manifest(self) -> Optional[dict]:
+        """Read the manifest of the checkpoint, or return None if there isn't a (supported) checkpoint"""
+        try:
+            with (self.path / self.MANIFEST_FILE).open() as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if manifest.get("format") != AUTOSAVE_FORMAT:
+            return None
+        return manifest
+
+    def read(self) -> Tuple[dict, List[Dataset]]:
+        """
+        Read the checkpoint, returning the session info and the datasets (like read_session).
+        Only the schema and index of each dataset are read: the data is read when it is first used.
+        """
+        session = self.read_manifest()
+        if session is None:
+            raise ValueError(f"There is no autosaved data in '{self.path}'")
+        datasets = []
+        for info in session.pop("datasets"):
+            store = ColumnStore(self.path / info["folder"])
+            types = pd.Series(info["types"], index=store.columns)
+            dataset = Dataset.from_store(info["name"], info["kind"], store, types)
+            dataset.set_number(info["number"])
+            datasets.append(dataset)
+        return session, datasets
+
+    def delete(self):
+        shutil.rmtree(self.path, ignore_errors=True)
@@ -0,0 +1,120 @@
+import glob
+import multiprocessing
+import os
+import sys
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pathlib import Path
+from typing import Callable, List, Optional, Union
+
+import pandas as pd
+
+from .text_reader import COMPRESSIONS
+
+# How files are joined: stacking their rows (observations) or aligning their columns (variables) on the index
+BATCH_AXES = {"observations": 0, "variables": 1}
+
+
+def find_batch_files(path: str, extensions: List[str]) -> List[str]:
+    """
+    List the files to load in a batch, sorted by name.
+    The path is either a folder (all files with one of the extensions, possibly compressed) or a glob pattern.
+    """
+    if os.path.isdir(path):
+        suffixes = tuple(
+            [e.lower() for e in extensions]
+            + [e.lower() + c for e in extensions for c in COMPRESSIONS]
+        )
+        return sorted(
+            str(f)
+            for f in Path(path).iterdir()
+            if f.is_file() and f.name.lower().endswith(suffixes)
+        )
+    return sorted(f for f in glob.glob(path) if os.path.isfile(f))
+
+
+def read_batch(
+    filenames: List[str],
+    sep: str,
+    index_col: Union[int, str, None],
+    join_on: str,
+    how: str = "outer",
+    set_percent: Optional[Callable[[int], None]] = None,
+    is_cancelled: Optional[Callable[[], bool]] = None,
+    max_workers: Optional[int] = None,
+) -> Optional[pd.DataFrame]:
+    """
+    Read several delimited text files in parallel worker processes and join them into one DataFrame.
+
+    Parameters
+    ----------
+    join_on: 'observations' to stack the rows of each file, or 'variables' to align the columns of each file by index
+    how: 'outer' to keep all variables (or observations) or 'inner' to keep only those found in every file
+    set_percent: Called with the percent of files that have been read
+    is_cancelled: Checked while waiting for files to be read.  If it returns True, the remaining files are skipped.
+
+    Returns
+    -------
+    The data, or None if it was cancelled
+    """
+    if len(filenames) == 0:
+        raise ValueError("No files were found to load")
+    if max_workers is None:
+        max_workers = min(len(filenames), os.cpu_count() or 1)
+    frames = [None] * len(filenames)
+    # Spawn workers (rather than forking the GUI process).  They only need to import pandas.
+    pool = ProcessPoolExecutor(
+        max_workers=max_workers, mp_context=multiprocessing.get_context("spawn")
+    )
+    finished = False
+    try:
+        futures = {
+            pool.submit(pd.read_csv, filename, sep=sep, index_col=index_col): i
+            for i, filename in enumerate(filenames)
+        }
+        pending = set(futures)
+        while len(pending) > 0:
+            if is_cancelled is not None and is_cancelled():
+                return None
+            done, pending = wait(pending, timeout=0.5, return_when=FIRST_COMPLETED)
+            for future in done:
+                frames[futures[future]] = future.result()
+            if set_percent is not None:
+                set_percent(int(100 * (len(futures) - len(pending)) / len(futures)))
+        finished = True
+    finally:
+        if finished:
+            pool.shutdown(wait=True)
+        else:
+            stop_pool(pool)
+    return join_frames(frames, join_on, how)
+
+
+def stop_pool(pool: ProcessPoolExecutor):
+    """Stop a process pool without waiting: skip any files that weren't started and end the workers reading others"""
+    # The pool forgets its worker processes once it is shut down
+    processes = list((pool._processes or {}).values())
+    if sys.version_info >= (3, 9):
+        pool.shutdown(wait=False, cancel_futures=True)
+    else:
+        for future in pool._pending_work_items.values():
+            future.future.cancel()
+        pool.shutdown(wait=False)
+    for process in processes:
+        process.terminate()
+
+
+def join_frames(frames: List[pd.DataFrame], join_on: str, how: str) -> pd.DataFrame:
+    """
+    Join the frames in a single concat (instead of merging them in pairs).
+    Raises a ValueError if observations (or variables) would be repeated.
+    """
+    axis = BATCH_AXES[join_on]
+    labels = [df.index if axis == 0 else df.columns for df in frames]
+    labels = labels[0].append(labels[1:])
+    repeated = labels[labels.duplicated()].unique()
+    if len(repeated) > 0:
+        raise ValueError(
+            f"{len(repeated):,} {join_on} are found more than once "
+            f"(such as {', '.join([str(label) for label in repeated[:5]])})"
+        )
+    return pd.concat(frames, axis=axis, join=how, sort=False)
@@ -0,0 +1,159 @@
+from typing import List, Optional
+
+import pandas as pd
+
+# Package needed to read each kind of file
+BINARY_REQUIREMENTS = {"Parquet": "pyarrow", "Feather": "pyarrow", "HDF5": "tables"}
+
+
+def check_requirement(kind: str):
+    """Raise an ImportError with a helpful message if the package needed to read the kind of file isn't installed"""
+    package = BINARY_REQUIREMENTS[kind]
+    try:
+        __import__(package)
+    except ImportError:
+        raise ImportError(
+            f"Loading {kind} files requires the '{package}' package, which isn't installed"
+        )
+
+
+def get_hdf_keys(filename: str) -> List[str]:
+    """List the datasets stored in an HDF5 file"""
+    with pd.HDFStore(filename, mode="r") as store:
+        return list(store.keys())
+
+
+def is_hdf_table(filename: str, key: Optional[str] = None) -> bool:
+    """Whether a dataset in an HDF5 file is saved in the 'table' format (rather than the 'fixed' format)"""
+    with pd.HDFStore(filename, mode="r") as store:
+        return store.get_storer(key).is_table
+
+
+def get_row_group_count(filename: str) -> int:
+    """Number of row groups in a Parquet file"""
+    import pyarrow.parquet as pq
+
+    return pq.ParquetFile(filename).num_row_groups
+
+
+def get_binary_columns(kind: str, filename: str, key: Optional[str] = None) -> List:
+    """List the columns of a file without reading the data (excluding any saved index)"""
+    check_requirement(kind)
+    if kind == "Parquet":
+        import pyarrow.parquet as pq
+
+        schema = pq.ParquetFile(filename).schema_arrow
+        index_columns = (schema.pandas_metadata or {}).get("index_columns", [])
+        return [name for name in schema.names if name not in index_columns]
+    elif kind == "Feather":
+        import pyarrow.ipc
+
+        with pyarrow.ipc.open_file(filename) as reader:
+            return list(reader.schema.names)
+    elif kind == "HDF5":
+        with pd.HDFStore(filename, mode="r") as store:
+            storer = store.get_storer(key)
+            if storer.is_table:
+                return list(storer.non_index_axes[0][1])
+            elif storer.pandas_kind != "frame":
+                raise ValueError(f"'{key}' isn't a DataFrame")
+            # Only read the columns axis of the 'fixed' format, not the data
+            return list(storer.read_index("axis0"))
+    else:
+        raise ValueError(f"{kind} isn't a supported file type")
+
+
+def read_binary_file(
+    kind: str,
+    filename: str,
+    columns: Optional[List] = None,
+    row_groups: Optional[List[int]] = None,
+    key: Optional[str] = None,
+    where: Optional[str] = None,
+) -> pd.DataFrame:
+    """
+    Read a Parquet, Feather or HDF5 file, keeping the saved dtypes (such as categories).
+
+    Parameters
+    ----------
+    columns: Only read these columns (None for all)
+    row_groups: Only read these row groups of a Parquet file (None for all)
+    key: Dataset in an HDF5 file
+    where: Query selecting rows from an HDF5 file saved in the 'table' format
+           (columns can be selected in either format, but the 'fixed' format is read completely first)
+    """
+    check_requirement(kind)
+    if kind == "Parquet":
+        if row_groups is None:
+            return pd.read_parquet(filename, columns=columns)
+        import pyarrow.parquet as pq
+
+        table = pq.ParquetFile(filename).read_row_groups(
+            row_groups, columns=columns, use_pandas_metadata=True
+        )
+        return table.to_pandas()
+    elif kind == "Feather":
+        return pd.read_feather(filename, columns=columns)
+    elif kind == "HDF5":
+        if is_hdf_table(filename, key):
+            return pd.read_hdf(filename, key=key, columns=columns, where=where)
+        elif where is not None:
+            raise ValueError(
+                "Rows can only be selected from HDF5 files saved in the 'table' format"
+            )
+        df = pd.read_hdf(filename, key=key)
+        if columns is not None:
+            df = df[columns]
+        return df
+    else:
+        raise ValueError(f"{kind} isn't a supported file type")
+
+
+def get_read_code(
+    kind: str,
+    filename: str,
+    columns: Optional[List] = None,
+    row_groups: Optional[List[int]] = None,
+    key: Optional[str] = None,
+    where: Optional[str] = None,
+) -> str:
+    """Python code equivalent to read_binary_file"""
+    if kind == "Parquet" and row_groups is not None:
+        return (
+            f"pq.ParquetFile('{filename}').read_row_groups({row_groups!r}, "
+            f"columns={columns!r}, use_pandas_metadata=True).to_pandas()"
+        )
+    elif kind == "Parquet":
+        return f"pd.read_parquet('{filename}', columns={columns!r})"
+    elif kind == "Feather":
+        return f"pd.read_feather('{filename}', columns={columns!r})"
+    elif kind == "HDF5" and is_hdf_table(filename, key):
+        return f"pd.read_hdf('{filename}', key={key!r}, columns={columns!r}, where={where!r})"
+    elif kind == "HDF5" and columns is not None:
+        return f"pd.read_hdf('{filename}', key={key!r})[{columns!r}]"
+    elif kind == "HDF5":
+        return f"pd.read_hdf('{filename}', key={key!r})"
+    else:
+        raise ValueError(f"{kind} isn't a supported file type")
+
+
+def parse_row_groups(text: str, count: int) -> Optional[List[int]]:
+    """
+    Parse row group numbers like '0-3, 7' (ranges include both ends).  Returns None (all row groups) if blank.
+    Raises a ValueError if the text isn't valid or includes a row group that doesn't exist.
+    """
+    if len(text.strip()) == 0:
+        return None
+    row_groups = []
+    for part in text.split(","):
+        if "-" in part:
+            first, last = part.split("-", 1)
+            row_groups.extend(range(int(first), int(last) + 1))
+        else:
+            row_groups.append(int(part))
+    invalid = [r for r in row_groups if r < 0 or r >= count]
+    if len(invalid) > 0:
+        raise ValueError(
+            f"Row group {invalid[0]} doesn't exist (there are {count:,} row groups, starting at 0)"
+        )
+    return row_groups
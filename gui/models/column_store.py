@@ -0,0 +1,339 @@
+import io
+import json
+import os
+import shutil
+import struct
+import zipfile
+import zlib
+from pathlib import Path
+from typing import Iterator, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+class ColumnStore:
+    """
+    A DataFrame saved to a directory as one .npy file per column (and per index level) plus a JSON schema.
+    Numeric, boolean, datetime and categorical columns are memory-mapped, so reading a block of rows only pages
+    that part of the file into memory.  Other columns (such as strings) are saved as UTF-8 encoded JSON and are
+    loaded completely the first time they are read.  Nothing is pickled, so reading a store never runs any code.
+    """
+
+    SCHEMA_FILE = "schema.json"
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.arrays = dict()  # Opened arrays by file name
+        with (self.path / self.SCHEMA_FILE).open("rb") as f:
+            self.schema = read_schema(f.read(), self)
+
+    def __len__(self):
+        return self.schema["nrows"]
+
+    @property
+    def columns(self) -> pd.Index:
+        return self.schema["columns"]
+
+    @property
+    def dtypes(self) -> list:
+        return self.schema["dtypes"]
+
+    @classmethod
+    def write(cls, df: pd.DataFrame, path) -> "ColumnStore":
+        """Write the DataFrame to the (new or empty) directory and return a store reading from it"""
+        path = Path(path)
+        path.mkdir(parents=True, exist_ok=True)
+        for name, array in iter_arrays(df):
+            np.save(path / f"{name}.npy", array)
+        with (path / cls.SCHEMA_FILE).open("wb") as f:
+            f.write(get_schema(df))
+        return cls(path)
+
+    def load_array(self, name: str) -> np.ndarray:
+        """Open a saved array, memory-mapped"""
+        return np.load(self.path / f"{name}.npy", mmap_mode="r")
+
+    def get_array(self, name: str, dtype=None) -> np.ndarray:
+        """Get a saved array, decoding it first if it holds the values of a column with the dtype as JSON"""
+        array = self.arrays.get(name)
+        if array is None:
+            array = self.load_array(name)
+            if dtype is not None and is_json_dtype(dtype):
+                array = from_json(array)
+            self.arrays[name] = array
+        return array
+
+    def read_column(self, position: int, rows: slice = slice(None)):
+        """Read the values of one column, optionally only for a range of rows"""
+        dtype = self.dtypes[position]
+        array = self.get_array(f"column_{position}", dtype)[rows]
+        return from_array(array, dtype)
+
+    def read_index(self, rows: slice = slice(None)) -> pd.Index:
+        """Read the index, optionally only for a range of rows"""
+        levels = [
+            from_array(self.get_array(f"index_{level}", dtype)[rows], dtype)
+            for level, dtype in enumerate(self.schema["index_dtypes"])
+        ]
+        names = self.schema["index_names"]
+        if len(levels) == 1:
+            return pd.Index(levels[0], name=names[0])
+        else:
+            return pd.MultiIndex.from_arrays(levels, names=names)
+
+    def read_block(
+        self, rows: slice = slice(None), columns: slice = slice(None)
+    ) -> pd.DataFrame:
+        """Read a block of rows and columns (selected by position) into a DataFrame"""
+        positions = range(len(self.columns))[columns]
+        data = {
+            i: self.read_column(position, rows) for i, position in enumerate(positions)
+        }
+        df = pd.DataFrame(data, index=self.read_index(rows))
+        df.columns = self.columns[columns]
+        return df
+
+    def load(self, columns: Optional[slice] = None) -> pd.DataFrame:
+        """Read all of the data (or all rows of some columns) into memory"""
+        if columns is None:
+            columns = slice(None)
+        return self.read_block(slice(None), columns)
+
+    def disk_usage(self) -> int:
+        """Total size of the saved files, in bytes"""
+        return sum(f.stat().st_size for f in self.path.iterdir())
+
+    def iter_files(self) -> Iterator[Tuple[str, bytes]]:
+        """Yield the name and contents of each saved file, one at a time (without loading the arrays)"""
+        for f in sorted(self.path.iterdir()):
+            yield f.name, f.read_bytes()
+
+    def delete(self):
+        """Close any open arrays and delete the saved files"""
+        self.arrays = dict()
+        shutil.rmtree(self.path, ignore_errors=True)
+
+
+class ZipColumnStore(ColumnStore):
+    """
+    A ColumnStore saved in a zip file (such as a session file), in a folder named by the prefix.
+    Each array is read into memory from the zip file the first time it is used.  The zip file is never deleted.
+    """
+
+    def __init__(self, zip_path, prefix: str):
+        self.zip_path = Path(zip_path)
+        self.prefix = prefix
+        self.arrays = dict()
+        self.members = dict()  # ZipInfo of each saved file
+        self.zip_stat = None  # When the members were read
+        self.schema = read_schema(self.read_file(self.SCHEMA_FILE), self)
+
+    @classmethod
+    def write_to_zip(cls, df: pd.DataFrame, zf: zipfile.ZipFile, prefix: str):
+        """Write the DataFrame into an open zip file"""
+        for name, array in iter_arrays(df):
+            with zf.open(f"{prefix}/{name}.npy", "w", force_zip64=True) as f:
+                np.save(f, array)
+        zf.writestr(f"{prefix}/{cls.SCHEMA_FILE}", get_schema(df))
+
+    @staticmethod
+    def copy_to_zip(store: ColumnStore, zf: zipfile.ZipFile, prefix: str):
+        """Copy the files of a store into an open zip file, without loading its data"""
+        for name, data in store.iter_files():
+            with zf.open(f"{prefix}/{name}", "w", force_zip64=True) as f:
+                f.write(data)
+
+    def get_members(self) -> dict:
+        """
+        Get the ZipInfo of each saved file, reading the zip file's directory only when the file is first used
+        or was replaced (such as when the session is saved again), so arrays are read directly from their offsets.
+        """
+        stat = os.stat(self.zip_path)
+        zip_stat = (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+        if zip_stat != self.zip_stat:
+            with zipfile.ZipFile(self.zip_path) as zf:
+                self.members = {
+                    info.filename[len(self.prefix) + 1 :]: info
+                    for info in zf.infolist()
+                    if info.filename.startswith(f"{self.prefix}/")
+                }
+            self.zip_stat = zip_stat
+        return self.members
+
+    def read_file(self, name: str) -> bytes:
+        """Read a saved file"""
+        # The zip file is opened for each file, so files may be read from different threads
+        return read_zip_member(self.zip_path, self.get_members()[name])
+
+    def load_array(self, name: str) -> np.ndarray:
+        """Read a saved array into memory"""
+        return np.load(io.BytesIO(self.read_file(f"{name}.npy")))
+
+    def disk_usage(self) -> int:
+        """Total size of the saved files in the zip file, in bytes"""
+        return sum(info.compress_size for info in self.get_members().values())
+
+    def iter_files(self) -> Iterator[Tuple[str, bytes]]:
+        """Yield the name and contents of each saved file, one at a time (without loading the arrays)"""
+        for name in list(self.get_members()):
+            yield name, self.read_file(name)
+
+    def delete(self):
+        """Release any arrays that were read (the zip file is kept)"""
+        self.arrays = dict()
+
+
+def read_zip_member(zip_path, info: zipfile.ZipInfo) -> bytes:
+    """Read a file from a zip file using its ZipInfo, without reading the zip file's directory again"""
+    with open(zip_path, "rb") as f:
+        f.seek(info.header_offset)
+        header = f.read(30)
+        if header[:4] != b"PK\x03\x04":
+            raise ValueError(f"'{info.filename}' wasn't found in '{zip_path}'")
+        # The local header has the lengths of the file name and extra field, which come before the data
+        name_length, extra_length = struct.unpack("<HH", header[26:30])
+        f.seek(info.header_offset + 30 + name_length + extra_length)
+        data = f.read(info.compress_size)
+    if info.compress_type == zipfile.ZIP_DEFLATED:
+        return zlib.decompress(data, -zlib.MAX_WBITS)
+    elif info.compress_type != zipfile.ZIP_STORED:
+        raise ValueError(
+            f"'{info.filename}' in '{zip_path}' uses unsupported compression"
+        )
+    return data
+
+
+def iter_arrays(df: pd.DataFrame) -> Iterator[Tuple[str, np.ndarray]]:
+    """Yield the name and array of each file used to store the DataFrame"""
+    for position, (_, column) in enumerate(df.items()):
+        yield from iter_value_arrays(f"column_{position}", column)
+    for level in range(df.index.nlevels):
+        yield from iter_value_arrays(f"index_{level}", df.index.get_level_values(level))
+
+
+def iter_value_arrays(name: str, values) -> Iterator[Tuple[str, np.ndarray]]:
+    """Yield the arrays used to store a Series or Index (the categories of a categorical are stored separately)"""
+    yield name, to_array(values)
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        yield from iter_value_arrays(f"{name}_categories", values.dtype.categories)
+
+
+def get_schema(df: pd.DataFrame) -> bytes:
+    """Information needed to restore the DataFrame from the saved arrays, as JSON"""
+    schema = {
+        "nrows": len(df),
+        "columns": df.columns.tolist(),
+        "column_nlevels": df.columns.nlevels,
+        "column_names": list(df.columns.names),
+        "dtypes": [to_dtype_info(dtype) for dtype in df.dtypes],
+        "index_names": list(df.index.names),
+        "index_dtypes": [
+            to_dtype_info(df.index.get_level_values(level).dtype)
+            for level in range(df.index.nlevels)
+        ],
+    }
+    return json.dumps(schema, default=to_json_value).encode("utf-8")
+
+
+def read_schema(data: bytes, store: ColumnStore) -> dict:
+    """Read the schema saved by get_schema, reading the categories of any categoricals from the store"""
+    schema = json.loads(data.decode("utf-8"))
+    if schema["column_nlevels"] > 1:
+        columns = pd.MultiIndex.from_tuples(
+            [tuple(c) for c in schema["columns"]], names=schema["column_names"]
+        )
+    else:
+        columns = pd.Index(schema["columns"], name=schema["column_names"][0])
+    return {
+        "nrows": schema["nrows"],
+        "columns": columns,
+        "dtypes": [
+            from_dtype_info(info, store, f"column_{position}")
+            for position, info in enumerate(schema["dtypes"])
+        ],
+        "index_names": schema["index_names"],
+        "index_dtypes": [
+            from_dtype_info(info, store, f"index_{level}")
+            for level, info in enumerate(schema["index_dtypes"])
+        ],
+    }
+
+
+def to_dtype_info(dtype):
+    """Describe a dtype for the schema (categories are saved as an array)"""
+    if isinstance(dtype, pd.CategoricalDtype):
+        return {
+            "categories": to_dtype_info(dtype.categories.dtype),
+            "ordered": bool(dtype.ordered),
+        }
+    return str(dtype)
+
+
+def from_dtype_info(info, store: ColumnStore, name: str):
+    """Restore a dtype described by to_dtype_info"""
+    if isinstance(info, dict):
+        categories_name = f"{name}_categories"
+        categories_dtype = from_dtype_info(info["categories"], store, categories_name)
+        categories = from_array(
+            store.get_array(categories_name, categories_dtype), categories_dtype
+        )
+        return pd.CategoricalDtype(pd.Index(categories), ordered=info["ordered"])
+    return pd.api.types.pandas_dtype(info)
+
+
+def is_json_dtype(dtype) -> bool:
+    """Whether values of the dtype are saved as JSON (python objects, strings and other extension types)"""
+    if isinstance(dtype, (pd.CategoricalDtype, pd.DatetimeTZDtype)):
+        return False
+    return not isinstance(dtype, np.dtype) or dtype == object
+
+
+def to_json_value(value):
+    """Convert values that the json module can't encode (missing values, numpy scalars, etc)"""
+    if value is pd.NA or value is pd.NaT:
+        return None
+    elif isinstance(value, np.generic):
+        return value.item()
+    return str(value)
+
+
+def to_array(values) -> np.ndarray:
+    """Convert a Series or Index into a numpy array that can be saved (categoricals are saved as codes)"""
+    dtype = values.dtype
+    if isinstance(dtype, pd.CategoricalDtype):
+        return np.asarray(pd.Categorical(values).codes)
+    elif isinstance(dtype, pd.DatetimeTZDtype):
+        # Saved as UTC times
+        return pd.DatetimeIndex(values).tz_convert(None).values
+    elif is_json_dtype(dtype):
+        data = json.dumps(
+            np.asarray(values, dtype=object).tolist(), default=to_json_value
+        )
+        return np.frombuffer(data.encode("utf-8"), dtype=np.uint8)
+    return np.asarray(values)
+
+
+def from_json(array: np.ndarray) -> np.ndarray:
+    """Decode values saved as JSON into an array of python objects"""
+    values = json.loads(np.asarray(array).tobytes().decode("utf-8"))
+    result = np.empty(len(values), dtype=object)
+    result[:] = values
+    return result
+
+
+def from_array(array: np.ndarray, dtype):
+    """Copy a (possibly memory-mapped) saved array into memory, restoring the original dtype"""
+    if isinstance(dtype, pd.CategoricalDtype):
+        return pd.Categorical.from_codes(np.array(array), dtype=dtype)
+    elif isinstance(dtype, pd.DatetimeTZDtype):
+        return (
+            pd.DatetimeIndex(np.array(array))
+            .tz_localize("UTC")
+            .tz_convert(dtype.tz)
+            .array
+        )
+    elif isinstance(dtype, np.dtype):
+        return np.array(array)
+    else:
+        return pd.array(np.array(array), dtype=dtype)
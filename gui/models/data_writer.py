@@ -0,0 +1,189 @@
+import gzip
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterator, Optional
+
+import pandas as pd
+
+# Formats that datasets can be saved in, with the file extension for each
+EXPORT_FORMATS = {
+    "TSV": ".txt",
+    "TSV (gzip)": ".txt.gz",
+    "TSV (zstd)": ".txt.zst",
+    "Parquet": ".parquet",
+    "Feather": ".feather",
+}
+# Package needed to save each format (if any)
+EXPORT_REQUIREMENTS = {
+    "TSV (zstd)": "zstandard",
+    "Parquet": "pyarrow",
+    "Feather": "pyarrow",
+}
+WRITE_CHUNK_BYTES = 16 * 1024**2  # Approximate in-memory size of each block of rows
+
+
+def check_export_requirement(kind: str):
+    """Raise an ImportError with a helpful message if the package needed to save the kind of file isn't installed"""
+    package = EXPORT_REQUIREMENTS.get(kind)
+    if package is None:
+        return
+    try:
+        __import__(package)
+    except ImportError:
+        raise ImportError(
+            f"Saving {kind} files requires the '{package}' package, which isn't installed"
+        )
+
+
+def get_chunk_rows(df: pd.DataFrame, chunk_bytes: int = WRITE_CHUNK_BYTES) -> int:
+    """Number of rows in each block written at a time"""
+    row_bytes = df.memory_usage(index=True, deep=False).sum() / max(len(df), 1)
+    return max(int(chunk_bytes / max(row_bytes, 1)), 1)
+
+
+def write_data_file(
+    df: pd.DataFrame,
+    filename: str,
+    kind: str,
+    set_percent: Optional[Callable[[int], None]] = None,
+    is_cancelled: Optional[Callable[[], bool]] = None,
+    chunk_rows: Optional[int] = None,
+) -> bool:
+    """
+    Save data as a (possibly compressed) TSV, Parquet or Feather file, one block of rows at a time.
+    The data is written to a temporary '.partial' file which replaces the file once it is complete,
+    so a cancelled or failed save never leaves a partial file (or removes an existing one).
+
+    Parameters
+    ----------
+    kind: One of EXPORT_FORMATS
+    set_percent: Called with the percent of rows that have been written
+    is_cancelled: Checked after each block is written.  If it returns True, the partial file is deleted.
+
+    Returns
+    -------
+    True if the file was saved, or False if it was cancelled
+    """
+    check_export_requirement(kind)
+    if chunk_rows is None:
+        chunk_rows = get_chunk_rows(df)
+    partial_filename = filename + ".partial"
+    if kind.startswith("TSV"):
+        blocks = write_text_blocks(df, partial_filename, kind, chunk_rows)
+    elif kind in ("Parquet", "Feather"):
+        blocks = write_arrow_blocks(df, partial_filename, kind, chunk_rows)
+    else:
+        raise ValueError(f"{kind} isn't a supported file type")
+    try:
+        for rows_written in blocks:
+            if is_cancelled is not None and is_cancelled():
+                break
+            if set_percent is not None:
+                set_percent(int(100 * rows_written / max(len(df), 1)))
+        else:
+            os.replace(partial_filename, filename)
+            return True
+    finally:
+        # Close the file before removing it when cancelled or failed
+        blocks.close()
+        if os.path.exists(partial_filename):
+            os.remove(partial_filename)
+    return False
+
+
+def write_text_blocks(
+    df: pd.DataFrame, filename: str, kind: str, chunk_rows: int
+) -> Iterator[int]:
+    """
+    Format (and compress) blocks of rows on a thread pool while they are written to the file in order.
+    Compressed blocks are written as separate gzip members (or zstd frames), which are read back as one stream.
+    Yields the number of rows written so far after each block.
+    """
+    max_workers = os.cpu_count() or 1
+    rows_written = 0
+    with open(filename, "wb") as f, ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = deque()
+        try:
+            for start in range(0, max(len(df), 1), chunk_rows):
+                futures.append(
+                    pool.submit(format_block, df, start, chunk_rows, kind, start == 0)
+                )
+                # Limit the number of formatted blocks waiting to be written
+                while len(futures) > max_workers or (
+                    start + chunk_rows >= len(df) and len(futures) > 0
+                ):
+                    f.write(futures.popleft().result())
+                    rows_written = min(rows_written + chunk_rows, len(df))
+                    yield rows_written
+        finally:
+            for future in futures:
+                future.cancel()
+
+
+def format_block(
+    df: pd.DataFrame, start: int, chunk_rows: int, kind: str, header: bool
+) -> bytes:
+    """Format a block of rows as tab-separated text, compressed as needed"""
+    data = df.iloc[start : start + chunk_rows].to_csv(sep="\t", header=header)
+    data = data.encode("utf-8")
+    if kind == "TSV (gzip)":
+        return gzip.compress(data, compresslevel=6)
+    elif kind == "TSV (zstd)":
+        import zstandard
+
+        return zstandard.ZstdCompressor(level=3).compress(data)
+    return data
+
+
+def write_arrow_blocks(
+    df: pd.DataFrame, filename: str, kind: str, chunk_rows: int
+) -> Iterator[int]:
+    """
+    Write the data to a Parquet (one row group per block) or Feather file, keeping the index and dtypes.
+    Yields the number of rows written so far after each block.
+    """
+    import pyarrow as pa
+
+    # Convert one block at a time, so the whole table is never in memory as well as the data.
+    # The types are inferred from all of the rows, in case a block has only missing values.
+    schema = pa.Schema.from_pandas(df, preserve_index=True)
+    if kind == "Parquet":
+        import pyarrow.parquet as pq
+
+        writer = pq.ParquetWriter(filename, schema)
+    else:
+        import pyarrow.ipc
+
+        writer = pyarrow.ipc.new_file(
+            filename,
+            schema,
+            options=pyarrow.ipc.IpcWriteOptions(compression="lz4"),
+        )
+    with writer:
+        for start in range(0, max(len(df), 1), chunk_rows):
+            block = df.iloc[start : start + chunk_rows]
+            writer.write_table(
+                pa.Table.from_pandas(block, schema=schema, preserve_index=True)
+            )
+            yield start + len(block)
+
+
+def get_write_code(name: str, filename: str, kind: str) -> str:
+    """Python code equivalent to write_data_file"""
+    if kind == "TSV":
+        return f"{name}.to_csv('{filename}', sep='\\t')"
+    elif kind == "TSV (gzip)":
+        return f"{name}.to_csv('{filename}', sep='\\t', compression='gzip')"
+    elif kind == "TSV (zstd)":
+        # Written with zstandard (like write_text_blocks), since pandas only supports zstd from version 1.4
+        return (
+            f"with open('{filename}', 'wb') as f, zstandard.ZstdCompressor(level=3).stream_writer(f) as writer:\n"
+            f"    writer.write({name}.to_csv(sep='\\t').encode('utf-8'))"
+        )
+    elif kind == "Parquet":
+        return f"{name}.to_parquet('{filename}')"
+    elif kind == "Feather":
+        return f"pyarrow.feather.write_feather(pyarrow.Table.from_pandas({name}), '{filename}')"
+    else:
+        raise ValueError(f"{kind} isn't a supported file type")
@@ -1,8 +1,12 @@
-from typing import List
+import weakref
+from typing import Iterator, List, Optional, Tuple
 
 import clarite
+import numpy as np
 import pandas as pd
 
+from .column_store import ColumnStore
+
 
 class Dataset:
     """
@@ -13,21 +17,297 @@ class Dataset:
     -----
     data - input data to be used in the analysis, which may have any variables as columns and observations as rows.
     result - output from the ewas function which means there are certain columns defined and each row is a variable.
+
+    The data is normally held in memory, but it may be moved to a ColumnStore on disk (see move_to_disk).
+    Use the get_* methods to read only part of the data: accessing 'df' for data on disk reads all of it.
+
+    A dataset derived from another one may share the memory of any columns that weren't changed (see share_columns).
     """
 
     def __init__(self, name: str, kind: str, df: pd.DataFrame):
         self.name = name
         self.kind = kind
+        self._df = None
+        self._index = None
+        self.store = None  # ColumnStore holding the data when it is on disk
+        self.version = 0  # Incremented each time the data is replaced
+        self._types = None  # Cached result of get_types
+        self._type_counts = None  # Cached number of variables of each type
+        self._column_names = []  # Column labels, by position
+        self._column_positions = dict()  # Column label -> position
+        # Columns using the memory of the 'shared_parent' dataset (a weakref)
+        self.shared_columns = set()
+        self.shared_parent = None
+        self.spilled = (
+            False  # True if the data was moved to disk only to save memory (see spill)
+        )
+        self.last_viewed = 0.0  # time.monotonic() when the dataset was last selected
+        self._column_bytes = None  # Cached memory used by each column
+        self._shared_flags = (
+            None  # Cached result of get_shared_flags, with the data it was found for
+        )
         self.df = df
         self.number = None
 
         # TODO: Validate 'kind'
 
+    @property
+    def df(self) -> pd.DataFrame:
+        """
+        The data.  If it is on disk, it is read into a new DataFrame each time (and not kept in memory),
+        unless it was spilled to save memory, in which case it is reloaded.
+        """
+        if self._df is None and self.store is not None:
+            if not self.spilled:
+                return self.store.load()
+            self.reload()
+        return self._df
+
+    @df.setter
+    def df(self, df: pd.DataFrame):
+        """Replace the data, clearing anything that was calculated from the previous data"""
+        if self._df is None and self.store is None:
+            old_dtypes = None
+        else:
+            old_dtypes = self.get_dtypes()
+        old_types = self._types
+        self.discard_store()
+        self._df = df
+        self._index = df.index
+        self.version += 1
+        self._types = None
+        self._type_counts = None
+        self.stats = None  # DatasetStats, calculated in the background after the data is loaded or modified
+        self.shared_columns = set()
+        self.shared_parent = None
+        self._column_bytes = None
+        # Keep the types of any columns that weren't changed
+        if old_types is not None:
+            self._types = self._update_types(old_dtypes, old_types, df)
+        # Rebuild column lookups if the columns changed
+        if old_dtypes is None or not df.columns.equals(old_dtypes.index):
+            self._set_columns(df.columns)
+
+    def _set_columns(self, columns: pd.Index):
+        """Update the column lookups"""
+        self._column_names = list(columns)
+        self._column_positions = dict()
+        for position, column in enumerate(self._column_names):
+            self._column_positions.setdefault(column, position)
+
+    @classmethod
+    def from_store(
+        cls, name: str, kind: str, store: ColumnStore, types: Optional[pd.Series] = None
+    ) -> "Dataset":
+        """
+        Create a dataset from data that was saved to a store (such as a session file) without reading it.
+        It is treated as spilled, so the data is read into memory the first time it is used.
+        """
+        dataset = cls(name, kind, pd.DataFrame())
+        dataset._df = None
+        dataset._index = store.read_index()
+        dataset.store = store
+        dataset.spilled = True
+        dataset._types = types
+        dataset._set_columns(store.columns)
+        return dataset
+
     def __repr__(self):
-        return f"Dataset('{self.name}', '{self.kind}')\n{self.df.head()}"
+        return f"Dataset('{self.name}', '{self.kind}')\n{self.get_block(slice(0, 5))}"
 
     def __len__(self):
-        return len(self.df)
+        return len(self._index)
+
+    def is_on_disk(self) -> bool:
+        """True if the data is only stored on disk"""
+        return self._df is None and self.store is not None
+
+    def move_to_disk(self, path):
+        """Write the data to a ColumnStore in the (new) directory and release it from memory"""
+        if self._df is None:
+            return
+        self.get_types()  # Make sure types are cached, since they require all of the data
+        self.store = ColumnStore.write(self._df, path)
+        self._df = None
+
+    def discard_store(self):
+        """Delete any copy of the data on disk, which is no longer needed (or is out of date)"""
+        if self.store is not None:
+            self.store.delete()
+            self.store = None
+        self.spilled = False
+
+    def spill(self, path):
+        """Move the data to disk to save memory.  It is read back into memory the next time 'df' is used."""
+        self.move_to_disk(path)
+        self.spilled = True
+
+    def reload(self):
+        """Read data that was spilled to disk back into memory, sharing columns with its parent again if possible"""
+        if not self.spilled:
+            return
+        self._df = self.store.load()
+        self.discard_store()
+        parent = self.shared_parent() if self.shared_parent is not None else None
+        if parent is not None:
+            self.share_columns(parent)
+
+    def share_columns(self, parent: "Dataset") -> int:
+        """
+        Replace any columns that are identical to those in the parent dataset with views of the parent's data,
+        so that only the changed columns use additional memory.  Returns the number of shared columns.
+        Both datasets must be in memory, with unique column names and the same index.
+        """
+        if self is parent or self._df is None or parent._df is None:
+            return 0
+        df = self._df
+        parent_df = parent._df
+        if not (
+            df.columns.is_unique
+            and parent_df.columns.is_unique
+            and df.index.equals(parent_df.index)
+        ):
+            return 0
+
+        # Find the parent position of each unchanged column (None if the column is new or changed)
+        sources = []
+        for column, values in df.items():
+            position = parent._column_positions.get(column)
+            if position is not None:
+                parent_values = parent_df.iloc[:, position]
+                if values.dtype == parent_values.dtype and values.equals(parent_values):
+                    sources.append(position)
+                    continue
+            sources.append(None)
+        shared_num = sum([s is not None for s in sources])
+        if shared_num == 0:
+            return 0
+
+        # Rebuild from runs of consecutive columns, which are either views of the parent or copies of the changed data.
+        # Copying the changed columns releases the rest of the original data.
+        pieces = []
+        start = 0
+        for end in range(1, len(sources) + 1):
+            if end < len(sources) and _continues_run(sources[end - 1], sources[end]):
+                continue
+            if sources[start] is None:
+                pieces.append(df.iloc[:, start:end].copy())
+            else:
+                parent_start = sources[start]
+                pieces.append(
+                    parent_df.iloc[:, parent_start : parent_start + end - start]
+                )
+            start = end
+        # Don't copy (or consolidate) the pieces
+        self._df = pd.concat(pieces, axis=1, copy=False)
+        self.shared_columns = {c for c, s in zip(df.columns, sources) if s is not None}
+        self.shared_parent = weakref.ref(parent)
+        return shared_num
+
+    def get_memory_usage(self) -> pd.DataFrame:
+        """
+        Return the memory used by each column (including python objects like strings),
+        and whether that memory is shared with the dataset this one was derived from.
+        """
+        if self._df is None:
+            return pd.DataFrame({"bytes": [], "shared": []})
+        if self._column_bytes is None:
+            self._column_bytes = get_column_bytes(self._df)
+        return pd.DataFrame(
+            {"bytes": self._column_bytes, "shared": self.get_shared_flags()},
+            index=self._df.columns,
+        )
+
+    def get_memory_snapshot(
+        self,
+    ) -> Tuple[Optional[pd.DataFrame], Optional[np.ndarray], List[bool]]:
+        """
+        Return the data in memory (or None), the memory used by each column if it was already calculated (or None)
+        and whether each column is shared, so the memory usage can be calculated in another thread without using
+        the dataset (which may be changed at the same time).  See cache_column_bytes.
+        """
+        if self._df is None:
+            return None, None, []
+        return self._df, self._column_bytes, self.get_shared_flags()
+
+    def cache_column_bytes(self, df: pd.DataFrame, column_bytes: np.ndarray):
+        """Keep the memory used by each column calculated from a snapshot, unless the data was replaced since"""
+        if self._df is df and self._column_bytes is None:
+            self._column_bytes = column_bytes
+
+    def get_shared_flags(self) -> List[bool]:
+        """Whether each column shares its memory with the dataset this one was derived from"""
+        parent = self.shared_parent() if self.shared_parent is not None else None
+        # Only recalculated when the data (or the parent's data) was replaced, shared, or moved to disk
+        key = (self.version, id(self._df))
+        if parent is not None:
+            key += (parent.version, id(parent._df))
+        if self._shared_flags is not None and self._shared_flags[0] == key:
+            return list(self._shared_flags[1])
+        shared = []
+        for column, values in self._df.items():
+            if (
+                column in self.shared_columns
+                and parent is not None
+                and parent._df is not None
+                and parent.has_column(column)
+            ):
+                parent_values = parent.get_column(column)
+                shared.append(
+                    np.may_share_memory(_get_buffer(values), _get_buffer(parent_values))
+                )
+            else:
+                shared.append(False)
+        self._shared_flags = (key, shared)
+        return list(shared)
+
+    def get_owned_memory(self) -> int:
+        """Bytes of memory used only by this dataset (0 if it is on disk)"""
+        usage = self.get_memory_usage()
+        return int(usage.loc[~usage["shared"].astype(bool), "bytes"].sum())
+
+    def get_dtypes(self) -> pd.Series:
+        """Return the dtype of each column without reading the data"""
+        if self._df is not None:
+            return self._df.dtypes
+        return pd.Series(self.store.dtypes, index=self.store.columns, dtype=object)
+
+    def get_block(
+        self, rows: slice = slice(None), columns: slice = slice(None)
+    ) -> pd.DataFrame:
+        """Return a block of the data selected by row and column positions, reading only that block if it is on disk"""
+        if self._df is not None:
+            return self._df.iloc[rows, columns]
+        return self.store.read_block(rows, columns)
+
+    def get_value(self, row: int, column: int):
+        """Return a single value selected by row and column position"""
+        if self._df is not None:
+            return self._df.iloc[row, column]
+        return self.store.read_block(
+            slice(row, row + 1), slice(column, column + 1)
+        ).iat[0, 0]
+
+    def get_column(self, column: str) -> pd.Series:
+        """Return the data for the named column, reading only that column if it is on disk"""
+        position = self.get_column_position(column)
+        if self._df is not None:
+            return self._df.iloc[:, position]
+        return pd.Series(
+            self.store.read_column(position), index=self._index, name=column
+        )
+
+    def iter_columns(self) -> Iterator[pd.Series]:
+        """Iterate over the columns (in order) of the current data, reading them one at a time if it is on disk"""
+        df = self._df
+        store = self.store
+        index = self._index
+        if df is not None:
+            return (column for _, column in df.items())
+        return (
+            pd.Series(store.read_column(position), index=index)
+            for position in range(len(store.columns))
+        )
 
     def get_selector_name(self):
         """Return a name used for this dataset in the drop-down selector"""
@@ -37,8 +317,38 @@ class Dataset:
         """Name used to represent the dataset in generated python code"""
         return f"df{self.number}_{self.name.replace(' ', '_')}"
 
-    def get_types(self) -> List[str]:
-        return clarite.describe.get_types(self.df)
+    def get_types(self) -> pd.Series:
+        """Return the CLARITE type of each variable, calculating them only if they aren't cached"""
+        if self._types is None:
+            self._types = clarite.describe.get_types(self.df)
+        return self._types
+
+    def get_type_counts(self) -> pd.Series:
+        """Return the number of variables of each CLARITE type"""
+        if self._type_counts is None:
+            self._type_counts = self.get_types().value_counts()
+        return self._type_counts
+
+    @staticmethod
+    def _update_types(
+        old_dtypes: pd.Series, old_types: pd.Series, df: pd.DataFrame
+    ) -> Optional[pd.Series]:
+        """
+        Get types for a new df, reusing the old types for any column with the same name and dtype as before.
+        CLARITE types depend only on the dtype (numeric, or the number of categories), so those can't have changed.
+        Returns None (types are recalculated when needed) if column names aren't unique.
+        """
+        if not (old_dtypes.index.is_unique and df.columns.is_unique):
+            return None
+        changed = [
+            column
+            for column, dtype in df.dtypes.items()
+            if column not in old_types.index or old_dtypes[column] != dtype
+        ]
+        types = old_types.reindex(df.columns)
+        if len(changed) > 0:
+            types[changed] = clarite.describe.get_types(df[changed])
+        return types
 
     def set_number(self, number):
         """Associate a number with each dataset as they are added.  Not always == index in appctx.datasets"""
@@ -50,7 +360,30 @@ class Dataset:
         :param i:
         :return: str
         """
-        return list(self.df)[i]
+        return self._column_names[i]
+
+    def get_column_names(self) -> List[str]:
+        """
+        Get all column names in order.  This is a cached list, so it must not be modified.
+        :return: List[str]
+        """
+        return self._column_names
+
+    def get_column_count(self) -> int:
+        """Get the number of columns"""
+        return len(self._column_names)
+
+    def get_column_position(self, column: str) -> int:
+        """
+        Get the position of the named column (the first one, if there are duplicates)
+        :param column:
+        :return: int
+        """
+        return self._column_positions[column]
+
+    def has_column(self, column: str) -> bool:
+        """Return True if the named column exists"""
+        return column in self._column_positions
 
     def get_row_name(self, i: int) -> str:
         """
@@ -58,4 +391,73 @@ class Dataset:
         :param i:
         :return: str
         """
-        return str(self.df.index[i])
+        return str(self._index[i])
+
+
+def _continues_run(previous: Optional[int], current: Optional[int]) -> bool:
+    """True if both columns are changed, or both are unchanged and consecutive in the parent"""
+    if previous is None or current is None:
+        return previous is None and current is None
+    return current == previous + 1
+
+
+def get_column_bytes(df: pd.DataFrame) -> np.ndarray:
+    """Memory used by each column, including python objects like strings"""
+    return df.memory_usage(deep=True, index=False).to_numpy()
+
+
+def _get_buffer(values: pd.Series) -> np.ndarray:
+    """Get the array holding the data of a column (the codes, for categoricals)"""
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        return values.array.codes
+    return values.to_numpy()
+
+
+def format_bytes(num: float) -> str:
+    """Format a number of bytes using the largest whole unit (e.g. '1.5 MB')"""
+    for unit in ["B", "KB", "MB", "GB"]:
+        if abs(num) < 1024:
+            return f"{num:,.1f} {unit}"
+        num /= 1024
+    return f"{num:,.1f} TB"
+
+
+class DatasetStats:
+    """
+    Summary statistics for each column and row of a DataFrame, calculated from its columns in order.
+    These are calculated once (usually in a background thread) so that they can be looked up by position.
+    """
+
+    def __init__(self, nrows: int, columns: Iterator[pd.Series]):
+        self.nrows = nrows
+        column_unique = []  # Excluding NA
+        column_na = []
+        self.row_na = np.zeros(self.nrows, dtype=np.int64)
+        # Process one column at a time to avoid creating an NA mask of the entire DataFrame
+        for col in columns:
+            na = col.isna().to_numpy()
+            column_unique.append(col.nunique())
+            column_na.append(na.sum())
+            self.row_na += na
+        self.column_unique = np.array(column_unique, dtype=np.int64)
+        self.column_na = np.array(column_na, dtype=np.int64)
+        self.ncols = len(self.column_na)
+
+    def get_column_unique(self, i: int, dropna: bool = True) -> int:
+        """Number of unique values in the i-th column, optionally counting NA as a value"""
+        if dropna or self.column_na[i] == 0:
+            return int(self.column_unique[i])
+        else:
+            return int(self.column_unique[i]) + 1
+
+    def get_column_na_fraction(self, i: int) -> float:
+        """Fraction of values in the i-th column that are NA"""
+        if self.nrows == 0:
+            return 0.0
+        return self.column_na[i] / self.nrows
+
+    def get_row_na_fraction(self, i: int) -> float:
+        """Fraction of values in the i-th row that are NA"""
+        if self.ncols == 0:
+            return 0.0
+        return self.row_na[i] / self.ncols
@@ -1,8 +1,9 @@
+from collections import OrderedDict
+
 import clarite
 import numpy as np
 from PyQt5 import QtCore
-from PyQt5.QtCore import pyqtSlot, QSettings
-from PyQt5.QtGui import QFont, QColor
+from PyQt5.QtCore import pyqtSlot
 from PyQt5.QtWidgets import QDialog, QFormLayout, QLineEdit, QDialogButtonBox
 
 from gui.widgets.utilities import show_warning
@@ -13,9 +14,18 @@ class PandasDFModel(QtCore.QAbstractTableModel):
     Manage current state for the currently selected dataset
     """
 
+    # Displayed values are formatted in blocks of cells, keeping the most recently used blocks
+    BLOCK_ROWS = 128
+    BLOCK_COLS = 32
+    MAX_CACHED_BLOCKS = 64
+
+    # Code for each variable type, used as an index into the list of background colors
+    TYPE_CODES = {"unknown": 0, "binary": 1, "categorical": 2, "continuous": 3}
+
     def __init__(self, appctx, *args):
         super(PandasDFModel, self).__init__()
         self.appctx = appctx
+        self.block_cache = OrderedDict()
         self.read_settings()
         self.appctx.data_model = self  # Add self to the appctx
         if self.appctx.current_dataset_idx is None:
@@ -26,63 +36,74 @@ class PandasDFModel(QtCore.QAbstractTableModel):
             self.dataset = self.appctx.datasets[self.appctx.current_dataset_idx]
             self.dtypes = self.dataset.get_types()
             self.kind = self.dataset.kind
+        self.update_type_codes()
+        self.reset_loaded()
 
     def read_settings(self):
-        settings = QSettings(self.appctx.ORG, self.appctx.APPLICATION)
+        """Copy display settings from the snapshot in the app context"""
+        settings = self.appctx.settings
+        self.header_font = settings.header_font
+        self.index_font = settings.index_font
+        self.data_font = settings.data_font
+        self.data_bgcolor_unknown = settings.data_bgcolor_unknown
+        self.data_bgcolor_binary = settings.data_bgcolor_binary
+        self.data_bgcolor_categorical = settings.data_bgcolor_categorical
+        self.data_bgcolor_continuous = settings.data_bgcolor_continuous
+        self.data_float_precision = settings.data_float_precision
+        self.lazy_loading = settings.lazy_loading
+        self.page_size = settings.page_size
+        self.fast_rendering = settings.fast_rendering
+        # Background colors, indexed by type code
+        self.data_bgcolors = [
+            self.data_bgcolor_unknown,
+            self.data_bgcolor_binary,
+            self.data_bgcolor_categorical,
+            self.data_bgcolor_continuous,
+        ]
+
+    def update_type_codes(self):
+        """Convert the type of each column into a code (any type without a color is 'unknown')"""
+        if self.dtypes is None:
+            self.type_codes = np.zeros(0, dtype=np.int8)
+        else:
+            self.type_codes = (
+                self.dtypes.map(self.TYPE_CODES).fillna(0).to_numpy(dtype=np.int8)
+            )
 
-        # Read Header Settings
-        settings.beginGroup("display/header")
-        default_font = QFont(
-            "sans-serif", pointSize=12, weight=QFont.Bold, italic=False
+    def clear_block_cache(self):
+        """Discard all formatted blocks so that they are regenerated from the current data and settings"""
+        self.block_cache.clear()
+
+    def get_block(self, block_row: int, block_col: int) -> np.ndarray:
+        """Return the formatted display strings for a block of cells, formatting and caching it if needed"""
+        key = (block_row, block_col)
+        block = self.block_cache.get(key)
+        if block is not None:
+            self.block_cache.move_to_end(key)
+            return block
+
+        row_start = block_row * self.BLOCK_ROWS
+        col_start = block_col * self.BLOCK_COLS
+        df = self.dataset.get_block(
+            slice(row_start, row_start + self.BLOCK_ROWS),
+            slice(col_start, col_start + self.BLOCK_COLS),
         )
-        self.header_font = QFont(settings.value("font", defaultValue=default_font))
-        settings.endGroup()
+        block = format_block(df, self.data_float_precision)
 
-        # Read Index Settings
-        settings.beginGroup("display/index")
-        default_font = QFont(
-            "sans-serif", pointSize=10, weight=QFont.Normal, italic=False
-        )
-        self.index_font = QFont(settings.value("font", defaultValue=default_font))
-        settings.endGroup()
-
-        # Read Data Settings
-        settings.beginGroup("display/data")
-        # Font
-        default_font = QFont(
-            "sans-serif", pointSize=10, weight=QFont.Normal, italic=False
-        )
-        self.data_font = QFont(settings.value("font", defaultValue=default_font))
-        # Colors
-        self.data_bgcolor_unknown = QColor(
-            settings.value(
-                "bgcolor_unknown", defaultValue=QColor.fromRgb(255, 255, 255)
-            )
-        )
-        self.data_bgcolor_binary = QColor(
-            settings.value("bgcolor_binary", defaultValue=QColor.fromRgb(255, 204, 153))
-        )
-        self.data_bgcolor_categorical = QColor(
-            settings.value(
-                "bgcolor_categorical", defaultValue=QColor.fromRgb(153, 204, 255)
-            )
-        )
-        self.data_bgcolor_continuous = QColor(
-            settings.value(
-                "bgcolor_continuous", defaultValue=QColor.fromRgb(204, 153, 255)
-            )
-        )
-        # Float Precision
-        self.data_float_precision = settings.value("float_precision", defaultValue=3)
-        settings.endGroup()
+        # Store the block, dropping the least recently used one if the cache is full
+        self.block_cache[key] = block
+        if len(self.block_cache) > self.MAX_CACHED_BLOCKS:
+            self.block_cache.popitem(last=False)
+        return block
 
     def refresh(self):
         """Update display based on the currently selected data in the app context"""
         # Start
         self.beginResetModel()
 
-        # Reload settings
+        # Reload settings and discard any values formatted with old data or settings
         self.read_settings()
+        self.clear_block_cache()
 
         # Remove if there are no datasets
         current_dataset_num = len(self.appctx.datasets)
@@ -97,6 +118,8 @@ class PandasDFModel(QtCore.QAbstractTableModel):
             self.dataset = self.appctx.datasets[self.appctx.current_dataset_idx]
             self.dtypes = self.dataset.get_types()
             self.kind = self.dataset.kind
+        self.update_type_codes()
+        self.reset_loaded()
 
         # Recolor Legend
         self.appctx.dataset_widget.color_legend()
@@ -104,32 +127,76 @@ class PandasDFModel(QtCore.QAbstractTableModel):
         # Done
         self.endResetModel()
 
-    def rowCount(self, parent=QtCore.QModelIndex()):
+    def reset_loaded(self):
+        """Set how many rows and columns are shown: all of them, or only the first page when using lazy loading"""
         if self.dataset is None:
-            return 0
+            self.loaded_rows = 0
+            self.loaded_cols = 0
+        elif self.lazy_loading:
+            self.loaded_rows = min(self.page_size, len(self.dataset))
+            self.loaded_cols = min(self.page_size, self.dataset.get_column_count())
         else:
-            return len(self.dataset.df)
+            self.loaded_rows = len(self.dataset)
+            self.loaded_cols = self.dataset.get_column_count()
+
+    def rowCount(self, parent=QtCore.QModelIndex()):
+        return self.loaded_rows
 
     def columnCount(self, parent=QtCore.QModelIndex()):
+        return self.loaded_cols
+
+    def canFetchMore(self, parent=QtCore.QModelIndex()):
+        """Rows are fetched by the view through the standard fetchMore protocol"""
+        if self.dataset is None or parent.isValid():
+            return False
+        return self.loaded_rows < len(self.dataset)
+
+    def fetchMore(self, parent=QtCore.QModelIndex()):
+        self.fetch_more_rows()
+
+    def fetch_more_rows(self):
+        """Show the next page of rows"""
         if self.dataset is None:
-            return 0
-        else:
-            return len(list(self.dataset.df))
+            return
+        count = min(self.page_size, len(self.dataset) - self.loaded_rows)
+        if count <= 0:
+            return
+        self.beginInsertRows(
+            QtCore.QModelIndex(), self.loaded_rows, self.loaded_rows + count - 1
+        )
+        self.loaded_rows += count
+        self.endInsertRows()
+
+    def can_fetch_more_columns(self):
+        if self.dataset is None:
+            return False
+        return self.loaded_cols < self.dataset.get_column_count()
+
+    def fetch_more_columns(self):
+        """Show the next page of columns (Qt's fetchMore only handles rows, so the view calls this when scrolled right)"""
+        if self.dataset is None:
+            return
+        count = min(self.page_size, self.dataset.get_column_count() - self.loaded_cols)
+        if count <= 0:
+            return
+        self.beginInsertColumns(
+            QtCore.QModelIndex(), self.loaded_cols, self.loaded_cols + count - 1
+        )
+        self.loaded_cols += count
+        self.endInsertColumns()
 
     def get_legend_label(self, var_type):
         """For example, '345 continuous'"""
         if self.dataset is None:
             return f"0 {var_type}"
         else:
-            count = self.dataset.get_types().value_counts().get(var_type, 0)
+            count = self.dataset.get_type_counts().get(var_type, 0)
             return f"{count:,} {var_type}"
 
     def headerData(self, section: int, orientation, role):
         """
         Return the formatted section-th index label depending on whether it's for the horizontal orientation (column) or vertical (row)
         """
-        settings = QSettings(self.appctx.ORG, self.appctx.APPLICATION)
-
         # Return values
         if role == QtCore.Qt.DisplayRole:
             if orientation == QtCore.Qt.Horizontal:
@@ -141,20 +208,20 @@ class PandasDFModel(QtCore.QAbstractTableModel):
 
         # Tooltip (for a dataset)
         elif role == QtCore.Qt.ToolTipRole and self.kind == "dataset":
+            stats = self.dataset.stats
             if orientation == QtCore.Qt.Horizontal:
-                col_name = self.dataset.get_column_name(section)
-                col_type = self.dtypes[section]
-                col = self.dataset.df[col_name]
+                col_type = self.dtypes.iloc[section]
+                if stats is None:
+                    return f"{col_type}\nCalculating statistics..."
                 return (
                     f"{col_type}\n"
-                    f"{len(col.unique()):,} unique values\n"
-                    f"{1-(col.count() / len(col)):.2%} NA"
+                    f"{stats.get_column_unique(section, dropna=False):,} unique values\n"
+                    f"{stats.get_column_na_fraction(section):.2%} NA"
                 )
             else:
-                # Return index value (as a string)
-                row = self.dataset.df.iloc[section]
-                na_count = row.isnull().sum()
-                return f"{na_count / len(row):.2%} NA"
+                if stats is None:
+                    return "Calculating statistics..."
+                return f"{stats.get_row_na_fraction(section):.2%} NA"
 
         # Font
         elif role == QtCore.Qt.FontRole:
@@ -177,8 +244,14 @@ class PandasDFModel(QtCore.QAbstractTableModel):
         if role == QtCore.Qt.DisplayRole:
             row_idx = index.row()
             col_idx = index.column()
-            value = self.dataset.df.iloc[row_idx, col_idx]
-            if type(value) is np.float64:
+            if self.fast_rendering:
+                block = self.get_block(
+                    row_idx // self.BLOCK_ROWS, col_idx // self.BLOCK_COLS
+                )
+                return block[row_idx % self.BLOCK_ROWS, col_idx % self.BLOCK_COLS]
+            # Format each value individually
+            value = self.dataset.get_value(row_idx, col_idx)
+            if isinstance(value, np.floating):
                 return f"{value:.{self.data_float_precision}E}"
             else:
                 return str(value)
@@ -187,6 +260,9 @@ class PandasDFModel(QtCore.QAbstractTableModel):
         elif role == QtCore.Qt.BackgroundRole and self.kind == "dataset":
             # Background color based on data type
             col_idx = index.column()
+            if self.fast_rendering:
+                return self.data_bgcolors[self.type_codes[col_idx]]
+            # Compare the type name for each cell
             col_dtype = self.dtypes.iloc[col_idx]
             if col_dtype == "binary":
                 return self.data_bgcolor_binary
@@ -247,7 +323,7 @@ class PandasDFModel(QtCore.QAbstractTableModel):
         column = self.dataset.get_column_name(column_idx)
         # Show a dialog
         new_name = RenameDialog.get_new_name(
-            data=self.appctx.datasets[self.appctx.current_dataset_idx].df,
+            dataset=self.dataset,
             column=column,
             parent=self.parent(),
         )
@@ -270,11 +346,27 @@ class PandasDFModel(QtCore.QAbstractTableModel):
         )
 
 
+def format_block(df, float_precision) -> np.ndarray:
+    """
+    Format every value in the DataFrame as a display string, returning a 2D array with the same shape.
+    Float columns (of any width) use scientific notation with the given precision, everything else uses str().
+    """
+    block = np.empty(df.shape, dtype=object)
+    for col_idx, (_, col) in enumerate(df.items()):
+        if isinstance(col.dtype, np.dtype) and col.dtype.kind == "f":
+            block[:, col_idx] = np.char.mod(
+                f"%.{float_precision}E", col.to_numpy()
+            ).tolist()
+        else:
+            block[:, col_idx] = [str(value) for value in col.tolist()]
+    return block
+
+
 class RenameDialog(QDialog):
-    def __init__(self, data=None, column=None, parent=None):
+    def __init__(self, dataset=None, column=None, parent=None):
         super(RenameDialog, self).__init__(parent)
         self.setWindowTitle(f"Rename Column '{column}'")
-        self.data = data
+        self.dataset = dataset
         self.old_name = column
         self.new_name = None
 
@@ -307,7 +399,7 @@ class RenameDialog(QDialog):
         # TODO: Add any warnings here
         if self.new_name == self.old_name:
             self.reject()
-        elif self.new_name in list(self.data):
+        elif self.dataset.has_column(self.new_name):
             show_warning(
                 "Error renaming column",
                 f"The specified column ('{self.new_name}') already exists",
@@ -316,8 +408,8 @@ class RenameDialog(QDialog):
             self.accept()
 
     @staticmethod
-    def get_new_name(data=None, column=None, parent=None):
-        dlg = RenameDialog(data, column, parent)
+    def get_new_name(dataset=None, column=None, parent=None):
+        dlg = RenameDialog(dataset, column, parent)
         result = dlg.exec_()
         name = dlg.new_name
         # Return
@@ -0,0 +1,125 @@
+import json
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import pandas_dtype
+
+from .dataset_model import format_bytes
+
+# Text columns are converted to categories if no more than this fraction of their values are unique
+MAX_CATEGORY_FRACTION = 0.5
+
+
+def compact_dtypes(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Return a copy of the data using the smallest dtypes that hold the values:
+    integers are downcast to the smallest width, floats to float32 when pandas considers it safe,
+    and text columns with relatively few unique values are converted to categories.
+    """
+    columns = dict()
+    for position, (_, values) in enumerate(df.items()):
+        dtype = values.dtype
+        if isinstance(dtype, np.dtype) and dtype.kind in "iu":
+            values = pd.to_numeric(values, downcast="integer")
+        elif isinstance(dtype, np.dtype) and dtype.kind == "f":
+            values = pd.to_numeric(values, downcast="float")
+        elif dtype == object or isinstance(dtype, pd.StringDtype):
+            num_values = values.count()
+            if (
+                num_values > 0
+                and values.nunique() <= num_values * MAX_CATEGORY_FRACTION
+            ):
+                values = values.astype("category")
+        columns[position] = values
+    result = pd.concat(columns, axis=1)
+    result.columns = df.columns
+    return result
+
+
+def compact_data(
+    df: pd.DataFrame, dtypes_file: Optional[str] = None
+) -> Tuple[pd.DataFrame, List[str]]:
+    """
+    Convert loaded data to compact dtypes (see compact_dtypes), describing how much memory was saved.
+    If a dtypes_file is given, the compact dtypes are saved to it (unless it already exists),
+    so they are used the next time the data is loaded.
+
+    Returns
+    -------
+    The converted data, and messages for the info log
+    """
+    original_bytes = df.memory_usage(deep=True).sum()
+    df = compact_dtypes(df)
+    compact_bytes = df.memory_usage(deep=True).sum()
+    messages = [
+        f"Converted to compact types: {format_bytes(original_bytes)} -> {format_bytes(compact_bytes)} "
+        f"({format_bytes(original_bytes - compact_bytes)} saved)"
+    ]
+    if dtypes_file is None:
+        return df, messages
+    if Path(dtypes_file).exists():
+        messages.append(f"Kept the existing dtypes file '{dtypes_file}'")
+    else:
+        try:
+            write_dtypes(df.dtypes, dtypes_file)
+            messages.append(f"Saved compact types to '{dtypes_file}'")
+        except OSError as e:
+            messages.append(f"Couldn't save compact types to '{dtypes_file}': {e}")
+    return df, messages
+
+
+def dtypes_to_json(dtypes: pd.Series) -> dict:
+    """Describe the dtype of each column in the format saved to '.dtypes' files"""
+    return {
+        variable_name: (
+            {"type": str(dtype)}
+            if str(dtype) != "category"
+            else {
+                "type": str(dtype),
+                "categories": list(dtype.categories.values.tolist()),
+                "ordered": dtype.ordered,
+            }
+        )
+        for variable_name, dtype in dtypes.items()
+    }
+
+
+def json_to_dtypes(dtypes_json: dict) -> dict:
+    """Convert dtypes in the format saved to '.dtypes' files back to pandas dtypes"""
+    return {
+        variable_name: (
+            pd.CategoricalDtype(info["categories"], ordered=info["ordered"])
+            if info["type"] == "category"
+            else pandas_dtype(info["type"])
+        )
+        for variable_name, info in dtypes_json.items()
+    }
+
+
+def write_dtypes(dtypes: pd.Series, filename):
+    """Save the dtypes of a dataset to a '.dtypes' file"""
+    with Path(filename).open("w") as f:
+        json.dump(dtypes_to_json(dtypes), f)
+
+
+def read_dtypes(filename) -> dict:
+    """Read the dtypes saved to a '.dtypes' file, returning a dict of column name -> dtype"""
+    with Path(filename).open("r") as f:
+        return json_to_dtypes(json.load(f))
+
+
+def apply_dtypes(df: pd.DataFrame, dtypes: dict) -> pd.DataFrame:
+    """
+    Convert columns to saved dtypes (such as numeric categories, which Parquet files don't keep).
+    Columns that aren't in the data or already have the dtype are left as they are.
+    """
+    dtypes = {
+        column: dtype
+        for column, dtype in dtypes.items()
+        if column in df.columns and df[column].dtype != dtype
+    }
+    if len(dtypes) == 0:
+        return df
+    return df.astype(dtypes)
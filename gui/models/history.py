@@ -0,0 +1,112 @@
+import numpy as np
+import pandas as pd
+
+
+class DataDiff:
+    """
+    The changes needed to restore a previous version of a dataset's data from the current version.
+
+    Only the columns that were changed or dropped are stored, along with the values of any removed rows.
+    Unchanged (or renamed) columns are taken from the current data when it is restored.
+    If rows were added or reordered, or the labels aren't unique, the whole previous DataFrame is kept instead.
+    """
+
+    def __init__(self, old: pd.DataFrame, new: pd.DataFrame):
+        self.snapshot = (
+            None  # The previous DataFrame, when it can't be described by a diff
+        )
+        self.size = None  # Calculated when first needed
+        self.index = old.index
+        self.columns = old.columns
+        self.sources = (
+            []
+        )  # Label of each previous column in the current data, or None if it was changed
+        self.stored = (
+            dict()
+        )  # Previous column position -> values of changed or dropped columns
+        self.removed = (
+            dict()
+        )  # Previous column position -> values of removed rows for unchanged columns
+
+        if not (
+            old.columns.is_unique
+            and new.columns.is_unique
+            and old.index.is_unique
+            and new.index.is_unique
+        ):
+            self.snapshot = old
+            return
+        # Positions of the current rows in the previous data, which must be in the same order
+        positions = old.index.get_indexer(new.index)
+        if (positions == -1).any() or (np.diff(positions) <= 0).any():
+            self.snapshot = old
+            return
+        if len(positions) == len(old.index):
+            positions = None
+            removed_positions = None
+        else:
+            removed_positions = np.setdiff1d(np.arange(len(old.index)), positions)
+
+        # Columns that are only in the new data may be renamed columns
+        added = [c for c in new.columns if c not in old.columns]
+        for position, (column, values) in enumerate(old.items()):
+            if column in new.columns:
+                candidates = [column]
+            else:
+                candidates = added
+            source = None
+            for candidate in candidates:
+                if _matches(values, new[candidate], positions):
+                    source = candidate
+                    break
+            if source is None:
+                self.stored[position] = values.copy()
+            else:
+                if source in added:
+                    added.remove(source)
+                if removed_positions is not None:
+                    self.removed[position] = values.iloc[removed_positions].copy()
+            self.sources.append(source)
+
+    def restore(self, new: pd.DataFrame) -> pd.DataFrame:
+        """Rebuild the previous data from the current data"""
+        if self.snapshot is not None:
+            return self.snapshot
+        columns = dict()
+        for position, source in enumerate(self.sources):
+            if source is None:
+                values = self.stored[position]
+            elif position in self.removed:
+                values = pd.concat([new[source], self.removed[position]])
+                values = values.reindex(self.index)
+            else:
+                values = new[source]
+            columns[position] = values
+        if len(columns) == 0:
+            return pd.DataFrame(index=self.index, columns=self.columns)
+        result = pd.concat(columns, axis=1)
+        result.columns = self.columns
+        result.index = self.index
+        return result
+
+    def get_size(self) -> int:
+        """Approximate number of bytes of data kept by the diff"""
+        if self.size is None:
+            if self.snapshot is not None:
+                self.size = int(self.snapshot.memory_usage(deep=True).sum())
+            else:
+                self.size = int(
+                    sum([s.memory_usage(deep=True) for s in self.stored.values()])
+                    + sum([s.memory_usage(deep=True) for s in self.removed.values()])
+                )
+        return self.size
+
+
+def _matches(old_values: pd.Series, new_values: pd.Series, positions) -> bool:
+    """True if the values are unchanged in the rows that were kept"""
+    if old_values.dtype != new_values.dtype:
+        return False
+    if positions is not None:
+        old_values = old_values.iloc[positions]
+    # The rows are in the same order, so the indexes are equal
+    return old_values.equals(new_values)
@@ -0,0 +1,136 @@
+from pathlib import Path
+from typing import List, Optional
+
+import pandas as pd
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+from .dataset_model import Dataset, get_column_bytes
+
+
+def get_process_rss() -> Optional[int]:
+    """Resident memory of this process in bytes, or None if it can't be determined"""
+    if psutil is not None:
+        return psutil.Process().memory_info().rss
+    try:
+        import resource
+
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * resource.getpagesize()
+    except (OSError, ImportError, ValueError, IndexError):
+        return None
+
+
+class MemoryReport:
+    """
+    Memory used by each dataset and each of its variables, separating memory shared with a parent dataset
+    from memory owned by the dataset.  Datasets on disk use no memory, so their size on disk is reported instead.
+    """
+
+    DATASET_COLUMNS = [
+        "dataset",
+        "kind",
+        "rows",
+        "variables",
+        "location",
+        "owned_bytes",
+        "shared_bytes",
+        "disk_bytes",
+    ]
+    VARIABLE_COLUMNS = ["dataset", "variable", "dtype", "bytes", "shared"]
+
+    def __init__(self, snapshot: List[dict]):
+        """Calculate the report from a snapshot of the datasets (see take_snapshot), which may be in another thread"""
+        self.rss = get_process_rss()
+        dataset_rows = []
+        self.variables = dict()  # Dataset name -> DataFrame of variables
+        self.calculated = []  # (Dataset, data, column bytes) calculated for the report
+        for info in snapshot:
+            name = info["name"]
+            df = info["df"]
+            if info["on_disk"]:
+                location = "Disk"
+                variables = pd.DataFrame({"dtype": info["dtypes"], "bytes": 0})
+                variables["shared"] = False
+            else:
+                location = "Memory"
+                column_bytes = info["column_bytes"]
+                if column_bytes is None and df is not None:
+                    column_bytes = get_column_bytes(df)
+                    self.calculated.append((info["dataset"], df, column_bytes))
+                variables = pd.DataFrame(
+                    {
+                        "bytes": column_bytes if df is not None else [],
+                        "shared": info["shared"],
+                        "dtype": info["dtypes"].values,
+                    },
+                    index=info["dtypes"].index,
+                )
+            variables = variables.rename_axis("variable").reset_index()
+            variables.insert(0, "dataset", name)
+            self.variables[name] = variables[self.VARIABLE_COLUMNS]
+            shared = variables["shared"].astype(bool)
+            dataset_rows.append(
+                (
+                    name,
+                    info["kind"],
+                    info["rows"],
+                    len(variables),
+                    location,
+                    int(variables.loc[~shared, "bytes"].sum()),
+                    int(variables.loc[shared, "bytes"].sum()),
+                    info["disk_bytes"],
+                )
+            )
+        self.datasets = pd.DataFrame(dataset_rows, columns=self.DATASET_COLUMNS)
+
+    @staticmethod
+    def take_snapshot(datasets: List[Dataset]) -> List[dict]:
+        """
+        Record what the report needs from each dataset, without calculating the memory used by python objects.
+        This must be done in the GUI thread, where datasets are changed (or moved to disk).
+        """
+        snapshot = []
+        for dataset in datasets:
+            df, column_bytes, shared = dataset.get_memory_snapshot()
+            snapshot.append(
+                {
+                    "dataset": dataset,
+                    "name": dataset.get_selector_name(),
+                    "kind": dataset.kind,
+                    "rows": len(dataset),
+                    "dtypes": dataset.get_dtypes().astype(str),
+                    "on_disk": dataset.is_on_disk(),
+                    "disk_bytes": (
+                        dataset.store.disk_usage() if dataset.is_on_disk() else 0
+                    ),
+                    "df": df,
+                    "column_bytes": column_bytes,
+                    "shared": shared,
+                }
+            )
+        return snapshot
+
+    def cache_column_bytes(self):
+        """Keep the memory usage calculated for the report in the datasets (in the GUI thread)"""
+        for dataset, df, column_bytes in self.calculated:
+            dataset.cache_column_bytes(df, column_bytes)
+        self.calculated = []
+
+    def get_total_owned(self) -> int:
+        """Total memory used by all datasets"""
+        return int(self.datasets["owned_bytes"].sum())
+
+    def to_tsv(self, filename: str):
+        """Save the dataset summary, and the variables of all datasets to a '.variables' file alongside it"""
+        self.datasets.to_csv(filename, sep="\t", index=False)
+        if len(self.variables) > 0:
+            variables = pd.concat(list(self.variables.values()), ignore_index=True)
+        else:
+            variables = pd.DataFrame(columns=self.VARIABLE_COLUMNS)
+        variables.to_csv(
+            Path(filename).with_suffix(".variables.tsv"), sep="\t", index=False
+        )
@@ -0,0 +1,114 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Optional
+
+import pandas as pd
+
+from .column_store import ColumnStore
+
+# Bytes hashed from the start, middle and end of each file
+HASH_SAMPLE_SIZE = 1024**2
+
+
+class ParseCache:
+    """
+    Data parsed from text files, saved in a directory as one ColumnStore per load.
+    Each entry is found by a key combining the file's path, size, modification time and a hash of its content
+    with the options used to parse it, so changing the file or the options results in a new entry.
+    The least recently used entries are removed when the total size is larger than max_bytes.
+    """
+
+    def __init__(self, path, max_bytes: int):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+
+    @staticmethod
+    def get_key(filename: str, options: dict) -> str:
+        """Key identifying the file contents and the parsing options"""
+        stat = os.stat(filename)
+        key = hashlib.blake2b(digest_size=20)
+        key.update(
+            json.dumps(
+                {
+                    "path": str(Path(filename).resolve()),
+                    "size": stat.st_size,
+                    "mtime": stat.st_mtime_ns,
+                    "options": options,
+                },
+                sort_keys=True,
+                default=str,
+            ).encode()
+        )
+        key.update(hash_sample(filename, stat.st_size))
+        return key.hexdigest()
+
+    def get(self, key: str) -> Optional[pd.DataFrame]:
+        """Read the data saved for the key, or return None if it isn't in the cache"""
+        entry = self.path / key
+        if not (entry / ColumnStore.SCHEMA_FILE).is_file():
+            return None
+        df = ColumnStore(entry).load()
+        # The modification time of the directory records when it was last used
+        os.utime(entry)
+        return df
+
+    def put(self, key: str, df: pd.DataFrame):
+        """Save the data for the key, then remove old entries if the cache is too large"""
+        if (self.path / key).exists():
+            return
+        self.path.mkdir(parents=True, exist_ok=True)
+        # Write to a temporary directory first so that incomplete entries are never read
+        temp_dir = tempfile.mkdtemp(prefix=f"{key}.", suffix=".tmp", dir=self.path)
+        try:
+            ColumnStore.write(df, temp_dir)
+            os.replace(temp_dir, self.path / key)
+        except OSError:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+            raise
+        self.evict()
+
+    def get_entries(self) -> pd.DataFrame:
+        """List the saved entries with their size and last use, from most to least recently used"""
+        entries = []
+        if self.path.is_dir():
+            for entry in self.path.iterdir():
+                if entry.is_dir() and not entry.name.endswith(".tmp"):
+                    entries.append(
+                        {
+                            "key": entry.name,
+                            "bytes": sum(f.stat().st_size for f in entry.iterdir()),
+                            "last_used": entry.stat().st_mtime,
+                        }
+                    )
+        entries = pd.DataFrame(entries, columns=["key", "bytes", "last_used"])
+        return entries.sort_values("last_used", ascending=False, ignore_index=True)
+
+    def get_total_bytes(self) -> int:
+        return int(self.get_entries()["bytes"].sum())
+
+    def evict(self):
+        """Remove the least recently used entries until the cache is no larger than max_bytes"""
+        entries = self.get_entries()
+        keep = entries["bytes"].cumsum() <= self.max_bytes
+        for key in entries.loc[~keep, "key"]:
+            shutil.rmtree(self.path / key, ignore_errors=True)
+
+    def clear(self):
+        """Remove all entries"""
+        for key in self.get_entries()["key"]:
+            shutil.rmtree(self.path / key, ignore_errors=True)
+
+
+def hash_sample(filename: str, size: int) -> bytes:
+    """Hash blocks from the start, middle and end of a file"""
+    sample = hashlib.blake2b(digest_size=20)
+    with open(filename, "rb") as f:
+        starts = {0, (size - HASH_SAMPLE_SIZE) // 2, size - HASH_SAMPLE_SIZE}
+        for start in sorted([max(start, 0) for start in starts]):
+            f.seek(start)
+            sample.update(f.read(HASH_SAMPLE_SIZE))
+    return sample.digest()
@@ -0,0 +1,71 @@
+import json
+import os
+import tempfile
+import zipfile
+from pathlib import Path
+from typing import List, Tuple
+
+import pandas as pd
+
+from .column_store import ZipColumnStore
+from .dataset_model import Dataset
+
+SESSION_FILE = "session.json"
+SESSION_FORMAT = 2
+
+
+def save_session(filename, datasets: List[Dataset], info: dict):
+    """
+    Save datasets to a session file: a zip file holding each dataset in columnar binary form (see ZipColumnStore),
+    plus a 'session.json' file with the dataset names, kinds, numbers and types and any other info (such as logs).
+    The file is written to a temporary file first, so that datasets being read from an existing session file
+    can be saved back to it.
+    """
+    filename = Path(filename)
+    session = dict(info, format=SESSION_FORMAT, datasets=[])
+    fd, temp_filename = tempfile.mkstemp(
+        prefix=filename.name, suffix=".tmp", dir=filename.parent
+    )
+    os.close(fd)
+    try:
+        with zipfile.ZipFile(temp_filename, "w", zipfile.ZIP_STORED) as zf:
+            for dataset in datasets:
+                prefix = f"dataset_{dataset.number}"
+                if dataset.is_on_disk():
+                    # Copy data on disk (such as datasets not yet read from a session) without reading it into memory
+                    ZipColumnStore.copy_to_zip(dataset.store, zf, prefix)
+                else:
+                    ZipColumnStore.write_to_zip(dataset.df, zf, prefix)
+                session["datasets"].append(
+                    {
+                        "name": dataset.name,
+                        "kind": dataset.kind,
+                        "number": dataset.number,
+                        "prefix": prefix,
+                        "types": [str(t) for t in dataset.get_types()],
+                    }
+                )
+            zf.writestr(SESSION_FILE, json.dumps(session))
+        os.replace(temp_filename, filename)
+    finally:
+        if os.path.exists(temp_filename):
+            os.remove(temp_filename)
+
+
+def read_session(filename) -> Tuple[dict, List[Dataset]]:
+    """
+    Read a session file, returning the session info and the datasets.
+    Only the schema and index of each dataset are read: the data is read when it is first used.
+    """
+    with zipfile.ZipFile(filename) as zf:
+        session = json.loads(zf.read(SESSION_FILE))
+    if session.get("format") != SESSION_FORMAT:
+        raise ValueError(f"'{filename}' isn't a supported session file")
+    datasets = []
+    for info in session.pop("datasets"):
+        store = ZipColumnStore(filename, info["prefix"])
+        types = pd.Series(info["types"], index=store.columns)
+        dataset = Dataset.from_store(info["name"], info["kind"], store, types)
+        dataset.set_number(info["number"])
+        datasets.append(dataset)
+    return session, datasets
@@ -0,0 +1,142 @@
+from PyQt5.QtCore import QSettings
+from PyQt5.QtGui import QFont, QColor
+
+
+class AppSettings:
+    """
+    In-memory snapshot of the saved settings, owned by the app context.
+    It is read when the app starts and again when the preferences are saved (see AppContext.update_settings),
+    so models and widgets can use these attributes without reading the settings file.
+    """
+
+    def __init__(self, org: str, application: str, read: bool = True):
+        """If read is False, only the defaults are loaded (such as when the preferences are reset)"""
+        self.org = org
+        self.application = application
+        if read:
+            self.read()
+        else:
+            self.load_defaults()
+
+    def load_defaults(self):
+        # display/header
+        self.header_font = QFont(
+            "sans-serif", pointSize=12, weight=QFont.Bold, italic=False
+        )
+        # display/index
+        self.index_font = QFont(
+            "sans-serif", pointSize=10, weight=QFont.Normal, italic=False
+        )
+        # display/data
+        self.data_font = QFont(
+            "sans-serif", pointSize=10, weight=QFont.Normal, italic=False
+        )
+        self.data_bgcolor_unknown = QColor.fromRgb(255, 255, 255)
+        self.data_bgcolor_binary = QColor.fromRgb(255, 204, 153)
+        self.data_bgcolor_categorical = QColor.fromRgb(153, 204, 255)
+        self.data_bgcolor_continuous = QColor.fromRgb(204, 153, 255)
+        self.data_float_precision = 3
+        self.fast_rendering = True
+        # data
+        self.lazy_loading = False
+        self.page_size = 1000
+        self.out_of_core = False
+        self.scratch_dir = ""  # Blank to use the system temporary directory
+        self.memory_budget = 0  # MB, or 0 for no limit
+        self.parse_cache = False
+        self.parse_cache_dir = ""  # Blank to use the user cache directory
+        self.parse_cache_size = 4096  # MB
+        self.autosave = True
+        self.autosave_delay = 60  # Seconds without changes before autosaving
+
+    def read(self):
+        """Replace the snapshot with the saved settings, using defaults for anything that isn't saved"""
+        # Load default settings first
+        self.load_defaults()
+
+        # Override with any saved settings
+        settings = QSettings(self.org, self.application)
+
+        # Read Header Settings
+        settings.beginGroup("display/header")
+        self.header_font = QFont(settings.value("font", defaultValue=self.header_font))
+        settings.endGroup()
+
+        # Read Index Settings
+        settings.beginGroup("display/index")
+        self.index_font = QFont(settings.value("font", defaultValue=self.index_font))
+        settings.endGroup()
+
+        # Read Data Settings
+        settings.beginGroup("display/data")
+        # Font
+        self.data_font = QFont(settings.value("font", defaultValue=self.data_font))
+        # Colors
+        self.data_bgcolor_unknown = QColor(
+            settings.value("bgcolor_unknown", defaultValue=self.data_bgcolor_unknown)
+        )
+        self.data_bgcolor_binary = QColor(
+            settings.value("bgcolor_binary", defaultValue=self.data_bgcolor_binary)
+        )
+        self.data_bgcolor_categorical = QColor(
+            settings.value(
+                "bgcolor_categorical", defaultValue=self.data_bgcolor_categorical
+            )
+        )
+        self.data_bgcolor_continuous = QColor(
+            settings.value(
+                "bgcolor_continuous", defaultValue=self.data_bgcolor_continuous
+            )
+        )
+        # Float Precision
+        self.data_float_precision = settings.value(
+            "float_precision", defaultValue=self.data_float_precision, type=int
+        )
+        # Fast Rendering
+        self.fast_rendering = settings.value(
+            "fast_rendering", defaultValue=self.fast_rendering, type=bool
+        )
+        settings.endGroup()
+
+        # Read Data Loading Settings
+        settings.beginGroup("data")
+        self.lazy_loading = settings.value(
+            "lazy_loading", defaultValue=self.lazy_loading, type=bool
+        )
+        self.page_size = settings.value(
+            "page_size", defaultValue=self.page_size, type=int
+        )
+        self.out_of_core = settings.value(
+            "out_of_core", defaultValue=self.out_of_core, type=bool
+        )
+        self.scratch_dir = settings.value(
+            "scratch_dir", defaultValue=self.scratch_dir, type=str
+        )
+        self.memory_budget = settings.value(
+            "memory_budget", defaultValue=self.memory_budget, type=int
+        )
+        self.parse_cache = settings.value(
+            "parse_cache", defaultValue=self.parse_cache, type=bool
+        )
+        self.parse_cache_dir = settings.value(
+            "parse_cache_dir", defaultValue=self.parse_cache_dir, type=str
+        )
+        self.parse_cache_size = settings.value(
+            "parse_cache_size", defaultValue=self.parse_cache_size, type=int
+        )
+        self.autosave = settings.value(
+            "autosave", defaultValue=self.autosave, type=bool
+        )
+        self.autosave_delay = settings.value(
+            "autosave_delay", defaultValue=self.autosave_delay, type=int
+        )
+        settings.endGroup()
+
+    def get_data_colors(self):
+        """Background colors for each variable type, in the order they are shown in the legend"""
+        return {
+            "Unknown": self.data_bgcolor_unknown,
+            "Binary": self.data_bgcolor_binary,
+            "Categorical": self.data_bgcolor_categorical,
+            "Continuous": self.data_bgcolor_continuous,
+        }
@@ -0,0 +1,410 @@
+import bz2
+import gzip
+import io
+import lzma
+import os
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import BinaryIO, Callable, Iterator, List, Optional, Tuple, Union
+
+import pandas as pd
+from pandas.api.types import (
+    is_bool_dtype,
+    is_datetime64_any_dtype,
+    is_numeric_dtype,
+)
+
+CHUNK_SIZE = 32 * 1024**2  # Bytes of text parsed by each task
+# Bytes checked for quotes, which may hide newlines inside values
+QUOTE_SAMPLE_SIZE = 1024**2
+# Rows (or bytes of text, whichever comes first) read to preview a file
+PREVIEW_ROWS = 1000
+PREVIEW_BYTES = 4 * 1024**2
+# Compression used for each file extension
+COMPRESSIONS = {".gz": "gzip", ".bz2": "bz2", ".xz": "xz", ".zst": "zstd"}
+
+
+def read_text_file(
+    filename: str,
+    sep: str,
+    index_col: Union[int, str, None] = 0,
+    set_percent: Optional[Callable[[int], None]] = None,
+    is_cancelled: Optional[Callable[[], bool]] = None,
+    chunk_size: int = CHUNK_SIZE,
+    usecols: Optional[List[str]] = None,
+    dtype: Optional[dict] = None,
+) -> Optional[pd.DataFrame]:
+    """
+    Read a delimited text file (like pd.read_csv) by splitting it into chunks of lines that are parsed in parallel.
+    Compressed files (see COMPRESSIONS) are decompressed as they are read, while earlier chunks are being parsed.
+    Files containing quotes are read in a single chunk, since quoted values may contain newlines.
+
+    Parameters
+    ----------
+    set_percent: Called with the percent of the file that has been parsed (based on the compressed size)
+    is_cancelled: Checked after each chunk is read.  If it returns True, the remaining chunks are skipped.
+    usecols: Only parse these columns (None for all).  The index column is always included.
+    dtype: Types of some columns (such as those saved in a '.dtypes' file), which are parsed as those types
+           instead of inferring them.  Columns that aren't in the file are ignored.
+
+    Returns
+    -------
+    The data, or None if it was cancelled
+    """
+    dtype = dict(dtype) if dtype is not None else dict()
+    # Dates can't be passed to the parser as a dtype
+    parse_dates = [c for c, t in dtype.items() if is_datetime64_any_dtype(t)]
+    for column in parse_dates:
+        del dtype[column]
+    frames = parse_chunks(
+        filename,
+        sep,
+        index_col,
+        usecols,
+        dtype,
+        parse_dates,
+        set_percent,
+        is_cancelled,
+        chunk_size,
+    )
+    if frames is None:
+        return None
+
+    # Types are inferred separately for each chunk.  Columns with numbers in some chunks and text in others
+    # would be mixed after combining them, so those are parsed again as text (matching a single read).
+    mixed = get_mixed_columns(frames)
+    if len(mixed) > 0:
+        dtype.update({column: str for column in mixed})
+        frames = parse_chunks(
+            filename,
+            sep,
+            index_col,
+            usecols,
+            dtype,
+            parse_dates,
+            None,
+            is_cancelled,
+            chunk_size,
+        )
+        if frames is None:
+            return None
+
+    if len(frames) == 1:
+        return frames[0]
+    return pd.concat(frames)
+
+
+def preview_text_file(
+    filename: str,
+    sep: str,
+    index_col: Union[int, str, None] = 0,
+    nrows: int = PREVIEW_ROWS,
+) -> Tuple[pd.DataFrame, int]:
+    """
+    Parse the header and the first rows of a file to describe each variable without loading all of it.
+    The number of rows is estimated from the size of the file, using the ratio of text read to bytes read from the
+    file (which differ if it is compressed).
+
+    Returns
+    -------
+    A DataFrame indexed by variable with the inferred 'dtype', the 'na_rate' in the sample, and the
+    'estimated_bytes' of memory when loaded, plus the estimated number of rows
+    """
+    f, raw = open_text_file(filename)
+    with raw, f:
+        header, data = read_header(f)
+        text_bytes = len(header) + len(data)
+        at_end = False
+        blocks = [data]
+        sample_bytes = len(data)
+        sample_lines = data.count(b"\n")
+        sampling = sample_lines < nrows and sample_bytes < PREVIEW_BYTES
+        # Read the sample, then keep reading (without parsing) to estimate the compression ratio
+        while sampling or raw.get_count() < PREVIEW_BYTES:
+            block = f.read(64 * 1024)
+            if len(block) == 0:
+                at_end = True
+                break
+            text_bytes += len(block)
+            if sampling:
+                blocks.append(block)
+                sample_bytes += len(block)
+                sample_lines += block.count(b"\n")
+                sampling = sample_lines < nrows and sample_bytes < PREVIEW_BYTES
+        data = b"".join(blocks)
+        whole_file = at_end and text_bytes == len(header) + len(data)
+        if not whole_file:
+            # Only use complete lines (the last one read is usually cut off)
+            data = data[: data.rfind(b"\n") + 1]
+        file_bytes = raw.get_count()
+    columns = list(pd.read_csv(io.BytesIO(header), sep=sep, nrows=0).columns)
+    if len(data.strip()) == 0:
+        sample = pd.read_csv(io.BytesIO(header), sep=sep, index_col=index_col)
+    else:
+        sample = parse_chunk(data, sep, columns, index_col)
+    if len(sample) == 0 or whole_file:
+        # All of the rows were parsed
+        rows = len(sample)
+    else:
+        total_text_bytes = text_bytes
+        if not at_end:
+            total_text_bytes *= os.path.getsize(filename) / file_bytes
+        rows = int(len(sample) * (total_text_bytes - len(header)) / len(data))
+    bytes_per_row = sample.memory_usage(index=False, deep=True) / max(len(sample), 1)
+    preview = pd.DataFrame(
+        {
+            "dtype": sample.dtypes.astype(str),
+            "na_rate": sample.isna().mean(),
+            "estimated_bytes": (bytes_per_row * rows).round().astype(int),
+        },
+        index=sample.columns,
+    )
+    return preview, rows
+
+
+def read_columns(filename: str, sep: str) -> List[str]:
+    """Read the names of all columns (including the index) from the header"""
+    f, raw = open_text_file(filename)
+    with raw, f:
+        header, _ = read_header(f)
+    return list(pd.read_csv(io.BytesIO(header), sep=sep, nrows=0).columns)
+
+
+def get_compression(filename: str) -> Optional[str]:
+    """Get the compression of a file based on its extension (None if it isn't compressed)"""
+    return COMPRESSIONS.get(Path(filename).suffix.lower())
+
+
+def open_text_file(filename: str) -> Tuple[BinaryIO, "CountingReader"]:
+    """
+    Open a file for reading, decompressing it if needed.
+    Also returns the underlying file, which counts the bytes read from it (before decompression).
+    Both should be closed.
+    """
+    compression = get_compression(filename)
+    raw = CountingReader(open(filename, "rb"))
+    if compression is None:
+        return raw, raw
+    elif compression == "gzip":
+        return gzip.GzipFile(fileobj=raw, mode="rb"), raw
+    elif compression == "bz2":
+        return bz2.BZ2File(raw), raw
+    elif compression == "xz":
+        return lzma.LZMAFile(raw), raw
+    elif compression == "zstd":
+        try:
+            import zstandard
+        except ImportError:
+            raw.close()
+            raise ImportError(
+                "Loading zstd files requires the 'zstandard' package, which isn't installed"
+            )
+        stream = zstandard.ZstdDecompressor().stream_reader(
+            raw, read_across_frames=True
+        )
+        return stream, raw
+
+
+class CountingReader:
+    """A binary file that counts the bytes read from it"""
+
+    def __init__(self, f: BinaryIO):
+        self.f = f
+        self.count = 0
+
+    def read(self, size: int = -1) -> bytes:
+        data = self.f.read(size)
+        self.count += len(data)
+        return data
+
+    def readinto(self, buffer) -> int:
+        size = self.f.readinto(buffer)
+        self.count += size
+        return size
+
+    def readable(self) -> bool:
+        return True
+
+    def get_count(self) -> int:
+        return self.count
+
+    def close(self):
+        self.f.close()
+
+    @property
+    def closed(self) -> bool:
+        return self.f.closed
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def parse_chunks(
+    filename: str,
+    sep: str,
+    index_col: Union[int, str, None],
+    usecols: Optional[List[str]],
+    dtype: Optional[dict],
+    parse_dates: List[str],
+    set_percent: Optional[Callable[[int], None]],
+    is_cancelled: Optional[Callable[[], bool]],
+    chunk_size: int,
+) -> Optional[List[pd.DataFrame]]:
+    """
+    Parse chunks of lines on a thread pool while the next chunk is read (and decompressed).
+    Returns the parsed chunks in order, or None if it was cancelled.
+    """
+    total_bytes = max(os.path.getsize(filename), 1)
+    max_workers = os.cpu_count() or 1
+    done_bytes = [0]
+    lock = threading.Lock()
+
+    def chunk_done(input_bytes):
+        with lock:
+            done_bytes[0] += input_bytes
+            percent = min(int(100 * done_bytes[0] / total_bytes), 100)
+        if set_percent is not None:
+            set_percent(percent)
+
+    f, raw = open_text_file(filename)
+    with raw, f, ThreadPoolExecutor(max_workers=max_workers) as pool:
+        header, rest = read_header(f)
+        columns = list(pd.read_csv(io.BytesIO(header), sep=sep, nrows=0).columns)
+        if usecols is not None:
+            # Positions of the index column would refer to the selected columns, so use its name
+            if isinstance(index_col, int):
+                index_col = columns[index_col]
+            usecols = [c for c in columns if c in set(usecols) or c == index_col]
+        parse_dates = [c for c in parse_dates if c in (usecols or columns)]
+        futures = []
+        for data, input_bytes in iter_chunks(f, rest, raw.get_count, chunk_size):
+            if is_cancelled is not None and is_cancelled():
+                for future in futures:
+                    future.cancel()
+                return None
+            future = pool.submit(
+                parse_chunk,
+                data,
+                sep,
+                columns,
+                index_col,
+                dtype,
+                usecols,
+                parse_dates,
+            )
+            future.add_done_callback(lambda _, b=input_bytes: chunk_done(b))
+            futures.append(future)
+            # Limit the amount of text waiting to be parsed
+            pending = [future for future in futures if not future.done()]
+            if len(pending) > max_workers:
+                wait(pending, return_when=FIRST_COMPLETED)
+        if len(futures) == 0:
+            # No rows
+            return [
+                pd.read_csv(
+                    io.BytesIO(header),
+                    sep=sep,
+                    index_col=index_col,
+                    dtype=dtype,
+                    usecols=usecols,
+                    parse_dates=parse_dates,
+                )
+            ]
+        return [future.result() for future in futures]
+
+
+def read_header(f: BinaryIO) -> Tuple[bytes, bytes]:
+    """Read the header line, returning it along with anything read after it"""
+    data = b""
+    while True:
+        block = f.read(64 * 1024)
+        data += block
+        end = data.find(b"\n")
+        if end != -1:
+            return data[: end + 1], data[end + 1 :]
+        elif len(block) == 0:
+            return data, b""
+
+
+def iter_chunks(
+    f: BinaryIO,
+    leftover: bytes,
+    get_position: Callable[[], int],
+    chunk_size: int,
+) -> Iterator[Tuple[bytes, int]]:
+    """
+    Yield chunks of about chunk_size bytes containing complete lines, along with the number of bytes read from the
+    file for each one (including the header, for the first one).
+    If there are quotes near the start, the rest of the file is returned as a single chunk.
+    """
+    position = 0
+    block = f.read(chunk_size)
+    if b'"' in (leftover + block)[:QUOTE_SAMPLE_SIZE]:
+        block += f.read()
+    while len(block) > 0:
+        data = leftover + block
+        end = data.rfind(b"\n") + 1
+        leftover = data[end:]
+        if end > 0:
+            new_position = get_position()
+            yield data[:end], new_position - position
+            position = new_position
+        block = f.read(chunk_size)
+    # The last line may not end with a newline
+    if len(leftover.strip()) > 0:
+        yield leftover, get_position() - position
+
+
+def parse_chunk(
+    data: bytes,
+    sep: str,
+    columns: List[str],
+    index_col: Union[int, str, None],
+    dtype: Optional[dict] = None,
+    usecols: Optional[List[str]] = None,
+    parse_dates: Optional[List[str]] = None,
+) -> pd.DataFrame:
+    """Parse a chunk of complete lines (without the header)"""
+    return pd.read_csv(
+        io.BytesIO(data),
+        sep=sep,
+        header=None,
+        names=columns,
+        index_col=index_col,
+        dtype=dtype,
+        usecols=usecols,
+        parse_dates=parse_dates,
+    )
+
+
+def get_mixed_columns(frames: List[pd.DataFrame]) -> List[str]:
+    """Get the names of columns (including the index) that were parsed as numbers in some chunks and text in others"""
+    if len(frames) < 2:
+        return []
+    kinds = dict()
+    for df in frames:
+        index_levels = [
+            df.index.get_level_values(level) for level in range(df.index.nlevels)
+        ]
+        for column, dtype in list(df.dtypes.items()) + [
+            (values.name, values.dtype) for values in index_levels
+        ]:
+            kinds.setdefault(column, set()).add(_get_kind(dtype))
+    return [
+        column
+        for column, column_kinds in kinds.items()
+        if column is not None and {"number", "text"} <= column_kinds
+    ]
+
+
+def _get_kind(dtype) -> str:
+    if is_bool_dtype(dtype):
+        return "bool"
+    elif is_numeric_dtype(dtype):
+        return "number"
+    else:
+        return "text"
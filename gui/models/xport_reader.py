@@ -0,0 +1,90 @@
+import math
+from typing import Callable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+XPORT_CHUNK_SIZE = 50000  # Rows read at a time
+# Text in XPORT files is usually ASCII, and latin-1 can decode any bytes
+XPORT_ENCODING = "latin-1"
+
+
+def get_xport_info(filename: str):
+    """Get the variable names and number of observations in a SAS XPORT file without reading the data"""
+    reader = pd.read_sas(
+        filename, format="xport", encoding=XPORT_ENCODING, iterator=True
+    )
+    try:
+        return list(reader.columns), reader.nobs
+    finally:
+        reader.close()
+
+
+def read_xport_file(
+    filename: str,
+    columns: Optional[List[str]] = None,
+    index_col: Optional[str] = None,
+    set_percent: Optional[Callable[[int], None]] = None,
+    is_cancelled: Optional[Callable[[], bool]] = None,
+    chunksize: int = XPORT_CHUNK_SIZE,
+) -> Optional[pd.DataFrame]:
+    """
+    Read a SAS XPORT (.xpt) file in chunks of rows, keeping only some of the variables.
+
+    Parameters
+    ----------
+    columns: Only keep these variables (None for all).  The index column is always kept.
+    index_col: Variable used as the index (None for the first one).  Whole numbers are converted to integers.
+    set_percent: Called with the percent of rows that have been read
+    is_cancelled: Checked after each chunk is read.  If it returns True, the remaining chunks are skipped.
+
+    Returns
+    -------
+    The data, or None if it was cancelled
+    """
+    frames = []
+    reader = pd.read_sas(
+        filename, format="xport", encoding=XPORT_ENCODING, chunksize=chunksize
+    )
+    try:
+        if index_col is None:
+            index_col = reader.columns[0]
+        if columns is not None:
+            columns = [c for c in reader.columns if c in set(columns) or c == index_col]
+        num_chunks = max(math.ceil(reader.nobs / chunksize), 1)
+        for chunk in reader:
+            if is_cancelled is not None and is_cancelled():
+                return None
+            if columns is not None:
+                chunk = chunk[columns]
+            frames.append(chunk)
+            if set_percent is not None:
+                set_percent(int(100 * len(frames) / num_chunks))
+    finally:
+        reader.close()
+    if len(frames) == 0:
+        df = pd.DataFrame(columns=columns or get_xport_info(filename)[0])
+    else:
+        df = pd.concat(frames, ignore_index=True)
+    df = df.set_index(index_col)
+    # SAS only stores numbers as floats, but IDs (such as SEQN) are whole numbers
+    index = df.index
+    if (
+        index.dtype.kind == "f"
+        and not index.hasnans
+        and np.array_equal(index, np.round(index))
+    ):
+        df.index = index.astype("int64")
+    return df
+
+
+def get_xport_read_code(
+    filename: str, columns: Optional[List[str]] = None, index_col: Optional[str] = None
+) -> str:
+    """Python code equivalent to read_xport_file (given the name of the index column)"""
+    code = f"pd.read_sas('{filename}', format='xport', encoding='{XPORT_ENCODING}')"
+    if columns is not None:
+        code += f"[{columns!r}]"
+    if index_col is not None:
+        code += f".set_index({index_col!r})"
+    return code
@@ -88,9 +88,9 @@ class CorrectedPvalDialog(QDialog):
                 f"A dataset named '{self.data_name}' already exists.\n"
                 f"Use a different name or clear the dataset name field.",
             )
-        elif "converged" not in list(self.dataset.df):
+        elif not self.dataset.has_column("converged"):
             show_warning("Incorrect Data Input", "A 'converged' column must be present")
-        elif "pvalue" not in list(self.dataset.df):
+        elif not self.dataset.has_column("pvalue"):
             show_warning("Incorrect Data Input", "A 'pvalue' column must be present")
         else:
             print(f"Adding corrected P-values...")
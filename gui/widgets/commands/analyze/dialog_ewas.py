@@ -1,3 +1,5 @@
+from functools import partial
+
 import clarite
 import pandas as pd
 from PyQt5.QtCore import pyqtSlot
@@ -41,6 +43,8 @@ class EWASDialog(QDialog):
         self.min_n = 200
         self.regression_kind = "glm"
         self.use_survey = False
+        # Optionally run in a separate process, so it stops as soon as it is cancelled (but its output isn't logged)
+        self.isolate = False
         # Survey Params
         self.survey_df = None
         self.strata = None
@@ -53,13 +57,16 @@ class EWASDialog(QDialog):
         # Setup UI
         self.setup_ui()
 
-    def get_func(self):
-        """Return a function with no parameters to be run in a thread"""
-        # Saved results name
+    def get_data_name(self):
+        """Saved results name"""
         if self.data_name is None:
-            data_name = f"EWAS Results for {self.appctx.datasets[self.appctx.current_dataset_idx].name}"
+            return f"EWAS Results for {self.appctx.datasets[self.appctx.current_dataset_idx].name}"
         else:
-            data_name = self.data_name
+            return self.data_name
+
+    def get_func(self):
+        """Return a function with no parameters to be run in a thread"""
+        data_name = self.get_data_name()
 
         # EWAS parameters
         kwargs = {
@@ -83,12 +90,25 @@ class EWASDialog(QDialog):
                 drop_unweighted=self.drop_unweighted,
             )
 
+        if self.isolate:
+            # Only the results are returned (and wrapped by the slot), since the function must be picklable
+            return partial(clarite.analyze.ewas, **kwargs)
+
         def f():
             result = clarite.analyze.ewas(**kwargs)
             return Dataset(data_name, "ewas_result", result)
 
         return f
 
+    def get_slot(self):
+        """Return the slot that adds the results"""
+        if not self.isolate:
+            return self.appctx.add_dataset
+        data_name = self.get_data_name()
+        return lambda result: self.appctx.add_dataset(
+            Dataset(data_name, "ewas_result", result)
+        )
+
     def log_command(self):
         old_data_name = self.dataset.get_python_name()  # Original selected data
         new_data_name = self.appctx.datasets[
@@ -262,6 +282,16 @@ class EWASDialog(QDialog):
             "Single Cluster Handling", self.single_cluster_combobox
         )
 
+        # Separate process
+        self.isolate_checkbox = QCheckBox(self)
+        self.isolate_checkbox.setChecked(self.isolate)
+        self.isolate_checkbox.setToolTip(
+            "Cancelling stops the EWAS immediately, but its output (such as skipped variables) isn't logged.  "
+            "Starting the process and copying the data takes a few seconds."
+        )
+        self.isolate_checkbox.stateChanged.connect(self.update_isolate)
+        layout.addRow("Run in a separate process", self.isolate_checkbox)
+
         # Ok/Cancel
         QBtn = QDialogButtonBox.Ok | QDialogButtonBox.Cancel
 
@@ -294,19 +324,23 @@ class EWASDialog(QDialog):
         else:
             print(f"Running EWAS...")
             # Run with a progress dialog
+            dataset_count = self.appctx.dataset_count
             RunProgress.run_with_progress(
                 progress_str="Running EWAS...",
                 function=self.get_func(),
-                slot=self.appctx.add_dataset,
+                slot=self.get_slot(),
                 parent=self,
+                isolate=self.isolate,
             )
-            self.log_command()
+            # Only log the command if it wasn't cancelled and didn't fail
+            if self.appctx.dataset_count > dataset_count:
+                self.log_command()
             self.accept()
 
     def launch_get_outcome(self):
         """Launch a dialog to set the phenotype"""
         phenotype = SelectColumnDialog.get_column(
-            columns=list(self.dataset.df), selected=self.outcome, parent=self
+            columns=self.dataset.get_column_names(), selected=self.outcome, parent=self
         )
         if phenotype is not None:
             self.outcome = phenotype
@@ -315,10 +349,15 @@ class EWASDialog(QDialog):
     def launch_get_covariates(self):
         """Launch a dialog to set the covariates"""
         _, skip, only = SkipOnlyDialog.get_skip_only(
-            columns=list(self.dataset.df), skip=None, only=self.covariates, parent=self
+            columns=self.dataset.get_column_names(),
+            skip=None,
+            only=self.covariates,
+            parent=self,
         )
         if skip is not None:
-            self.covariates = [v for v in list(self.dataset.df) if v not in skip]
+            self.covariates = [
+                v for v in self.dataset.get_column_names() if v not in skip
+            ]
         elif only is not None:
             self.covariates = only
         else:
@@ -370,7 +409,7 @@ class EWASDialog(QDialog):
     def launch_get_strata(self):
         """Launch a dialog to set the strata column from the survey df"""
         strata = SelectColumnDialog.get_column(
-            columns=list(self.survey_df.df), selected=self.strata, parent=self
+            columns=self.survey_df.get_column_names(), selected=self.strata, parent=self
         )
         if strata is not None:
             self.strata = strata
@@ -379,7 +418,9 @@ class EWASDialog(QDialog):
     def launch_get_cluster(self):
         """Launch a dialog to set the cluster column from the survey df"""
         cluster = SelectColumnDialog.get_column(
-            columns=list(self.survey_df.df), selected=self.cluster, parent=self
+            columns=self.survey_df.get_column_names(),
+            selected=self.cluster,
+            parent=self,
         )
         if cluster is not None:
             self.cluster = cluster
@@ -392,7 +433,7 @@ class EWASDialog(QDialog):
     def launch_get_fpc(self):
         """Launch a dialog to set the fpc column from the survey df"""
         fpc = SelectColumnDialog.get_column(
-            columns=list(self.survey_df.df), selected=self.fpc, parent=self
+            columns=self.survey_df.get_column_names(), selected=self.fpc, parent=self
         )
         if fpc is not None:
             self.fpc = fpc
@@ -426,7 +467,7 @@ class EWASDialog(QDialog):
     def launch_get_weight_single(self):
         """Launch a dialog to set the single weight variable"""
         selected_variable = SelectColumnDialog.get_column(
-            columns=list(self.survey_df.df), selected=None, parent=self
+            columns=self.survey_df.get_column_names(), selected=None, parent=self
         )
         if selected_variable is not None:
             self.weights = selected_variable
@@ -468,10 +509,12 @@ class EWASDialog(QDialog):
         weights = weights.to_dict()["weight"]
 
         # Check that some variables/weights matched
-        unique_vars = len(set(weights.keys()) & set(list(self.dataset.df)))
-        unique_weights = len(set(weights.values()) & set(list(self.survey_df.df)))
+        unique_vars = len(set(weights.keys()) & set(self.dataset.get_column_names()))
+        unique_weights = len(
+            set(weights.values()) & set(self.survey_df.get_column_names())
+        )
         missing_weights = (
-            set(list(self.dataset.df))
+            set(self.dataset.get_column_names())
             - set(weights.keys())
             - set(weights.values())
             - set(self.covariates)
@@ -514,6 +557,10 @@ class EWASDialog(QDialog):
                 f"assigned to {unique_vars:,} variables"
             )
 
+    def update_isolate(self):
+        """Update the isolate parameter to match the checkbox"""
+        self.isolate = self.isolate_checkbox.isChecked()
+
     def update_drop_unweighted(self):
         """Update the nest parameter to match the checkbox"""
         self.drop_unweighted = self.drop_unweighted_checkbox.isChecked()
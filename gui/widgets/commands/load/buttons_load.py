@@ -1,6 +1,9 @@
 from PyQt5.QtWidgets import QVBoxLayout, QPushButton, QWidget
 
+from .dialog_batch import BatchLoadDialog
+from .dialog_from_binary import FromBinaryDialog
 from .dialog_from_txt import FromTxtDialog
+from .dialog_from_xport import FromXportDialog
 
 
 class LoadButtons(QWidget):
@@ -24,6 +27,21 @@ class LoadButtons(QWidget):
         btn_from_tsv = QPushButton(text="From TSV", parent=self)
         btn_from_tsv.clicked.connect(lambda: self.show_load_from("TSV"))
         layout.addWidget(btn_from_tsv)
+        # From columnar binary formats
+        for kind in ["Parquet", "Feather", "HDF5"]:
+            btn_from_binary = QPushButton(text=f"From {kind}", parent=self)
+            btn_from_binary.clicked.connect(
+                lambda _, kind=kind: self.show_load_from_binary(kind)
+            )
+            layout.addWidget(btn_from_binary)
+        # From SAS XPORT
+        btn_from_xport = QPushButton(text="From XPT", parent=self)
+        btn_from_xport.clicked.connect(self.show_load_from_xport)
+        layout.addWidget(btn_from_xport)
+        # Batch of text files
+        btn_batch = QPushButton(text="Batch Load", parent=self)
+        btn_batch.clicked.connect(self.show_batch_load)
+        layout.addWidget(btn_batch)
         # Spacer at the end
         layout.addStretch()
 
@@ -31,3 +49,15 @@ class LoadButtons(QWidget):
     def show_load_from(self, kind):
         dlg = FromTxtDialog(parent=self.appctx.main_window, kind=kind)
         dlg.show()
+
+    def show_load_from_binary(self, kind):
+        dlg = FromBinaryDialog(parent=self.appctx.main_window, kind=kind)
+        dlg.show()
+
+    def show_load_from_xport(self):
+        dlg = FromXportDialog(parent=self.appctx.main_window)
+        dlg.show()
+
+    def show_batch_load(self):
+        dlg = BatchLoadDialog(parent=self.appctx.main_window)
+        dlg.show()
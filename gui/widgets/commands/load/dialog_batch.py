@@ -0,0 +1,259 @@
+import time
+from pathlib import Path
+
+from PyQt5.QtWidgets import (
+    QComboBox,
+    QDialog,
+    QFileDialog,
+    QDialogButtonBox,
+    QFormLayout,
+    QLabel,
+    QPushButton,
+    QLineEdit,
+)
+
+from gui.models import Dataset, find_batch_files, read_batch
+from gui.widgets.utilities import warnings, RunProgress
+
+
+class BatchLoadDialog(QDialog):
+    """
+    This dialog loads several text files (a folder, or files matching a pattern) as one dataset.
+    Files are read in parallel worker processes and joined in a single step, either stacking their observations
+    (like merging observations) or aligning their variables on the index (like merging variables).
+    """
+
+    SEPARATORS = {"CSV": ",", "TSV": "\t"}
+    EXTENSIONS = {"CSV": [".csv", ".txt"], "TSV": [".tsv", ".txt"]}
+    JOIN_OPTIONS = {
+        "Stack Rows (Merge Observations)": "observations",
+        "Align Columns (Merge Variables)": "variables",
+    }
+    HOW_OPTIONS = ["outer", "inner"]
+
+    def __init__(self, *args, **kwargs):
+        super(BatchLoadDialog, self).__init__(*args, **kwargs)
+        self.appctx = self.parent().appctx
+        # Data
+        self.path = None
+        self.filenames = []
+        self.kind = "TSV"
+        self.data_name = None
+        self.index_col = 0  # First column by default
+        self.join_on = "observations"
+        self.how = "outer"
+        # Setup UI
+        self.setup_ui()
+
+    def get_func(self):
+        """Return a function with no parameters to be run in a thread"""
+        filenames = list(self.filenames)
+        sep = self.SEPARATORS[self.kind]
+        index_col = self.index_col
+        join_on = self.join_on
+        how = self.how
+        data_name = self.data_name
+
+        def f(thread):
+            start = time.time()
+            df = read_batch(
+                filenames,
+                sep,
+                index_col,
+                join_on,
+                how,
+                set_percent=thread.set_percent,
+                is_cancelled=lambda: thread.cancelled,
+            )
+            if df is None:
+                print(f"Cancelled loading {len(filenames):,} files")
+                return None
+            print(
+                f"Loaded {len(df):,} observations of {len(df.columns):,} variables "
+                f"from {len(filenames):,} files in {time.time() - start:.2f} s"
+            )
+            return Dataset(data_name, "dataset", df)
+
+        return f
+
+    def log_command(self):
+        # Log the addition of the dataset (The new dataset is the current one)
+        dataset_name = self.appctx.datasets[
+            self.appctx.current_dataset_idx
+        ].get_python_name()
+        load_func = f"clarite.load.from_{self.kind.lower()}"
+        axis = 0 if self.join_on == "observations" else 1
+        self.appctx.log_python(
+            f"import pandas as pd\n"
+            f"filenames = {self.filenames!r}\n"
+            f"{dataset_name} = pd.concat("
+            f"[{load_func}(filename=f, index_col={self.index_col!r}) for f in filenames], "
+            f"axis={axis}, join={self.how!r}, sort=False)"
+        )
+
+    def setup_ui(self):
+        self.setWindowTitle("Load - Batch")
+        self.setMinimumWidth(500)
+        self.setModal(True)
+
+        self.layout = QFormLayout(self)
+
+        # Select Folder Button
+        self.btn_select_folder = QPushButton(text="Select Folder", parent=self)
+        self.btn_select_folder.clicked.connect(self.launch_dlg_get_folder)
+        self.layout.addWidget(self.btn_select_folder)
+
+        # Folder or pattern
+        self.le_path = QLineEdit()
+        self.le_path.setPlaceholderText("Folder, or a pattern like 'data/*.tsv'")
+        self.le_path.textChanged.connect(self.update_path)
+        self.layout.addRow("Files: ", self.le_path)
+
+        # File type
+        self.kind_select = QComboBox(self)
+        self.kind_select.addItems(list(self.SEPARATORS))
+        self.kind_select.setCurrentText(self.kind)
+        self.kind_select.currentTextChanged.connect(self.update_kind)
+        self.layout.addRow("File Type: ", self.kind_select)
+        self.files_label = QLabel("Select a folder or enter a pattern", parent=self)
+        self.layout.addRow(self.files_label)
+
+        # Data Name
+        self.le_data_name = QLineEdit(self.data_name)
+        self.le_data_name.setPlaceholderText("")
+        self.le_data_name.textChanged.connect(self.update_data_name)
+        self.layout.addRow("Dataset Name: ", self.le_data_name)
+
+        # Index Column
+        self.le_index_col = QLineEdit()
+        self.le_index_col.setPlaceholderText("None (Use first column)")
+        self.le_index_col.textChanged.connect(self.update_index_col)
+        self.layout.addRow("Index Column Name: ", self.le_index_col)
+
+        # Join
+        self.join_select = QComboBox(self)
+        self.join_select.addItems(list(self.JOIN_OPTIONS))
+        self.join_select.currentTextChanged.connect(self.update_join_on)
+        self.layout.addRow("Join: ", self.join_select)
+
+        # How
+        self.how_select = QComboBox(self)
+        self.how_select.addItems(self.HOW_OPTIONS)
+        self.how_select.setToolTip(
+            "'outer' keeps everything, 'inner' keeps only the variables (when stacking rows) "
+            "or observations (when aligning columns) found in every file"
+        )
+        self.how_select.currentTextChanged.connect(self.update_how)
+        self.layout.addRow("How: ", self.how_select)
+
+        # Ok/Cancel
+        QBtn = QDialogButtonBox.Ok | QDialogButtonBox.Cancel
+
+        self.buttonBox = QDialogButtonBox(QBtn)
+        self.buttonBox.accepted.connect(self.submit)
+        self.buttonBox.rejected.connect(self.reject)
+        self.layout.addRow(self.buttonBox)
+
+    def submit(self):
+        if self.path is None:
+            self.reject()
+            return
+        elif len(self.filenames) == 0:
+            warnings.show_warning(
+                title="No Files Found",
+                text=f"No {self.kind} files were found in:\n'{self.path}'",
+            )
+            return
+        elif self.data_name is None:
+            warnings.show_warning(
+                title="Missing Dataset Name", text="Enter a name for the dataset."
+            )
+            return
+        elif self.data_name in [d.name for d in self.appctx.datasets]:
+            warnings.show_warning(
+                title="Dataset already exists",
+                text=f"A dataset named '{self.data_name}' already exists.  Use a different name.",
+            )
+            return
+        dataset_count = self.appctx.dataset_count
+        RunProgress.run_with_progress(
+            progress_str=f"Loading {len(self.filenames):,} {self.kind} files...",
+            function=self.get_func(),
+            slot=self.appctx.add_dataset,
+            parent=self,
+            report_progress=True,
+        )
+        # Only log the command if it wasn't cancelled and didn't fail
+        if self.appctx.dataset_count > dataset_count:
+            self.log_command()
+        self.accept()
+
+    def find_files(self):
+        """List the files matching the folder or pattern"""
+        if self.path is None:
+            self.filenames = []
+            self.files_label.setText("Select a folder or enter a pattern")
+            return
+        self.filenames = find_batch_files(self.path, self.EXTENSIONS[self.kind])
+        if len(self.filenames) == 0:
+            self.files_label.setText("No files found")
+        else:
+            names = [Path(f).name for f in self.filenames]
+            if len(names) > 5:
+                names = names[:5] + ["..."]
+            self.files_label.setText(
+                f"{len(self.filenames):,} files found: {', '.join(names)}"
+            )
+
+    #########
+    # Slots #
+    #########
+    def update_path(self):
+        text = self.le_path.text()
+        if len(text.strip()) == 0:
+            self.path = None
+        else:
+            self.path = text
+            # Update data_name automatically if it doesn't have one
+            if self.data_name is None:
+                path = Path(self.path)
+                self.data_name = path.name if path.is_dir() else path.parent.name
+                self.le_data_name.setText(self.data_name)
+        self.find_files()
+
+    def update_kind(self, text: str):
+        self.kind = text
+        self.find_files()
+
+    def update_data_name(self):
+        text = self.le_data_name.text()
+        if len(text.strip()) == 0:
+            self.data_name = None
+        else:
+            self.data_name = text
+
+    def update_index_col(self):
+        text = self.le_index_col.text()
+        if len(text.strip()) > 0:
+            self.index_col = text
+        else:
+            self.index_col = 0
+
+    def update_join_on(self, text: str):
+        self.join_on = self.JOIN_OPTIONS[text]
+
+    def update_how(self, text: str):
+        self.how = text
+
+    ###############
+    # Sub-dialogs #
+    ###############
+    def launch_dlg_get_folder(self):
+        """Launch a dialog to select the folder"""
+        options = QFileDialog.Options()
+        options |= QFileDialog.DontUseNativeDialog
+        folder = QFileDialog.getExistingDirectory(
+            self, "Load - Batch Folder", "", options=options
+        )
+        if folder:
+            self.le_path.setText(folder)
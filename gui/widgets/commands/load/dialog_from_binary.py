@@ -0,0 +1,356 @@
+from pathlib import Path
+
+from PyQt5.QtWidgets import (
+    QComboBox,
+    QDialog,
+    QFileDialog,
+    QDialogButtonBox,
+    QFormLayout,
+    QLabel,
+    QPushButton,
+    QLineEdit,
+)
+
+from gui.models import (
+    Dataset,
+    apply_dtypes,
+    get_binary_columns,
+    get_hdf_keys,
+    get_read_code,
+    get_row_group_count,
+    parse_row_groups,
+    read_binary_file,
+    read_dtypes,
+)
+from gui.widgets import SkipOnlyDialog
+from gui.widgets.utilities import warnings, RunProgress
+
+
+class FromBinaryDialog(QDialog):
+    """
+    This dialog allows loading files from a columnar binary format, which keeps the saved dtypes.
+    If types were saved next to the file (in a '.dtypes' file), they are restored where the format doesn't keep them.
+    Only some of the variables may be loaded, and only some rows (by row group for Parquet, or a query for HDF5).
+    Currently supported types:
+       - Parquet (requires pyarrow)
+       - Feather (requires pyarrow)
+       - HDF5 (requires PyTables)
+    """
+
+    EXTENSIONS = {
+        "Parquet": "*.parquet *.pq",
+        "Feather": "*.feather *.arrow",
+        "HDF5": "*.h5 *.hdf5 *.hdf",
+    }
+
+    def __init__(self, kind, *args, **kwargs):
+        super(FromBinaryDialog, self).__init__(*args, **kwargs)
+        self.appctx = self.parent().appctx
+        # Kind of file being loaded
+        if kind not in self.EXTENSIONS:
+            raise ValueError(f"{kind} isn't a supported file loader")
+        else:
+            self.kind = kind
+        # Data
+        self.filename = None
+        self.data_name = None
+        self.index_col = None  # Use the saved index by default
+        self.key = None  # HDF5 dataset
+        self.columns = None  # All columns in the file
+        self.skip = None
+        self.only = None
+        self.row_groups_text = ""
+        self.row_group_count = 0
+        self.where = None
+        # Setup UI
+        self.setup_ui()
+
+    def get_columns(self):
+        """Get the columns to load (None for all of them)"""
+        if self.only is not None and len(self.only) > 0:
+            columns = list(self.only)
+        elif self.skip is not None and len(self.skip) > 0:
+            columns = [c for c in self.columns if c not in set(self.skip)]
+        else:
+            return None
+        # The index column must be loaded
+        if self.index_col is not None and self.index_col not in columns:
+            columns.append(self.index_col)
+        return columns
+
+    def get_func(self):
+        """Return a function with no parameters to be run in a thread"""
+        filename = self.filename
+        data_name = self.data_name
+        index_col = self.index_col
+        read_args = self.get_read_args()
+        dtypes_file = self.get_dtypes_file()
+
+        # Get Function
+        def f():
+            df = read_binary_file(self.kind, filename, **read_args)
+            if index_col is not None:
+                df = df.set_index(index_col)
+            if dtypes_file is not None:
+                df = apply_dtypes(df, read_dtypes(dtypes_file))
+                print(f"Using the types saved in '{dtypes_file}'")
+            print(f"Loaded {len(df):,} observations of {len(df.columns):,} variables")
+            return Dataset(data_name, "dataset", df)
+
+        return f
+
+    def get_read_args(self):
+        """Arguments for read_binary_file.  Raises a ValueError if the row groups aren't valid."""
+        return {
+            "columns": self.get_columns(),
+            "row_groups": (
+                parse_row_groups(self.row_groups_text, self.row_group_count)
+                if self.kind == "Parquet"
+                else None
+            ),
+            "key": self.key,
+            "where": self.where,
+        }
+
+    def log_command(self):
+        # Log the addition of the dataset (The new dataset is the current one)
+        dataset_name = self.appctx.datasets[
+            self.appctx.current_dataset_idx
+        ].get_python_name()
+        read_args = self.get_read_args()
+        imports = "import pandas as pd"
+        if read_args["row_groups"] is not None:
+            imports += "\nimport pyarrow.parquet as pq"
+        code = get_read_code(self.kind, self.filename, **read_args)
+        self.appctx.log_python(f"{imports}\n{dataset_name} = {code}")
+        if self.index_col is not None:
+            self.appctx.log_python(
+                f"{dataset_name} = {dataset_name}.set_index({self.index_col!r})"
+            )
+        if self.get_dtypes_file() is not None:
+            self.appctx.log_python(
+                f"# Variables in {dataset_name} were converted to the types listed in '{self.get_dtypes_file()}'"
+            )
+
+    def get_dtypes_file(self):
+        """The '.dtypes' file saved next to the file, if it exists"""
+        if self.filename is None:
+            return None
+        dtypes_file = Path(self.filename + ".dtypes")
+        if dtypes_file.is_file():
+            return dtypes_file
+        return None
+
+    def setup_ui(self):
+        self.setWindowTitle(f"Load - From {self.kind}")
+        self.setMinimumWidth(500)
+        self.setModal(True)
+
+        self.layout = QFormLayout(self)
+
+        # Load Button
+        self.btn_select_file = QPushButton(text="Select File", parent=self)
+        self.btn_select_file.clicked.connect(self.launch_dlg_get_file)
+        self.layout.addWidget(self.btn_select_file)
+
+        # Filename
+        self.le_selected_file = QLineEdit(self.filename)
+        self.le_selected_file.setPlaceholderText(f"{self.kind} File")
+        self.le_selected_file.textChanged.connect(self.update_filename)
+        self.layout.addRow("Filename: ", self.le_selected_file)
+
+        # HDF5 Key
+        if self.kind == "HDF5":
+            self.key_selector = QComboBox(self)
+            self.key_selector.currentTextChanged.connect(self.update_key)
+            self.layout.addRow("Key: ", self.key_selector)
+
+        # Data Name
+        self.le_data_name = QLineEdit(self.data_name)
+        self.le_data_name.setPlaceholderText("")
+        self.le_data_name.textChanged.connect(self.update_data_name)
+        self.layout.addRow("Dataset Name: ", self.le_data_name)
+
+        # Index Column
+        self.le_index_col = QLineEdit()
+        self.le_index_col.setPlaceholderText("None (Use the saved index)")
+        self.le_index_col.textChanged.connect(self.update_index_col)
+        self.layout.addRow("Index Column Name: ", self.le_index_col)
+
+        # Variables
+        self.btn_skiponly = QPushButton("Select Variables", parent=self)
+        self.btn_skiponly.setEnabled(False)
+        self.btn_skiponly.clicked.connect(self.launch_skiponly)
+        self.layout.addRow("Variables: ", self.btn_skiponly)
+        self.skiponly_label = QLabel("Select a file to list its variables", parent=self)
+        self.layout.addRow(self.skiponly_label)
+
+        # Rows
+        if self.kind == "Parquet":
+            self.le_row_groups = QLineEdit()
+            self.le_row_groups.setPlaceholderText("All")
+            self.le_row_groups.setToolTip(
+                "Row groups to load, starting at 0 (for example '0-3, 7')"
+            )
+            self.le_row_groups.textChanged.connect(self.update_row_groups)
+            self.layout.addRow("Row Groups: ", self.le_row_groups)
+        elif self.kind == "HDF5":
+            self.le_where = QLineEdit()
+            self.le_where.setPlaceholderText("All rows")
+            self.le_where.setToolTip(
+                "Query selecting rows (only for data saved in the 'table' format), for example 'index > 100'"
+            )
+            self.le_where.textChanged.connect(self.update_where)
+            self.layout.addRow("Where: ", self.le_where)
+
+        # Ok/Cancel
+        QBtn = QDialogButtonBox.Ok | QDialogButtonBox.Cancel
+
+        self.buttonBox = QDialogButtonBox(QBtn)
+        self.buttonBox.accepted.connect(self.submit)
+        self.buttonBox.rejected.connect(self.reject)
+        self.layout.addRow(self.buttonBox)
+
+        # Set size
+        self.setMinimumWidth(400)
+
+    def submit(self):
+        if self.filename is None:
+            self.reject()
+            return
+        datafile = Path(self.filename)
+        if not datafile.exists():
+            warnings.show_warning(
+                title="File Not Found",
+                text=f"The file could not be found:\n'{str(datafile)}''",
+            )
+            return
+        elif not datafile.is_file():
+            warnings.show_warning(
+                title="Not a File",
+                text=f"A folder was given instead of a file:\n'{str(datafile)}''",
+            )
+            return
+        elif self.data_name in [d.name for d in self.appctx.datasets]:
+            warnings.show_warning(
+                title="Dataset already exists",
+                text=f"A dataset named '{self.data_name}' already exists.  Use a different name.",
+            )
+            return
+        try:
+            self.get_read_args()
+        except ValueError as e:
+            warnings.show_warning(title="Invalid Row Groups", text=str(e))
+            return
+        dataset_count = self.appctx.dataset_count
+        RunProgress.run_with_progress(
+            progress_str=f"Loading {self.kind} file...",
+            function=self.get_func(),
+            slot=self.appctx.add_dataset,
+            parent=self,
+        )
+        # Only log the command if it didn't fail
+        if self.appctx.dataset_count > dataset_count:
+            self.log_command()
+        self.accept()
+
+    def read_schema(self):
+        """List the variables (and HDF5 keys or Parquet row groups) in the selected file"""
+        self.columns = None
+        self.skip = None
+        self.only = None
+        self.btn_skiponly.setEnabled(False)
+        if self.filename is None or not Path(self.filename).is_file():
+            self.skiponly_label.setText("Select a file to list its variables")
+            return
+        try:
+            if self.kind == "HDF5" and self.key is None:
+                keys = get_hdf_keys(self.filename)
+                # Selecting a key reads the schema again
+                self.key_selector.clear()
+                self.key_selector.addItems(keys)
+                return
+            self.columns = get_binary_columns(self.kind, self.filename, self.key)
+            if self.kind == "Parquet":
+                self.row_group_count = get_row_group_count(self.filename)
+                self.le_row_groups.setPlaceholderText(
+                    f"All ({self.row_group_count:,} row groups)"
+                )
+        except Exception as e:
+            self.skiponly_label.setText(f"Couldn't read the file: {e}")
+            return
+        self.skiponly_label.setText(f"Using all {len(self.columns):,} variables")
+        self.btn_skiponly.setEnabled(True)
+
+    #########
+    # Slots #
+    #########
+    def update_filename(self):
+        text = self.le_selected_file.text()
+        if len(text.strip()) == 0:
+            self.filename = None
+        else:
+            self.filename = text
+            # Update data_name automatically if it doesn't have one
+            if self.data_name is None:
+                self.data_name = Path(self.filename).stem
+                self.le_data_name.setText(self.data_name)
+        self.key = None
+        self.read_schema()
+
+    def update_key(self, text: str):
+        self.key = text if len(text) > 0 else None
+        if self.key is not None:
+            self.read_schema()
+
+    def update_data_name(self):
+        text = self.le_data_name.text()
+        if len(text.strip()) == 0:
+            self.data_name = None
+        else:
+            self.data_name = text
+
+    def update_index_col(self):
+        text = self.le_index_col.text()
+        if len(text.strip()) > 0:
+            self.index_col = text
+        else:
+            self.index_col = None
+
+    def update_row_groups(self):
+        self.row_groups_text = self.le_row_groups.text()
+
+    def update_where(self):
+        text = self.le_where.text()
+        if len(text.strip()) > 0:
+            self.where = text
+        else:
+            self.where = None
+
+    ###############
+    # Sub-dialogs #
+    ###############
+    def launch_dlg_get_file(self):
+        """Launch a dialog to select the file"""
+        options = QFileDialog.Options()
+        options |= QFileDialog.DontUseNativeDialog
+        filename, _ = QFileDialog.getOpenFileName(
+            self,
+            f"Load - From {self.kind} File",
+            "",
+            f"{self.kind} Files ({self.EXTENSIONS[self.kind]})",
+            options=options,
+        )
+        # Set filename
+        self.le_selected_file.setText(filename)
+        return
+
+    def launch_skiponly(self):
+        """Launch a dialog to select the variables that are loaded"""
+        text, self.skip, self.only = SkipOnlyDialog.get_skip_only(
+            columns=self.columns,
+            skip=self.skip,
+            only=self.only,
+            parent=self,
+        )
+        self.skiponly_label.setText(text)
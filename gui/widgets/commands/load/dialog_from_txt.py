@@ -1,27 +1,53 @@
+import time
 from pathlib import Path
 
-import clarite
+from PyQt5.QtCore import QTimer
 from PyQt5.QtWidgets import (
+    QAbstractItemView,
+    QCheckBox,
     QDialog,
     QFileDialog,
     QDialogButtonBox,
     QFormLayout,
+    QHeaderView,
+    QLabel,
     QPushButton,
     QLineEdit,
+    QTableWidget,
+    QTableWidgetItem,
 )
 
-from gui.models import Dataset
+from gui.models import (
+    COMPRESSIONS,
+    Dataset,
+    get_compression,
+    preview_text_file,
+    read_columns,
+    read_dtypes,
+    compact_data,
+    format_bytes,
+    read_text_file,
+)
+from gui.widgets import SkipOnlyDialog
 from gui.widgets.utilities import warnings, RunProgress
 
 
 class FromTxtDialog(QDialog):
     """
     This dialog allows loading files from a text format, including specifying a dataset name and the index column.
+    The first rows of the file are previewed, so that only the needed variables are parsed.
+    If types were saved next to the file (in a '.dtypes' file), they can be used instead of inferring them.
+    Parsed data is saved to the parse cache (see ParseCache), so loading the same file again is faster.
+    Optionally, the loaded data may be converted to compact dtypes (see compact_dtypes) to use less memory.
     Currently supported types (each maps to a different CLARITE load.from_ function):
        - tsv (tab-separated)
        - csv (comma-separated)
+    Files compressed with gzip, bz2, xz or zstd (see COMPRESSIONS) are decompressed while they are loaded.
     """
 
+    SEPARATORS = {"CSV": ",", "TSV": "\t"}
+    PREVIEW_DELAY = 500  # Milliseconds after the filename or index column is edited before the preview is updated
+
     def __init__(self, kind, *args, **kwargs):
         super(FromTxtDialog, self).__init__(*args, **kwargs)
         self.appctx = self.parent().appctx
@@ -34,27 +60,114 @@ class FromTxtDialog(QDialog):
         self.filename = None
         self.data_name = None
         self.index_col = 0  # First column by default
+        self.compact = False
+        self.use_saved_types = (
+            False  # Only when chosen, since a compact load saves types
+        )
         self.df = None
+        self.preview = (
+            None  # Inferred type, NA rate and estimated memory of each variable
+        )
+        self.preview_rows = 0  # Estimated number of rows
+        self.columns = None  # All columns in the file, including the index
+        self.skip = None
+        self.only = None
         # Setup UI
         self.setup_ui()
 
+    def get_usecols(self):
+        """Get the variables to load (None for all of them).  The index column is always loaded."""
+        if self.only is not None and len(self.only) > 0:
+            return list(self.only)
+        elif self.skip is not None and len(self.skip) > 0:
+            skip = set(self.skip)
+            return [c for c in self.preview.index if c not in skip]
+        else:
+            return None
+
     def get_func(self):
         """Return a function with no parameters to be run in a thread"""
         filename = self.filename
         data_name = self.data_name
         index_col = self.index_col
         kind = self.kind
+        compact = self.compact
+        usecols = self.get_usecols()
+        dtypes_file = self.get_dtypes_file()
+        cache = self.appctx.get_parse_cache()
 
         # Get Function
-        def f():
-            if kind == "CSV":
-                df = clarite.load.from_csv(filename, index_col)
-            elif kind == "TSV":
-                df = clarite.load.from_tsv(filename, index_col)
+        def f(thread):
+            # Equivalent to clarite.load.from_csv/from_tsv, parsing chunks of the file in parallel
+            dtype = None
+            if dtypes_file is not None:
+                dtype = read_dtypes(dtypes_file)
+                print(f"Using the types saved in '{dtypes_file}'")
+            start = time.time()
+            df = None
+            if cache is not None:
+                options = {
+                    "sep": self.SEPARATORS[kind],
+                    "index_col": index_col,
+                    "usecols": usecols,
+                    "dtypes": dtypes_file.read_text() if dtypes_file else None,
+                }
+                key = cache.get_key(filename, options)
+                try:
+                    df = cache.get(key)
+                except Exception as e:
+                    print(f"Couldn't read from the parse cache: {e}")
+            if df is not None:
+                print(
+                    f"Parse cache hit: read '{filename}' from the cache in {time.time() - start:.2f} s"
+                )
+            else:
+                try:
+                    df = read_text_file(
+                        filename,
+                        sep=self.SEPARATORS[kind],
+                        index_col=index_col,
+                        set_percent=thread.set_percent,
+                        is_cancelled=lambda: thread.cancelled,
+                        usecols=usecols,
+                        dtype=dtype,
+                    )
+                except (ValueError, TypeError) as e:
+                    if dtype is None:
+                        raise
+                    raise ValueError(
+                        f"The types saved in '{dtypes_file}' don't match the data ({e}).  "
+                        f"Load the file without using the saved types instead."
+                    )
+                if df is None:
+                    print(f"Cancelled loading '{filename}'")
+                    return None
+                if cache is None:
+                    print(f"Parsed '{filename}' in {time.time() - start:.2f} s")
+                else:
+                    print(
+                        f"Parse cache miss: parsed '{filename}' in {time.time() - start:.2f} s"
+                    )
+                    self.save_to_cache(cache, key, df)
+            print(f"Loaded {len(df):,} observations of {len(df.columns):,} variables")
+            if compact:
+                df, messages = compact_data(df, filename + ".dtypes")
+                print("\n".join(messages))
             return Dataset(data_name, "dataset", df)
 
         return f
 
+    @staticmethod
+    def save_to_cache(cache, key, df):
+        """Save parsed data to the parse cache, printing (to the info log) how long it took"""
+        start = time.time()
+        try:
+            cache.put(key, df)
+        except OSError as e:
+            print(f"Couldn't save to the parse cache: {e}")
+        else:
+            print(f"Saved to the parse cache in {time.time() - start:.2f} s")
+
     def log_command(self):
         # Log the addition of the dataset (The new dataset is the current one)
         dataset_name = self.appctx.datasets[
@@ -62,6 +175,12 @@ class FromTxtDialog(QDialog):
         ].get_python_name()
         # Get index col, wrapping strings in quotes
         index_col = repr(self.index_col)
+        # Selected variables are passed on to pd.read_csv, which needs the index column by name
+        usecols = self.get_usecols()
+        if usecols is not None:
+            index_name = self.get_index_name()
+            usecols = [c for c in self.columns if c in set(usecols) or c == index_name]
+            index_col = f"{index_name!r}, usecols={usecols!r}"
         # Log the command
         if self.kind == "CSV":
             self.appctx.log_python(
@@ -71,6 +190,14 @@ class FromTxtDialog(QDialog):
             self.appctx.log_python(
                 f"{dataset_name} = clarite.load.from_tsv(filename='{self.filename}', index_col={index_col})"
             )
+        if self.get_dtypes_file() is not None:
+            self.appctx.log_python(
+                f"# Variables in {dataset_name} were parsed using the types listed in '{self.get_dtypes_file()}'"
+            )
+        if self.compact:
+            self.appctx.log_python(
+                f"# Variables in {dataset_name} were converted to compact types, listed in '{self.filename}.dtypes'"
+            )
 
     def setup_ui(self):
         self.setWindowTitle(f"Load - From {self.kind}")
@@ -79,6 +206,12 @@ class FromTxtDialog(QDialog):
 
         self.layout = QFormLayout(self)
 
+        # Update the preview once typing stops, rather than parsing the file after every key
+        self.preview_timer = QTimer(self)
+        self.preview_timer.setSingleShot(True)
+        self.preview_timer.setInterval(self.PREVIEW_DELAY)
+        self.preview_timer.timeout.connect(self.read_preview)
+
         # Load Button
         self.btn_select_file = QPushButton(text="Select File", parent=self)
         self.btn_select_file.clicked.connect(self.launch_dlg_get_file)
@@ -103,6 +236,40 @@ class FromTxtDialog(QDialog):
         self.le_index_col.textChanged.connect(self.update_index_col)
         self.layout.addRow("Index Column Name: ", self.le_index_col)
 
+        # Variables
+        self.btn_skiponly = QPushButton("Select Variables", parent=self)
+        self.btn_skiponly.setEnabled(False)
+        self.btn_skiponly.clicked.connect(self.launch_skiponly)
+        self.layout.addRow("Variables: ", self.btn_skiponly)
+        self.preview_label = QLabel("Select a file to preview its variables", self)
+        self.preview_label.setWordWrap(True)
+        self.layout.addRow(self.preview_label)
+        self.preview_table = QTableWidget(0, 4, self)
+        self.preview_table.setHorizontalHeaderLabels(
+            ["Variable", "Type", "Missing", "Est. Memory"]
+        )
+        self.preview_table.horizontalHeader().setSectionResizeMode(
+            QHeaderView.ResizeToContents
+        )
+        self.preview_table.verticalHeader().setVisible(False)
+        self.preview_table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.layout.addRow(self.preview_table)
+
+        # Compact Types
+        self.cb_compact = QCheckBox(
+            "Use compact types (smaller numeric types, categories for repeated text)"
+        )
+        self.cb_compact.setChecked(self.compact)
+        self.cb_compact.toggled.connect(self.update_compact)
+        self.layout.addRow("Compact Load: ", self.cb_compact)
+
+        # Saved Types
+        self.cb_saved_types = QCheckBox("No saved types ('.dtypes' file) were found")
+        self.cb_saved_types.setChecked(self.use_saved_types)
+        self.cb_saved_types.setEnabled(False)
+        self.cb_saved_types.toggled.connect(self.update_use_saved_types)
+        self.layout.addRow("Saved Types: ", self.cb_saved_types)
+
         # Ok/Cancel
         QBtn = QDialogButtonBox.Ok | QDialogButtonBox.Cancel
 
@@ -115,6 +282,10 @@ class FromTxtDialog(QDialog):
         self.setMinimumWidth(400)
 
     def submit(self):
+        if self.preview_timer.isActive():
+            # Preview the current filename and index column before using it
+            self.preview_timer.stop()
+            self.read_preview()
         if len(self.filename) == 0:
             self.reject()
             return
@@ -135,15 +306,86 @@ class FromTxtDialog(QDialog):
                 text=f"A dataset named '{self.data_name}' already exists.  Use a different name.",
             )
         else:
+            dataset_count = self.appctx.dataset_count
             RunProgress.run_with_progress(
                 progress_str=f"Loading {self.kind} file...",
                 function=self.get_func(),
                 slot=self.appctx.add_dataset,
                 parent=self,
+                report_progress=True,
             )
-            self.log_command()
+            # Only log the command if it wasn't cancelled and didn't fail
+            if self.appctx.dataset_count > dataset_count:
+                self.log_command()
             self.accept()
 
+    def read_preview(self):
+        """Preview the variables in the selected file"""
+        self.preview = None
+        self.columns = None
+        self.skip = None
+        self.only = None
+        self.btn_skiponly.setEnabled(False)
+        self.preview_table.setRowCount(0)
+        if self.filename is not None and Path(self.filename + ".dtypes").is_file():
+            self.cb_saved_types.setText(
+                f"Use the types saved in '{Path(self.filename).name}.dtypes'"
+            )
+            self.cb_saved_types.setEnabled(True)
+        else:
+            self.cb_saved_types.setText("No saved types ('.dtypes' file) were found")
+            self.cb_saved_types.setEnabled(False)
+        if self.filename is None or not Path(self.filename).is_file():
+            self.preview_label.setText("Select a file to preview its variables")
+            return
+        try:
+            self.columns = read_columns(self.filename, self.SEPARATORS[self.kind])
+            self.preview, self.preview_rows = preview_text_file(
+                self.filename, self.SEPARATORS[self.kind], self.index_col
+            )
+        except Exception as e:
+            self.preview_label.setText(f"Couldn't preview the file: {e}")
+            return
+        self.preview_table.setRowCount(len(self.preview))
+        for row, (variable, info) in enumerate(self.preview.iterrows()):
+            self.preview_table.setItem(row, 0, QTableWidgetItem(str(variable)))
+            self.preview_table.setItem(row, 1, QTableWidgetItem(info["dtype"]))
+            self.preview_table.setItem(
+                row, 2, QTableWidgetItem(f"{info['na_rate']:.1%}")
+            )
+            self.preview_table.setItem(
+                row, 3, QTableWidgetItem(format_bytes(info["estimated_bytes"]))
+            )
+        self.btn_skiponly.setEnabled(True)
+        self.update_preview_label(f"Using all {len(self.preview):,} variables")
+
+    def update_preview_label(self, text: str):
+        """Show the selected variables and their estimated size"""
+        usecols = self.get_usecols()
+        if usecols is None:
+            estimated_bytes = self.preview["estimated_bytes"].sum()
+        else:
+            estimated_bytes = self.preview.loc[usecols, "estimated_bytes"].sum()
+        self.preview_label.setText(
+            f"{text} (about {self.preview_rows:,} observations, "
+            f"an estimated {format_bytes(estimated_bytes)} when loaded)"
+        )
+
+    def get_dtypes_file(self):
+        """The '.dtypes' file saved next to the file, if it exists and should be used"""
+        if self.filename is None or not self.use_saved_types:
+            return None
+        dtypes_file = Path(self.filename + ".dtypes")
+        if dtypes_file.is_file():
+            return dtypes_file
+        return None
+
+    def get_index_name(self):
+        """Name of the index column in the file"""
+        if isinstance(self.index_col, int):
+            return self.columns[self.index_col]
+        return self.index_col
+
     #########
     # Slots #
     #########
@@ -154,9 +396,14 @@ class FromTxtDialog(QDialog):
         else:
             self.filename = text
         # Update data_name automatically if it doesn't have one
-        if self.data_name is None:
-            self.data_name = Path(self.filename).stem
+        if self.data_name is None and self.filename is not None:
+            path = Path(self.filename)
+            if get_compression(self.filename) is not None:
+                path = path.with_suffix("")
+            self.data_name = path.stem
             self.le_data_name.setText(self.data_name)
+        self.btn_skiponly.setEnabled(False)
+        self.preview_timer.start()
 
     def update_data_name(self):
         text = self.le_data_name.text()
@@ -169,6 +416,16 @@ class FromTxtDialog(QDialog):
         text = self.le_index_col.text()
         if len(text.strip()) > 0:
             self.index_col = text
+        else:
+            self.index_col = 0
+        self.btn_skiponly.setEnabled(False)
+        self.preview_timer.start()
+
+    def update_compact(self, checked: bool):
+        self.compact = checked
+
+    def update_use_saved_types(self, checked: bool):
+        self.use_saved_types = checked
 
     ###############
     # Sub-dialogs #
@@ -177,13 +434,25 @@ class FromTxtDialog(QDialog):
         """Launch a dialog to select the file"""
         options = QFileDialog.Options()
         options |= QFileDialog.DontUseNativeDialog
+        extensions = [f"*.{self.kind.lower()}", "*.txt"]
+        extensions += [e + c for e in extensions for c in COMPRESSIONS]
         filename, _ = QFileDialog.getOpenFileName(
             self,
             f"Load - From {self.kind} File",
             "",
-            f"{self.kind} Files (*.{self.kind.lower()} *.txt)",
+            f"{self.kind} Files ({' '.join(extensions)})",
             options=options,
         )
         # Set filename
         self.le_selected_file.setText(filename)
         return
+
+    def launch_skiponly(self):
+        """Launch a dialog to select the variables that are loaded"""
+        text, self.skip, self.only = SkipOnlyDialog.get_skip_only(
+            columns=list(self.preview.index),
+            skip=self.skip,
+            only=self.only,
+            parent=self,
+        )
+        self.update_preview_label(text)
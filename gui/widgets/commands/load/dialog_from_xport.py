@@ -0,0 +1,278 @@
+from pathlib import Path
+
+from PyQt5.QtWidgets import (
+    QCheckBox,
+    QDialog,
+    QFileDialog,
+    QDialogButtonBox,
+    QFormLayout,
+    QLabel,
+    QPushButton,
+    QLineEdit,
+)
+
+from gui.models import (
+    Dataset,
+    compact_data,
+    get_xport_info,
+    get_xport_read_code,
+    read_xport_file,
+)
+from gui.widgets import SkipOnlyDialog
+from gui.widgets.utilities import warnings, RunProgress
+
+
+class FromXportDialog(QDialog):
+    """
+    This dialog allows loading SAS XPORT (.xpt) files, such as those published by NHANES.
+    The file is read in chunks of rows, keeping only the selected variables, and may be converted to compact dtypes.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super(FromXportDialog, self).__init__(*args, **kwargs)
+        self.appctx = self.parent().appctx
+        # Data
+        self.filename = None
+        self.data_name = None
+        self.index_col = None  # First column by default
+        self.columns = None  # All variables in the file
+        self.nobs = 0
+        self.skip = None
+        self.only = None
+        self.compact = False
+        # Setup UI
+        self.setup_ui()
+
+    def get_columns(self):
+        """Get the variables to load (None for all of them)"""
+        if self.only is not None and len(self.only) > 0:
+            return list(self.only)
+        elif self.skip is not None and len(self.skip) > 0:
+            return [c for c in self.columns if c not in set(self.skip)]
+        else:
+            return None
+
+    def get_index_col(self):
+        """Name of the index variable"""
+        if self.index_col is None:
+            return self.columns[0]
+        return self.index_col
+
+    def get_func(self):
+        """Return a function with no parameters to be run in a thread"""
+        filename = self.filename
+        data_name = self.data_name
+        columns = self.get_columns()
+        index_col = self.get_index_col()
+        compact = self.compact
+
+        def f(thread):
+            df = read_xport_file(
+                filename,
+                columns=columns,
+                index_col=index_col,
+                set_percent=thread.set_percent,
+                is_cancelled=lambda: thread.cancelled,
+            )
+            if df is None:
+                print(f"Cancelled loading '{filename}'")
+                return None
+            print(f"Loaded {len(df):,} observations of {len(df.columns):,} variables")
+            if compact:
+                df, messages = compact_data(df)
+                print("\n".join(messages))
+            return Dataset(data_name, "dataset", df)
+
+        return f
+
+    def log_command(self):
+        # Log the addition of the dataset (The new dataset is the current one)
+        dataset = self.appctx.datasets[self.appctx.current_dataset_idx]
+        dataset_name = dataset.get_python_name()
+        columns = self.get_columns()
+        if columns is not None and self.get_index_col() not in columns:
+            columns = [self.get_index_col()] + columns
+        code = get_xport_read_code(self.filename, columns, self.get_index_col())
+        self.appctx.log_python(f"import pandas as pd\n{dataset_name} = {code}")
+        if dataset.df.index.dtype.kind in "iu":
+            self.appctx.log_python(
+                f"{dataset_name}.index = {dataset_name}.index.astype('int64')"
+            )
+        if self.compact:
+            self.appctx.log_python(
+                f"# Variables in {dataset_name} were converted to compact types"
+            )
+
+    def setup_ui(self):
+        self.setWindowTitle("Load - From SAS XPORT")
+        self.setMinimumWidth(500)
+        self.setModal(True)
+
+        self.layout = QFormLayout(self)
+
+        # Load Button
+        self.btn_select_file = QPushButton(text="Select File", parent=self)
+        self.btn_select_file.clicked.connect(self.launch_dlg_get_file)
+        self.layout.addWidget(self.btn_select_file)
+
+        # Filename
+        self.le_selected_file = QLineEdit(self.filename)
+        self.le_selected_file.setPlaceholderText("XPT File")
+        self.le_selected_file.textChanged.connect(self.update_filename)
+        self.layout.addRow("Filename: ", self.le_selected_file)
+
+        # Data Name
+        self.le_data_name = QLineEdit(self.data_name)
+        self.le_data_name.setPlaceholderText("")
+        self.le_data_name.textChanged.connect(self.update_data_name)
+        self.layout.addRow("Dataset Name: ", self.le_data_name)
+
+        # Index Column
+        self.le_index_col = QLineEdit()
+        self.le_index_col.setPlaceholderText("None (Use first column)")
+        self.le_index_col.textChanged.connect(self.update_index_col)
+        self.layout.addRow("Index Column Name: ", self.le_index_col)
+
+        # Variables
+        self.btn_skiponly = QPushButton("Select Variables", parent=self)
+        self.btn_skiponly.setEnabled(False)
+        self.btn_skiponly.clicked.connect(self.launch_skiponly)
+        self.layout.addRow("Variables: ", self.btn_skiponly)
+        self.skiponly_label = QLabel("Select a file to list its variables", parent=self)
+        self.layout.addRow(self.skiponly_label)
+
+        # Compact Types
+        self.cb_compact = QCheckBox(
+            "Use compact types (smaller numeric types, categories for repeated text)"
+        )
+        self.cb_compact.setChecked(self.compact)
+        self.cb_compact.toggled.connect(self.update_compact)
+        self.layout.addRow("Compact Load: ", self.cb_compact)
+
+        # Ok/Cancel
+        QBtn = QDialogButtonBox.Ok | QDialogButtonBox.Cancel
+
+        self.buttonBox = QDialogButtonBox(QBtn)
+        self.buttonBox.accepted.connect(self.submit)
+        self.buttonBox.rejected.connect(self.reject)
+        self.layout.addRow(self.buttonBox)
+
+    def submit(self):
+        if self.filename is None:
+            self.reject()
+            return
+        datafile = Path(self.filename)
+        if not datafile.is_file():
+            warnings.show_warning(
+                title="File Not Found",
+                text=f"The file could not be found:\n'{str(datafile)}''",
+            )
+            return
+        elif self.columns is None:
+            warnings.show_warning(
+                title="Not an XPORT File",
+                text=f"The file couldn't be read as a SAS XPORT file:\n'{str(datafile)}''",
+            )
+            return
+        elif self.get_index_col() not in self.columns:
+            warnings.show_warning(
+                title="Index Column Not Found",
+                text=f"There is no variable named '{self.index_col}' in the file.",
+            )
+            return
+        elif self.data_name in [d.name for d in self.appctx.datasets]:
+            warnings.show_warning(
+                title="Dataset already exists",
+                text=f"A dataset named '{self.data_name}' already exists.  Use a different name.",
+            )
+            return
+        dataset_count = self.appctx.dataset_count
+        RunProgress.run_with_progress(
+            progress_str="Loading XPORT file...",
+            function=self.get_func(),
+            slot=self.appctx.add_dataset,
+            parent=self,
+            report_progress=True,
+        )
+        # Only log the command if it wasn't cancelled and didn't fail
+        if self.appctx.dataset_count > dataset_count:
+            self.log_command()
+        self.accept()
+
+    def read_schema(self):
+        """List the variables in the selected file"""
+        self.columns = None
+        self.skip = None
+        self.only = None
+        self.btn_skiponly.setEnabled(False)
+        if self.filename is None or not Path(self.filename).is_file():
+            self.skiponly_label.setText("Select a file to list its variables")
+            return
+        try:
+            self.columns, self.nobs = get_xport_info(self.filename)
+        except Exception as e:
+            self.skiponly_label.setText(f"Couldn't read the file: {e}")
+            return
+        self.skiponly_label.setText(
+            f"Using all {len(self.columns):,} variables ({self.nobs:,} observations)"
+        )
+        self.btn_skiponly.setEnabled(True)
+
+    #########
+    # Slots #
+    #########
+    def update_filename(self):
+        text = self.le_selected_file.text()
+        if len(text.strip()) == 0:
+            self.filename = None
+        else:
+            self.filename = text
+            # Update data_name automatically if it doesn't have one
+            if self.data_name is None:
+                self.data_name = Path(self.filename).stem
+                self.le_data_name.setText(self.data_name)
+        self.read_schema()
+
+    def update_data_name(self):
+        text = self.le_data_name.text()
+        if len(text.strip()) == 0:
+            self.data_name = None
+        else:
+            self.data_name = text
+
+    def update_index_col(self):
+        text = self.le_index_col.text()
+        if len(text.strip()) > 0:
+            self.index_col = text
+        else:
+            self.index_col = None
+
+    def update_compact(self, checked: bool):
+        self.compact = checked
+
+    ###############
+    # Sub-dialogs #
+    ###############
+    def launch_dlg_get_file(self):
+        """Launch a dialog to select the file"""
+        options = QFileDialog.Options()
+        options |= QFileDialog.DontUseNativeDialog
+        filename, _ = QFileDialog.getOpenFileName(
+            self,
+            "Load - From SAS XPORT File",
+            "",
+            "SAS XPORT Files (*.xpt *.XPT)",
+            options=options,
+        )
+        # Set filename
+        self.le_selected_file.setText(filename)
+
+    def launch_skiponly(self):
+        """Launch a dialog to select the variables that are loaded"""
+        text, self.skip, self.only = SkipOnlyDialog.get_skip_only(
+            columns=self.columns,
+            skip=self.skip,
+            only=self.only,
+            parent=self,
+        )
+        self.skiponly_label.setText(text)
@@ -72,7 +72,7 @@ class ColfilterMinN(QDialog):
         # Skip/Only
         self.skiponly_label = QLabel(self)
         self.skiponly_label.setText(
-            f"Using all {len(list(self.dataset.df)):,} variables"
+            f"Using all {self.dataset.get_column_count():,} variables"
         )
         self.btn_skiponly = QPushButton("Edit", parent=self)
         self.btn_skiponly.clicked.connect(self.launch_skiponly)
@@ -122,7 +122,10 @@ class ColfilterMinN(QDialog):
         """Launch a dialog to set skip/only"""
         # Update skip and only
         text, self.skip, self.only = SkipOnlyDialog.get_skip_only(
-            columns=list(self.dataset.df), skip=self.skip, only=self.only, parent=self
+            columns=self.dataset.get_column_names(),
+            skip=self.skip,
+            only=self.only,
+            parent=self,
         )
         self.skiponly_label.setText(text)
 
@@ -29,7 +29,7 @@ class RowfilterDialog(QDialog):
         # Data
         self.dataset = self.appctx.datasets[self.appctx.current_dataset_idx]
         # Stored data to choose from
-        self.columns = list(self.dataset.df)
+        self.columns = self.dataset.get_column_names()
         self.comparison_method_options = [
             "less than",
             "less than or equal to",
@@ -28,7 +28,7 @@ class HistogramDialog(QDialog):
         super(HistogramDialog, self).__init__(*args, **kwargs)
         self.appctx = self.parent().appctx
         self.dataset = self.appctx.datasets[self.appctx.current_dataset_idx]
-        self.column = list(self.dataset.df)[0]
+        self.column = self.dataset.get_column_name(0)
         self.bins = None
         self.figsize = (12, 5)
         self.dpi = 100
@@ -87,7 +87,7 @@ class HistogramDialog(QDialog):
     def launch_get_column(self):
         """Launch a dialog to set the plotted column from the dataset"""
         column = SelectColumnDialog.get_column(
-            columns=list(self.dataset.df), selected=self.column, parent=self
+            columns=self.dataset.get_column_names(), selected=self.column, parent=self
         )
         if column is not None:
             self.column = column
@@ -97,7 +97,12 @@ class HistogramDialog(QDialog):
 
     def update_bin_setting(self):
         var_type = self.dataset.get_types()[self.column]
-        var_unique_vals = self.dataset.df[self.column].nunique()
+        if self.dataset.stats is None:
+            var_unique_vals = self.dataset.get_column(self.column).nunique()
+        else:
+            var_unique_vals = self.dataset.stats.get_column_unique(
+                self.dataset.get_column_position(self.column)
+            )
         if var_type == "categorical":
             self.bins_sb.setEnabled(False)
             self.bins_sb.setRange(1, var_unique_vals)
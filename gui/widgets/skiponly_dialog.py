@@ -22,6 +22,7 @@ class SkipOnlyDialog(QDialog):
         super(SkipOnlyDialog, self).__init__(parent)
         self.setWindowTitle("Select Columns")
         self.columns = columns
+        self.column_positions = {c: i for i, c in reversed(list(enumerate(columns)))}
         self.selected_variables = (
             []
         )  # Names of selected variables.  Only updated when accepting the dialog.
@@ -30,9 +31,11 @@ class SkipOnlyDialog(QDialog):
         # starting_selected and selected are boolean arrays to indicate whether each variable is selected
         if skip is not None:
             self.starting_only = False
+            skip = set(skip)
             self.starting_selected = [(c in skip) for c in self.columns]
         elif only is not None:
             self.starting_only = True
+            only = set(only)
             self.starting_selected = [(c in only) for c in self.columns]
         elif skip is None and only is None:
             self.starting_only = True
@@ -245,7 +248,7 @@ class SkipOnlyDialog(QDialog):
             item = self.left_model.takeItem(idx)
             self.right_model.appendRow(item)
             # Mark as selected
-            col_idx = self.columns.index(item.text())
+            col_idx = self.column_positions[item.text()]
             self.selected[col_idx] = True
         # Delete rows after moving them (don't do it during because it causes index changes)
         for idx in reversed(
@@ -275,7 +278,7 @@ class SkipOnlyDialog(QDialog):
             item = self.right_model.takeItem(idx)
             self.left_model.appendRow(item)
             # Mark as not selected
-            col_idx = self.columns.index(item.text())
+            col_idx = self.column_positions[item.text()]
             self.selected[col_idx] = False
         # Delete rows after moving them (don't do it during because it causes index changes)
         for idx in reversed(
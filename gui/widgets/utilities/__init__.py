@@ -1,6 +1,7 @@
 from .confirm import confirm_click
 from .lines import QHLine
-from .run_progress import RunProgress
+from .run_progress import JobCancelled, RunProgress
+from .background import BackgroundThread
 from .warnings import show_critical, show_warning
 from .color_picker import ColorPickerWidget
 from .font_picker import FontPickerWidget
@@ -0,0 +1,37 @@
+from PyQt5.QtCore import QThread, pyqtSignal
+
+
+class BackgroundThread(QThread):
+    """
+    Runs a no-parameter function in a QThread without showing a progress dialog, so the UI stays usable.
+    Use run_in_background rather than creating these directly: it keeps a reference to the thread until it finishes.
+    """
+
+    result = pyqtSignal(object)
+    error = pyqtSignal(str)
+
+    # Threads that are currently running (prevents them from being garbage collected)
+    running = set()
+
+    def __init__(self, func, *args, **kwargs):
+        super(BackgroundThread, self).__init__(*args, **kwargs)
+        self.func = func
+
+    def run(self):
+        try:
+            self.result.emit(self.func())
+        except Exception as e:
+            self.error.emit(str(e))
+
+    @staticmethod
+    def run_in_background(function, slot=None, error_slot=None):
+        """Run a function in a background thread, passing any result to the slot"""
+        thread = BackgroundThread(function)
+        if slot is not None:
+            thread.result.connect(slot)
+        if error_slot is not None:
+            thread.error.connect(error_slot)
+        thread.finished.connect(lambda: BackgroundThread.running.discard(thread))
+        BackgroundThread.running.add(thread)
+        thread.start()
+        return thread
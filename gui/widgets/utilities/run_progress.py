@@ -1,4 +1,8 @@
-from contextlib import redirect_stdout
+import multiprocessing
+import sys
+import threading
+import time
+from contextlib import contextmanager
 
 from PyQt5.QtCore import QThread, pyqtSignal, pyqtSlot
 from PyQt5.QtWidgets import QProgressDialog
@@ -13,18 +17,48 @@ class RunProgress(QProgressDialog):
     After initializing, use set_function to specify a no-parameter function that gets run in a thread.
     Optionally use set_slot to specify a slot for any returned results
 
+    If report_progress is True, the function is instead passed the RunThread running it, which acts as a
+    cancellation token.  It should call thread.set_percent to show progress, and check for cancellation between
+    variables or chunks: either return early (the result is ignored) once thread.cancelled is True,
+    or call thread.raise_if_cancelled().
+
+    If isolate is True, the function (which must be picklable, such as a module-level function or a
+    functools.partial of one) is run in a separate process that is terminated if the operation is cancelled.
+    This stops functions that can't check for cancellation, at the cost of starting the process and copying
+    the data to it.  Anything it prints isn't shown in the log.
+
+    Don't start a RunProgress from the slot of another one: use run_when_idle instead.
+
     Parameters
     ----------
     progress_str: The string displayed in the progress dialog
 
     """
 
-    def __init__(self, progress_str, parent, *args, **kwargs):
+    # Number of RunProgress dialogs currently running, and functions waiting until none are (see run_when_idle)
+    active = 0
+    deferred = []
+
+    def __init__(
+        self,
+        progress_str,
+        parent,
+        *args,
+        report_progress=False,
+        isolate=False,
+        **kwargs,
+    ):
         super(RunProgress, self).__init__(
             progress_str, "Cancel", 0, 0, parent=parent, *args, **kwargs
         )
         # Create thread running the command
         self.thread = RunThread(self)
+        self.thread.description = progress_str
+        self.thread.report_progress = report_progress
+        self.thread.isolate = isolate
+        # Only close the dialog when the thread finishes, not when it reaches 100%
+        self.setAutoClose(False)
+        self.setAutoReset(False)
         self.func = None
         self.slot = None
         self.appctx = parent.appctx
@@ -44,58 +78,242 @@ class RunProgress(QProgressDialog):
         # Connect other thread signals
         self.thread.message.connect(self.appctx.log_info)
         self.thread.error.connect(lambda s: show_critical("Error", s))
-        self.thread.finished.connect(self.close)
+        self.thread.finished.connect(self.thread_finished)
+        self.thread.progress.connect(self.update_percent)
         self.canceled.connect(
             self.thread.cancel
         )  # Exit thread if the operation is cancelled
         # Start the thread
-        self.thread.start()
-        # Show self
-        self.exec_()
+        RunProgress.active += 1
+        try:
+            self.thread.start()
+            # Show self
+            self.exec_()
+            self.wait_for_thread()
+        finally:
+            RunProgress.active -= 1
+        # Run anything that was waiting for this (outermost) RunProgress to return
+        while RunProgress.active == 0 and len(RunProgress.deferred) > 0:
+            RunProgress.deferred.pop(0)()
+
+    def wait_for_thread(self):
+        """Wait for the thread to exit before it can be deleted (the dialog closes as soon as the function returns)"""
+        # Functions reporting progress also check for cancellation, and isolated ones are terminated,
+        # so they return soon after being cancelled.
+        if (
+            self.thread.report_progress
+            or self.thread.isolate
+            or not self.thread.cancelled
+        ):
+            self.thread.wait()
+        else:
+            # The function can't be stopped: keep the thread (ignoring its result and output) until it finishes
+            RunThread.running = {t for t in RunThread.running if not t.isFinished()}
+            self.thread.abandoned = True
+            self.thread.setParent(None)
+            RunThread.running.add(self.thread)
 
     @staticmethod
-    def run_with_progress(progress_str, function, slot, parent, *args, **kwargs):
+    def run_when_idle(function):
+        """
+        Call a no-parameter function now, or after the outermost running RunProgress returns if there is one.
+        Slots of a RunProgress run while its dialog is still open, so starting another RunProgress from them
+        would nest the dialogs.
+        """
+        if RunProgress.active == 0:
+            function()
+        else:
+            RunProgress.deferred.append(function)
+
+    @pyqtSlot()
+    def thread_finished(self):
+        # Closing a progress dialog emits 'canceled', which shouldn't cancel a thread that already finished
+        self.canceled.disconnect(self.thread.cancel)
+        self.close()
+
+    @pyqtSlot(int)
+    def update_percent(self, percent: int):
+        # Switch from a busy indicator to showing the percent complete
+        if self.maximum() == 0:
+            self.setRange(0, 100)
+        self.setValue(percent)
+
+    @staticmethod
+    def run_with_progress(
+        progress_str,
+        function,
+        slot,
+        parent,
+        *args,
+        report_progress=False,
+        isolate=False,
+        **kwargs,
+    ):
         """Run a function in a thread with a progress dialog"""
-        progress = RunProgress(progress_str, parent, *args, **kwargs)
+        progress = RunProgress(
+            progress_str,
+            parent,
+            *args,
+            report_progress=report_progress,
+            isolate=isolate,
+            **kwargs,
+        )
         progress.set_function(function)
         progress.set_slot(slot)
         progress.run()
 
 
+class JobCancelled(Exception):
+    """Raised by RunThread.raise_if_cancelled to stop a function that was cancelled"""
+
+
 class RunThread(QThread):
     """
-    Runs a function in a QThread.  Signaling the 'cancel' slot will attempt to quit the thread, but will prevent any result from being used regardless.
+    Runs a function in a QThread.  Signaling the 'cancel' slot prevents any result from being used.
+    The function only stops early if it checks for cancellation (see RunProgress) or runs in a separate process.
     """
 
     finished = pyqtSignal()
     error = pyqtSignal(str)
     result = pyqtSignal(object)
     message = pyqtSignal(str)
+    progress = pyqtSignal(int)
+
+    # Cancelled threads that are still running (prevents them from being deleted)
+    running = set()
 
     def __init__(self, *args, **kwargs):
         super(RunThread, self).__init__(*args, **kwargs)
         self.cancelled = False
+        self.cancel_time = None  # time.perf_counter() when it was cancelled
         self.func = None
+        self.description = ""
+        self.report_progress = False  # Pass this thread to the function
+        self.isolate = False  # Run the function in a separate process
+        self.abandoned = (
+            False  # Cancelled but left running, so anything it prints is discarded
+        )
 
     @pyqtSlot()
     def cancel(self):
+        if not self.cancelled:
+            self.cancel_time = time.perf_counter()
         self.cancelled = True
-        self.quit()
+
+    def raise_if_cancelled(self):
+        """Raise JobCancelled if the function was cancelled"""
+        if self.cancelled:
+            raise JobCancelled()
 
     def run(self):
-        with redirect_stdout(self):
+        with redirect_thread_stdout(self):
             try:
-                result = self.func()
+                if self.isolate:
+                    result = self.run_isolated()
+                elif self.report_progress:
+                    result = self.func(self)
+                else:
+                    result = self.func()
                 if not self.cancelled:
                     self.result.emit(result)
-                self.finished.emit()
+            except JobCancelled:
+                pass
             except Exception as e:
-                self.error.emit(str(e))
-                self.finished.emit()
+                if not self.cancelled:
+                    self.error.emit(str(e))
+            if self.cancelled:
+                # Reported even if the thread was abandoned
+                self.message.emit(
+                    f"Cancelled '{self.description}': stopped "
+                    f"{time.perf_counter() - self.cancel_time:.2f} seconds after it was cancelled\n"
+                )
+            self.finished.emit()
+
+    def run_isolated(self):
+        """Run the function in a separate process, terminating the process if it is cancelled"""
+        context = multiprocessing.get_context("spawn")
+        receiver, sender = context.Pipe(duplex=False)
+        process = context.Process(
+            target=run_in_process, args=(sender, self.func), daemon=True
+        )
+        process.start()
+        sender.close()
+        try:
+            while not receiver.poll(0.1):
+                if self.cancelled:
+                    process.terminate()
+                    raise JobCancelled()
+                if not process.is_alive():
+                    raise RuntimeError(
+                        f"The process running '{self.description}' stopped unexpectedly "
+                        f"(exit code {process.exitcode})"
+                    )
+            succeeded, result = receiver.recv()
+        finally:
+            receiver.close()
+            process.join()
+        if not succeeded:
+            raise RuntimeError(result)
+        return result
+
+    def set_percent(self, percent: int):
+        """Show the percent complete in the progress dialog"""
+        self.progress.emit(percent)
 
     def write(self, message):
-        self.message.emit(message)
+        if not self.abandoned:
+            self.message.emit(message)
 
     def flush(self):
         """must be implemented"""
         pass
+
+
+class ThreadStdout:
+    """
+    Replaces sys.stdout, sending what is printed in each RunThread to that thread and anything else to the
+    original stdout.  Unlike contextlib.redirect_stdout, a thread that is still running after it was abandoned
+    can't send its output to later threads or restore stdout while they run.
+    """
+
+    lock = threading.Lock()
+
+    def __init__(self, stdout):
+        self.stdout = stdout
+        self.threads = dict()  # threading.get_ident() -> RunThread
+
+    def write(self, message):
+        thread = self.threads.get(threading.get_ident())
+        if thread is None:
+            return self.stdout.write(message)
+        thread.write(message)
+
+    def flush(self):
+        thread = self.threads.get(threading.get_ident())
+        if thread is None:
+            self.stdout.flush()
+
+
+@contextmanager
+def redirect_thread_stdout(thread: RunThread):
+    """Send anything printed in the current thread to the RunThread while the context is active"""
+    with ThreadStdout.lock:
+        if not isinstance(sys.stdout, ThreadStdout):
+            sys.stdout = ThreadStdout(sys.stdout)
+        stdout = sys.stdout
+    ident = threading.get_ident()
+    stdout.threads[ident] = thread
+    try:
+        yield
+    finally:
+        del stdout.threads[ident]
+
+
+def run_in_process(sender, func):
+    """Run a function in a separate process, sending back whether it succeeded and the result (or error)"""
+    try:
+        sender.send((True, func()))
+    except Exception as e:
+        sender.send((False, str(e)))
+    finally:
+        sender.close()
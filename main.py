@@ -1,8 +1,12 @@
 if __name__ == "__main__":
 
+    import multiprocessing
     import sys
     from gui import AppContext
 
+    # Needed for worker processes in frozen (PyInstaller) builds
+    multiprocessing.freeze_support()
+
     appctxt = AppContext()
     exit_code = appctxt.run()
     sys.exit(exit_code)
@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from gui.models import (
+    EXPORT_FORMATS,
+    apply_dtypes,
+    read_binary_file,
+    read_dtypes,
+    read_text_file,
+    write_data_file,
+    write_dtypes,
+)
+
+
+@pytest.fixture
+def data():
+    return pd.DataFrame(
+        {
+            "binary": pd.Categorical([0.0, 1.0, np.nan, 1.0, 0.0]),
+            "category": pd.Categorical(["a", "b", "a", None, "c"]),
+            "integer": np.arange(5),
+            "continuous": [0.5, np.nan, 1.25, -3.0, 1e-8],
+        },
+        index=pd.Index([f"id{i}" for i in range(5)], name="ID"),
+    )
+
+
+@pytest.mark.parametrize("kind", list(EXPORT_FORMATS))
+@pytest.mark.parametrize("chunk_rows", [2, None])
+def test_round_trip(tmp_path, data, kind, chunk_rows):
+    """Data saved in each format (with its '.dtypes' file) is loaded with the same values and dtypes"""
+    if kind in ("Parquet", "Feather"):
+        pytest.importorskip("pyarrow")
+    elif kind == "TSV (zstd)":
+        pytest.importorskip("zstandard")
+    filename = str(tmp_path / f"data{EXPORT_FORMATS[kind]}")
+    assert write_data_file(data, filename, kind, chunk_rows=chunk_rows)
+    write_dtypes(data.dtypes, filename + ".dtypes")
+    dtypes = read_dtypes(filename + ".dtypes")
+    if kind.startswith("TSV"):
+        result = read_text_file(filename, "\t", dtype=dtypes)
+    else:
+        result = apply_dtypes(read_binary_file(kind, filename), dtypes)
+    pd.testing.assert_frame_equal(result, data)
+
+
+def test_cancel_keeps_existing_file(tmp_path, data):
+    """A cancelled save leaves any existing file as it was"""
+    filename = tmp_path / "data.txt"
+    filename.write_text("old")
+    assert not write_data_file(
+        data, str(filename), "TSV", is_cancelled=lambda: True, chunk_rows=1
+    )
+    assert filename.read_text() == "old"
+    assert list(tmp_path.iterdir()) == [filename]
@@ -0,0 +1,61 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from gui.models import DataDiff
+
+
+@pytest.fixture
+def data():
+    return pd.DataFrame(
+        {
+            "binary": pd.Categorical([0.0, 1.0, np.nan, 1.0, 0.0]),
+            "category": pd.Categorical(["a", "b", "a", None, "c"]),
+            "integer": np.arange(5),
+            "continuous": [0.5, np.nan, 1.25, -3.0, 1e-8],
+        },
+        index=pd.Index([f"id{i}" for i in range(5)], name="ID"),
+    )
+
+
+@pytest.mark.parametrize(
+    "change",
+    [
+        lambda df: df.drop(index=["id1", "id3"]),
+        lambda df: df.drop(columns=["category"]),
+        lambda df: df.rename(columns={"integer": "renamed"}),
+        lambda df: df.astype({"integer": "float64", "binary": "float64"}),
+        lambda df: df.drop(index=["id0"]).rename(columns={"continuous": "renamed"}),
+        lambda df: df.iloc[:0],
+    ],
+    ids=["drop_rows", "drop_column", "rename", "convert", "drop_and_rename", "empty"],
+)
+def test_restore(data, change):
+    new = change(data)
+    diff = DataDiff(data, new)
+    assert diff.snapshot is None
+    pd.testing.assert_frame_equal(diff.restore(new), data)
+
+
+def test_unchanged_columns_not_stored(data):
+    new = data.rename(columns={"integer": "renamed"}).astype({"continuous": "float32"})
+    diff = DataDiff(data, new)
+    assert list(diff.stored) == [3]
+    assert diff.get_size() == data["continuous"].memory_usage(deep=True)
+
+
+@pytest.mark.parametrize(
+    "change",
+    [
+        lambda df: df.iloc[::-1],
+        lambda df: pd.concat([df, df.iloc[:1].rename(index={"id0": "id5"})]),
+        lambda df: df.set_axis(["a", "a", "b", "c"], axis=1),
+    ],
+    ids=["reordered", "added_row", "duplicate_columns"],
+)
+def test_restore_snapshot(data, change):
+    new = change(data)
+    diff = DataDiff(data, new)
+    assert diff.snapshot is data
+    assert diff.get_size() == data.memory_usage(deep=True).sum()
+    pd.testing.assert_frame_equal(diff.restore(new), data)